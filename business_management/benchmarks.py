@@ -0,0 +1,412 @@
+"""Micro-benchmarks for hot paths of the calculator.
+
+A benchmark is registered with ``@benchmark(name)`` on a factory that prepares its
+inputs and returns ``(func, calls)``: ``func`` takes no arguments and ``calls`` is the
+number of operations one ``func()`` performs, so results are reported per operation.
+Run them with ``python manage.py run_benchmarks``.
+
+Benchmarks registered with ``test_environment=True`` use the test client or the ORM;
+they run against throwaway test databases, set up the same way ``manage.py test``
+does, so the configured database is never touched.
+"""
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import tempfile
+import timeit
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.2
+# a benchmark is a regression when its best time exceeds the baseline by this fraction
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+RESULTS_FORMAT = 1
+
+CART_SIZES = (1, 10, 100, 1000)
+
+# roughly the size of the full ОКОПФ directory with a generous margin
+SYNTHETIC_OPF_COUNT = 2000
+SYNTHETIC_TAX_SYSTEM_COUNT = 50
+
+BenchmarkFactory = Callable[[], Tuple[Callable[[], object], int]]
+
+BENCHMARKS: Dict[str, BenchmarkFactory] = {}
+TEST_ENVIRONMENT_BENCHMARKS = set()
+
+
+def benchmark(name: str, test_environment: bool = False) -> Callable[[BenchmarkFactory], BenchmarkFactory]:
+    def register(factory: BenchmarkFactory) -> BenchmarkFactory:
+        BENCHMARKS[name] = factory
+        if test_environment:
+            TEST_ENVIRONMENT_BENCHMARKS.add(name)
+        return factory
+
+    return register
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    name: str
+    operations: int
+    best: float
+    median: float
+
+    @property
+    def best_us(self) -> float:
+        return self.best * 1e6
+
+    @property
+    def median_us(self) -> float:
+        return self.median * 1e6
+
+    def as_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "operations": self.operations,
+            "best_us": round(self.best_us, 4),
+            "median_us": round(self.median_us, 4),
+        }
+
+
+def measure(
+    name: str,
+    func: Callable[[], object],
+    calls: int = 1,
+    repeat: int = DEFAULT_REPEAT,
+    min_time: float = DEFAULT_MIN_TIME,
+) -> BenchmarkResult:
+    """Time ``func`` and return the cost of one of its ``calls`` operations in seconds.
+
+    The loop count is doubled until one run takes at least ``min_time`` seconds, then
+    ``repeat`` runs are timed; ``best`` is the fastest run and ``median`` the typical one.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    timings = [elapsed / (number * calls) for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return BenchmarkResult(name=name, operations=number * calls, best=min(timings), median=statistics.median(timings))
+
+
+def select_benchmarks(patterns: Optional[Iterable[str]] = None) -> List[str]:
+    """Registered names starting with any of ``patterns`` (all of them by default)."""
+    patterns = list(patterns or [])
+    return [name for name in BENCHMARKS if not patterns or any(name.startswith(pattern) for pattern in patterns)]
+
+
+@contextmanager
+def benchmark_test_environment():
+    """Test settings and empty test databases for the duration of the block."""
+    from django.test.utils import (
+        override_settings,
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    try:
+        old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        try:
+            # a 1000-line cart posts 2000 form fields, over Django's default limit
+            with override_settings(DATA_UPLOAD_MAX_NUMBER_FIELDS=None):
+                yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+    finally:
+        teardown_test_environment()
+
+
+def run_benchmarks(
+    names: Iterable[str],
+    repeat: int = DEFAULT_REPEAT,
+    min_time: float = DEFAULT_MIN_TIME,
+) -> List[BenchmarkResult]:
+    names = list(names)
+    results = []
+    for name in [name for name in names if name not in TEST_ENVIRONMENT_BENCHMARKS]:
+        func, calls = BENCHMARKS[name]()
+        results.append(measure(name, func, calls, repeat=repeat, min_time=min_time))
+    isolated = [name for name in names if name in TEST_ENVIRONMENT_BENCHMARKS]
+    if isolated:
+        with benchmark_test_environment():
+            for name in isolated:
+                func, calls = BENCHMARKS[name]()
+                results.append(measure(name, func, calls, repeat=repeat, min_time=min_time))
+    order = {name: index for index, name in enumerate(names)}
+    return sorted(results, key=lambda result: order[result.name])
+
+
+def dump_results(results: Iterable[BenchmarkResult]) -> Dict:
+    """JSON document with the results and the interpreter they were measured on."""
+    return {
+        "format": RESULTS_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [result.as_dict() for result in results],
+    }
+
+
+def load_results(path: Path) -> Dict[str, Dict]:
+    """Results of a document written by ``dump_results``, keyed by benchmark name."""
+    document = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {item["name"]: item for item in document.get("results", [])}
+
+
+@dataclass(frozen=True)
+class Comparison:
+    name: str
+    baseline_us: float
+    current_us: float
+
+    @property
+    def change(self) -> float:
+        """Relative change of the best time; ``0.25`` means 25% slower than the baseline."""
+        return self.current_us / self.baseline_us - 1 if self.baseline_us else 0.0
+
+    def is_regression(self, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> bool:
+        return self.change > threshold
+
+
+def compare_results(results: Iterable[BenchmarkResult], baseline: Mapping[str, Mapping]) -> List[Comparison]:
+    """Compare best times with ``baseline``; benchmarks missing from it are skipped."""
+    return [
+        Comparison(name=result.name, baseline_us=baseline[result.name]["best_us"], current_us=result.best_us)
+        for result in results
+        if result.name in baseline
+    ]
+
+
+@benchmark("formatting.spaced_number.decimal")
+def _spaced_number_decimal():
+    from .templatetags.formatting import spaced_number
+
+    value = Decimal("1234567.891234")
+    return lambda: spaced_number(value, "2"), 1
+
+
+@benchmark("formatting.spaced_number.float")
+def _spaced_number_float():
+    from .templatetags.formatting import spaced_number
+
+    value = 1234567.891234
+    return lambda: spaced_number(value, "2"), 1
+
+
+@benchmark("formatting.spaced_number.int")
+def _spaced_number_int():
+    from .templatetags.formatting import spaced_number
+
+    return lambda: spaced_number(1234567), 1
+
+
+@benchmark("formatting.format_rows")
+def _format_rows():
+    from .calculator import build_profitability_rows
+    from .templatetags.formatting import format_rows
+
+    rows = build_profitability_rows(Decimal("150000"))
+    columns = {"monthly_revenue": 0, "yearly_revenue": 0}
+    return lambda: format_rows(rows, columns), len(rows) * len(columns)
+
+
+def _synthetic_regulatory_payload() -> Dict:
+    return {
+        "checked_at": "2024-01-01T00:00:00+00:00",
+        "opf": [
+            {
+                "code": f"{index:05d}",
+                "title": f"Организационно-правовая форма {index}",
+                "source_url": "https://www.nalog.gov.ru/opendata/7707329152-spravOKOPF/",
+                "tax_systems": ["USN_6", "USN_15", f"TAX_{index % SYNTHETIC_TAX_SYSTEM_COUNT}"],
+            }
+            for index in range(SYNTHETIC_OPF_COUNT)
+        ],
+        "tax_systems": {
+            f"TAX_{index}": {"code": f"TAX_{index}", "title": f"Режим {index}", "effective_rate": "0.06"}
+            for index in range(SYNTHETIC_TAX_SYSTEM_COUNT)
+        },
+    }
+
+
+def _regulatory_startup(compiled: bool, lookup: bool):
+    """Cold read of a large regulatory cache, optionally followed by one OPF lookup."""
+    from .regulations import read_regulatory_snapshot, write_regulatory_payload
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    cache_path = Path(tmp_dir.name) / "regulations_cache.json"
+    payload = _synthetic_regulatory_payload()
+    if compiled:
+        write_regulatory_payload(payload, cache_path)
+    else:
+        cache_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def run(tmp_dir=tmp_dir):
+        snapshot = read_regulatory_snapshot(cache_path)
+        if lookup:
+            snapshot.get_available_tax_codes("01000")
+
+    return run, 1
+
+
+@benchmark("regulations.load.json")
+def _regulations_load_json():
+    return _regulatory_startup(compiled=False, lookup=False)
+
+
+@benchmark("regulations.load.compiled")
+def _regulations_load_compiled():
+    return _regulatory_startup(compiled=True, lookup=False)
+
+
+@benchmark("regulations.first_lookup.json")
+def _regulations_first_lookup_json():
+    return _regulatory_startup(compiled=False, lookup=True)
+
+
+@benchmark("regulations.first_lookup.compiled")
+def _regulations_first_lookup_compiled():
+    return _regulatory_startup(compiled=True, lookup=True)
+
+
+def _calculator_inputs():
+    from .regulations import DEFAULT_REGULATORY_DATA, RegulatorySnapshot
+
+    snapshot = RegulatorySnapshot(DEFAULT_REGULATORY_DATA)
+    daily_profit = Decimal("150000") / Decimal(30)
+    daily_cost = Decimal("150000") * (Decimal("1") / Decimal("0.3") - Decimal("1")) / Decimal(30)
+    return snapshot, daily_profit, daily_cost
+
+
+@benchmark("regulations.tax_projection")
+def _tax_projection():
+    from .regulations import build_tax_projection
+
+    snapshot, daily_profit, daily_cost = _calculator_inputs()
+    tax_system = snapshot.get_tax_system("USN_15")
+    return lambda: build_tax_projection(daily_profit, daily_cost, 30, tax_system), 1
+
+
+@benchmark("regulations.tax_rows")
+def _tax_rows():
+    from .regulations import build_tax_rows
+
+    snapshot, daily_profit, daily_cost = _calculator_inputs()
+    tax_codes = snapshot.get_available_tax_codes("IP")
+    return lambda: build_tax_rows(daily_profit, daily_cost, 30, tax_codes, snapshot), 1
+
+
+@benchmark("regulations.snapshot.default")
+def _snapshot_default():
+    from .regulations import DEFAULT_REGULATORY_DATA, RegulatorySnapshot
+
+    return lambda: RegulatorySnapshot(DEFAULT_REGULATORY_DATA), 1
+
+
+@benchmark("regulations.snapshot.synthetic")
+def _snapshot_synthetic():
+    from .regulations import RegulatorySnapshot
+
+    payload = _synthetic_regulatory_payload()
+    return lambda: RegulatorySnapshot(payload).get_opf("01000"), 1
+
+
+@benchmark("regulations.load_snapshot.cached")
+def _load_snapshot_cached():
+    """``load_regulatory_snapshot`` once the snapshot is cached: one ``stat`` per call."""
+    from .regulations import load_regulatory_snapshot
+
+    load_regulatory_snapshot()
+    return load_regulatory_snapshot, 1
+
+
+def _calculator_render(page_cache: bool):
+    from django.test import Client
+    from django.urls import reverse
+
+    from . import views
+
+    client = Client()
+    url = reverse("business_calculator")
+    params = {"monthly_profit": "150000", "margin_percent": "30", "opf_code": "IP"}
+
+    def run():
+        if not page_cache:
+            views.clear_calculator_page_cache()
+        response = client.get(url, params)
+        assert response.status_code == 200, response.status_code
+
+    return run, 1
+
+
+@benchmark("calculator.render.full", test_environment=True)
+def _calculator_render_full():
+    return _calculator_render(page_cache=False)
+
+
+@benchmark("calculator.render.page_cache", test_environment=True)
+def _calculator_render_cached():
+    return _calculator_render(page_cache=True)
+
+
+def _seed_products(count: int) -> List[int]:
+    """Ids of ``count`` products with delivery options, creating the missing ones."""
+    from orders.catalog import clear_product_catalog
+    from orders.delivery import invalidate_delivery_table
+    from orders.models import Logistics, Product
+
+    existing = Product.objects.count()
+    if existing < count:
+        products = Product.objects.bulk_create(
+            [
+                Product(name=f"Товар {index}", description="", price=Decimal("99.90"), stock=10**9)
+                for index in range(existing, count)
+            ]
+        )
+        Logistics.objects.bulk_create(
+            [
+                Logistics(product=product, delivery_cost=Decimal(cost), estimated_delivery_time=days)
+                for product in products
+                for cost, days in (("300.00", 5), ("750.00", 1))
+            ]
+        )
+        # bulk_create sends no signals
+        invalidate_delivery_table()
+        clear_product_catalog()
+    return list(Product.objects.order_by("id").values_list("id", flat=True)[:count])
+
+
+def _order_request(path: str, cart_size: int):
+    """POST of a ``cart_size``-line cart to an orders endpoint through the test client."""
+    from django.test import Client
+
+    client = Client()
+    data = {
+        "customer_name": "Бенчмарк",
+        "customer_email": "bench@example.com",
+        "product_ids": _seed_products(cart_size),
+        "quantities": ["1"] * cart_size,
+    }
+
+    def run():
+        response = client.post(path, data)
+        assert response.status_code == 200, response.content
+
+    return run, 1
+
+
+for _endpoint in ("calculate_order", "create_order"):
+    for _cart_size in CART_SIZES:
+        benchmark(f"orders.{_endpoint}.{_cart_size}", test_environment=True)(
+            partial(_order_request, f"/orders/{_endpoint.split('_')[0]}/", _cart_size)
+        )
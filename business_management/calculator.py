@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Dict, List
+
+SALES_PER_DAY_RANGE = range(1, 11)
+PROFITABILITY_MARGINS = range(10, 85, 5)
+
+
+def build_sales_breakdown(daily_profit_target: Decimal, days_in_month: int) -> List[Dict]:
+    sales_breakdown = []
+    for sales_per_day in SALES_PER_DAY_RANGE:
+        profit_per_sale = daily_profit_target / Decimal(sales_per_day)
+        monthly_sales = sales_per_day * days_in_month
+        yearly_sales = monthly_sales * 12
+        sales_breakdown.append(
+            {
+                "sales_per_day": sales_per_day,
+                "profit_per_sale": profit_per_sale,
+                "monthly_sales": monthly_sales,
+                "yearly_sales": yearly_sales,
+            }
+        )
+    return sales_breakdown
+
+
+def build_profitability_rows(monthly_profit: Decimal) -> List[Dict]:
+    profitability_rows = []
+    for margin in PROFITABILITY_MARGINS:
+        margin_decimal = Decimal(margin) / Decimal(100)
+        monthly_revenue = monthly_profit / margin_decimal
+        yearly_revenue = monthly_revenue * Decimal(12)
+        profitability_rows.append(
+            {
+                "margin": margin,
+                "monthly_revenue": monthly_revenue,
+                "yearly_revenue": yearly_revenue,
+            }
+        )
+    return profitability_rows
@@ -0,0 +1,107 @@
+"""SQLite tuning for the database profile picked by ``DATABASE_PROFILE``.
+
+``settings.DATABASE_PROFILES`` maps a profile name to the connection lifetime, the
+pragmas run on every new SQLite connection and the number of retries for write
+transactions that find the database locked. The ``production`` profile turns on WAL,
+so readers no longer block the writer, and keeps connections open between requests.
+
+Even in WAL mode SQLite admits one writer at a time, and a transaction that read a
+snapshot older than the last commit cannot start writing: SQLite reports "database is
+locked" at once instead of waiting ``busy_timeout``. ``retry_on_busy`` reruns such
+transactions from the start with a jittered exponential backoff.
+"""
+from __future__ import annotations
+
+import functools
+import random
+import threading
+import time
+from typing import Dict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+DEFAULT_PROFILE = {"CONN_MAX_AGE": 0, "SQLITE_PRAGMAS": {}, "BUSY_RETRIES": 0}
+RETRY_DELAY = 0.01
+MAX_RETRY_DELAY = 0.5
+
+_stats_lock = threading.Lock()
+_stats = {"retries": 0, "gave_up": 0}
+
+
+def database_profile() -> Dict:
+    profiles = getattr(settings, "DATABASE_PROFILES", {})
+    name = getattr(settings, "DATABASE_PROFILE", None)
+    if name is None:
+        return DEFAULT_PROFILE
+    try:
+        return profiles[name]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown DATABASE_PROFILE {name!r}; valid profiles: {', '.join(sorted(profiles))}")
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """``connection_created`` receiver: run the profile's pragmas on new SQLite connections."""
+    if connection.vendor != "sqlite":
+        return
+    # straight on the driver connection, so the pragmas stay out of query logs and counts
+    for name, value in database_profile().get("SQLITE_PRAGMAS", {}).items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+def is_busy_error(exc: Exception) -> bool:
+    """Whether ``exc`` is SQLite's SQLITE_BUSY or one of its "is locked" errors."""
+    # Django re-raises the driver's error, which carries the result code from Python 3.11
+    error_name = getattr(exc.__cause__ or exc, "sqlite_errorname", "")
+    if error_name.startswith("SQLITE_BUSY"):
+        return True
+    message = str(exc).lower()
+    return "database is locked" in message or "database table is locked" in message
+
+
+def retry_on_busy(func=None, *, using: str = DEFAULT_DB_ALIAS):
+    """Rerun ``func`` when it fails with "database is locked".
+
+    ``func`` must run its writes in its own transaction, so that a failed attempt leaves
+    nothing behind. Inside an outer transaction the error is raised as is: only the
+    outermost transaction can be retried, by a caller wrapped the same way.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            retries = database_profile().get("BUSY_RETRIES", 0)
+            connection = connections[using]
+            for attempt in range(retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as exc:
+                    if connection.in_atomic_block or not is_busy_error(exc):
+                        raise
+                    if attempt == retries:
+                        if retries:
+                            _count("gave_up")
+                        raise
+                _count("retries")
+                time.sleep(min(RETRY_DELAY * 2**attempt, MAX_RETRY_DELAY) * random.uniform(0.5, 1.5))
+
+        return wrapper
+
+    return decorator if func is None else decorator(func)
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_busy_retry_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_busy_retry_stats() -> None:
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
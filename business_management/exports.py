@@ -0,0 +1,134 @@
+"""XLSX export of the business calculator for a range of monthly profits.
+
+The workbook is written with openpyxl's write-only mode, row by row, so only the
+current row is kept in memory. All sheets share one regulatory snapshot and one
+``build_projection_grid`` pass over the requested profits.
+
+Serializing a cell is the dominant cost, so the sales and profitability sheets are
+pivoted to one row per profit: the calculator's sales counts depend only on the number
+of days and are written once, in the header rows, instead of being repeated per profit.
+"""
+from __future__ import annotations
+
+import tempfile
+from decimal import Decimal
+from typing import Sequence
+
+from openpyxl import Workbook
+
+from .calculator import PROFITABILITY_MARGINS, SALES_PER_DAY_RANGE, build_profitability_rows, build_sales_breakdown
+from .projections import build_grid_tax_rows, build_projection_grid
+from .regulations import RegulatorySnapshot
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+PARAMETER_COLUMNS = (
+    "Прибыль от",
+    "Прибыль до",
+    "Сценариев",
+    "Маржинальность, %",
+    "Дней в месяце",
+    "Данные проверены",
+)
+TAX_COLUMNS = (
+    "Прибыль в месяц",
+    "ОПФ",
+    "Налоговый режим",
+    "Код",
+    "Ставка, %",
+    "Выручка в день",
+    "Выручка в месяц",
+    "Выручка в год",
+    "Налог в день",
+    "Налог в месяц",
+    "Налог в год",
+)
+
+
+def write_calculator_workbook(
+    fileobj,
+    snapshot: RegulatorySnapshot,
+    monthly_profits: Sequence[Decimal],
+    margin_percent: Decimal,
+    days_in_month: int,
+) -> None:
+    count = len(monthly_profits)
+    grid = build_projection_grid(monthly_profits, [margin_percent] * count, [days_in_month] * count, snapshot)
+    opf_tax_codes = [(opf, snapshot.get_available_tax_codes(opf.get("code"))) for opf in snapshot.opf]
+
+    workbook = Workbook(write_only=True)
+
+    sheet = workbook.create_sheet(title="Параметры")
+    sheet.append(PARAMETER_COLUMNS)
+    sheet.append(
+        (
+            min(grid.monthly_profit),
+            max(grid.monthly_profit),
+            count,
+            margin_percent,
+            days_in_month,
+            snapshot.checked_at,
+        )
+    )
+
+    sales = workbook.create_sheet(title="Продажи")
+    sales.append(("Продаж в день", *SALES_PER_DAY_RANGE))
+    sales.append(("Продаж в месяц", *(count * days_in_month for count in SALES_PER_DAY_RANGE)))
+    sales.append(("Продаж в год", *(count * days_in_month * 12 for count in SALES_PER_DAY_RANGE)))
+    sales.append(("Прибыль в месяц", *("Прибыль с продажи",) * len(SALES_PER_DAY_RANGE)))
+
+    profitability = workbook.create_sheet(title="Рентабельность")
+    profitability.append(("Маржинальность, %", *(margin for margin in PROFITABILITY_MARGINS for _ in range(2))))
+    profitability.append(("Прибыль в месяц", *("Выручка в месяц", "Выручка в год") * len(PROFITABILITY_MARGINS)))
+
+    taxes = workbook.create_sheet(title="Налоги")
+    taxes.append(TAX_COLUMNS)
+
+    for index, monthly_profit in enumerate(grid.monthly_profit):
+        sales.append(
+            (
+                monthly_profit,
+                *(row["profit_per_sale"] for row in build_sales_breakdown(grid.daily_net_profit[index], days_in_month)),
+            )
+        )
+        profitability.append(
+            (
+                monthly_profit,
+                *(
+                    value
+                    for row in build_profitability_rows(monthly_profit)
+                    for value in (row["monthly_revenue"], row["yearly_revenue"])
+                ),
+            )
+        )
+        for opf, tax_codes in opf_tax_codes:
+            for row in build_grid_tax_rows(grid, index, tax_codes, snapshot):
+                taxes.append(
+                    (
+                        monthly_profit,
+                        opf.get("title"),
+                        row["title"],
+                        row["code"],
+                        row["rate_percent"],
+                        row["daily_revenue"],
+                        row["monthly_revenue"],
+                        row["yearly_revenue"],
+                        row["tax_daily"],
+                        row["tax_monthly"],
+                        row["tax_yearly"],
+                    )
+                )
+
+    workbook.save(fileobj)
+
+
+def build_calculator_workbook_file(snapshot, monthly_profits, margin_percent, days_in_month):
+    """Write the workbook to an anonymous temporary file, rewound for streaming."""
+    fileobj = tempfile.TemporaryFile()
+    try:
+        write_calculator_workbook(fileobj, snapshot, monthly_profits, margin_percent, days_in_month)
+    except BaseException:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj
@@ -1,15 +1,23 @@
-import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
 from business_management.regulations import (
     DEFAULT_REGULATORY_DATA,
+    append_regulatory_history,
     get_regulatory_cache_path,
+    read_regulatory_payload,
+    write_regulatory_payload,
 )
 
+SECTIONS = ("opf", "tax_systems")
+REQUEST_TIMEOUT = 30
+
 
 class Command(BaseCommand):
     help = (
@@ -23,6 +31,16 @@ class Command(BaseCommand):
             action="store_true",
             help="Не выводить диагностические сообщения, только ошибки",
         )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Скачать источники целиком, не отправляя If-None-Match/If-Modified-Since",
+        )
+        parser.add_argument(
+            "--effective-from",
+            type=self._parse_date,
+            help="Дата вступления правил в силу (ГГГГ-ММ-ДД) для истории версий; по умолчанию сегодня",
+        )
 
     def handle(self, *args, **options):
         sources = getattr(settings, "REGULATORY_SOURCES", {})
@@ -30,35 +48,95 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("REGULATORY_SOURCES не настроены"))
             return
 
-        opf_data = self._fetch_json(sources.get("opf"))
-        tax_data = self._fetch_json(sources.get("tax_systems"))
-
-        snapshot = {
-            "checked_at": timezone.now().isoformat(),
-            "sources": sources,
-            "opf": self._extract_opf(opf_data),
-            "tax_systems": self._extract_tax_systems(tax_data),
-        }
-
         cache_path = get_regulatory_cache_path()
-        cache_path.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2), encoding="utf-8")
+        previous = {} if options.get("force") else read_regulatory_payload(cache_path) or {}
+        extractors = {"opf": self._extract_opf, "tax_systems": self._extract_tax_systems}
+
+        with self._session() as session, ThreadPoolExecutor(max_workers=len(SECTIONS)) as pool:
+            futures = {
+                name: pool.submit(self._fetch_json, session, sources.get(name), self._previous_validators(previous, name))
+                for name in SECTIONS
+            }
+            try:
+                results = {name: future.result() for name, future in futures.items()}
+            except requests.RequestException as exc:
+                raise CommandError(f"Не удалось загрузить справочники, кэш не изменён: {exc}")
+
+        snapshot = {"checked_at": timezone.now().isoformat(), "sources": sources, "validators": {}}
+        unchanged = []
+        for name in SECTIONS:
+            not_modified, payload, validators = results[name]
+            if not_modified:
+                snapshot[name] = previous[name]
+                unchanged.append(name)
+            else:
+                snapshot[name] = extractors[name](payload)
+            if validators:
+                snapshot["validators"][name] = validators
+
+        write_regulatory_payload(snapshot, cache_path)
+        content_hash = append_regulatory_history(snapshot, effective_from=options.get("effective_from"))
 
         if not options.get("quiet"):
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"Кэш обновлён ({len(snapshot['opf'])} ОПФ, {len(snapshot['tax_systems'])} налоговых режимов)"
-                )
-            )
+            message = f"Кэш обновлён ({len(snapshot['opf'])} ОПФ, {len(snapshot['tax_systems'])} налоговых режимов)"
+            if unchanged:
+                message += f"; без изменений: {', '.join(unchanged)}"
+            if content_hash:
+                message += f"; в историю добавлена версия {content_hash[:12]}"
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def _parse_date(self, value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Некорректная дата: {value}, ожидается ГГГГ-ММ-ДД")
+
+    def _session(self):
+        """Session whose connection pool lets both sources be downloaded at once."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=len(SECTIONS))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _previous_validators(self, previous, name):
+        """Validators of the last download, if its section can be reused on 304."""
+        validators = (previous.get("validators") or {}).get(name)
+        if not validators or name not in previous:
+            return None
+        return validators
+
+    def _fetch_json(self, session, url, validators=None):
+        """Return ``(not_modified, payload, validators)`` for one source.
 
-    def _fetch_json(self, url: str):
+        ``validators`` from the previous download are only sent for the same URL. New
+        validators are kept only when the body is valid JSON, so a broken response is
+        downloaded again next time instead of being answered with 304.
+        """
         if not url:
-            return None
-        resp = requests.get(url, timeout=30)
+            return False, None, None
+        headers = {}
+        if validators and validators.get("url") == url:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        resp = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if resp.status_code == 304 and headers:
+            return True, None, validators
         resp.raise_for_status()
         try:
-            return resp.json()
+            payload = resp.json()
         except ValueError:
-            return None
+            return False, None, None
+
+        validators = {"url": url}
+        if resp.headers.get("ETag"):
+            validators["etag"] = resp.headers["ETag"]
+        if resp.headers.get("Last-Modified"):
+            validators["last_modified"] = resp.headers["Last-Modified"]
+        return False, payload, validators if len(validators) > 1 else None
 
     def _extract_opf(self, payload):
         if not payload:
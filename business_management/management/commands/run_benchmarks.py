@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from business_management.benchmarks import (
+    DEFAULT_MIN_TIME,
+    DEFAULT_REGRESSION_THRESHOLD,
+    DEFAULT_REPEAT,
+    compare_results,
+    dump_results,
+    load_results,
+    run_benchmarks,
+    select_benchmarks,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает микробенчмарки и выводит время одной операции в микросекундах. "
+        "Результаты можно сохранить в JSON и сравнить с сохранённым эталоном."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names",
+            nargs="*",
+            help="Префиксы имён бенчмарков, например formatting; по умолчанию запускаются все",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=DEFAULT_REPEAT,
+            help=f"Количество замеров каждого бенчмарка (по умолчанию {DEFAULT_REPEAT})",
+        )
+        parser.add_argument(
+            "--min-time",
+            type=float,
+            default=DEFAULT_MIN_TIME,
+            help=f"Минимальная длительность одного замера в секундах (по умолчанию {DEFAULT_MIN_TIME})",
+        )
+        parser.add_argument("--list", action="store_true", help="Показать доступные бенчмарки и выйти")
+        parser.add_argument("--output", type=Path, help="Сохранить результаты в JSON-файл")
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            metavar="BASELINE",
+            help="JSON-файл с эталонными результатами (из --output) для поиска регрессий",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_REGRESSION_THRESHOLD * 100,
+            help=(
+                "Допустимое замедление относительно эталона в процентах "
+                f"(по умолчанию {DEFAULT_REGRESSION_THRESHOLD * 100:g})"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        names = select_benchmarks(options["names"])
+        if not names:
+            raise CommandError("Нет бенчмарков с такими именами")
+        if options["list"]:
+            self.stdout.write("\n".join(names))
+            return
+        if options["repeat"] <= 0 or options["min_time"] <= 0:
+            raise CommandError("--repeat и --min-time должны быть положительными")
+        if options["threshold"] < 0:
+            raise CommandError("--threshold не может быть отрицательным")
+
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = load_results(options["compare"])
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                raise CommandError(f"Не удалось прочитать эталон {options['compare']}: {exc}")
+
+        results = run_benchmarks(names, repeat=options["repeat"], min_time=options["min_time"])
+        comparisons = {item.name: item for item in compare_results(results, baseline or {})}
+        threshold = options["threshold"] / 100
+
+        width = max(len(name) for name in names) + 2
+        header = f"{'Бенчмарк':<{width}}{'лучшее, мкс':>14}{'медиана, мкс':>14}"
+        if baseline is not None:
+            header += f"{'к эталону':>12}"
+        self.stdout.write(header)
+        for result in results:
+            line = f"{result.name:<{width}}{result.best_us:>14.3f}{result.median_us:>14.3f}"
+            comparison = comparisons.get(result.name)
+            if comparison is not None:
+                line += f"{comparison.change:>+12.1%}"
+                if comparison.is_regression(threshold):
+                    line = self.style.ERROR(line + "  регрессия")
+            self.stdout.write(line)
+
+        if options["output"]:
+            options["output"].write_text(
+                json.dumps(dump_results(results), ensure_ascii=False, indent=2), encoding="utf-8"
+            )
+
+        regressions = [item.name for item in comparisons.values() if item.is_regression(threshold)]
+        if regressions:
+            raise CommandError(f"Медленнее эталона более чем на {options['threshold']:g}%: {', '.join(regressions)}")
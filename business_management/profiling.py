@@ -0,0 +1,241 @@
+"""Opt-in request instrumentation.
+
+``ProfilingMiddleware`` records, per view, the wall time, the number and duration of
+database queries, the template render time and regulatory snapshot cache outcomes, and
+aggregates them into in-process histograms served by ``request_metrics``. A request
+can also be run under ``cProfile``: staff users ask for it with the
+``X-Profile-Request`` header, and ``REQUEST_PROFILING_SAMPLE_RATE = N`` profiles one
+request in ``N`` at random. Dumps are written to ``REQUEST_PROFILING_DIR``.
+
+With ``REQUEST_PROFILING_ENABLED = False`` the middleware removes itself from the chain
+by raising ``MiddlewareNotUsed``; the template backend then only pays for one
+context variable lookup per render.
+"""
+from __future__ import annotations
+
+import bisect
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+from .regulations import snapshot_cache_event
+
+PROFILE_HEADER = "X-Profile-Request"
+PROFILE_DUMP_HEADER = "X-Profile-Dump"
+
+TIME_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SNAPSHOT_CACHE_OUTCOMES = ("hit", "miss", "reload")
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+# cProfile allows only one active profiler per process on newer Pythons
+_cprofile_lock = threading.Lock()
+
+
+class Histogram:
+    """Counts of observations per upper bound, in the spirit of Prometheus histograms."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> Dict:
+        """Cumulative bucket counts keyed by upper bound, as ``le`` buckets are."""
+        buckets = []
+        total = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            total += count
+            buckets.append({"le": bound, "count": total})
+        return {"count": self.count, "sum": round(self.sum, 3), "buckets": buckets}
+
+
+class _ViewMetrics:
+    __slots__ = ("wall_ms", "db_ms", "db_queries", "template_ms", "snapshot_cache")
+
+    def __init__(self):
+        self.wall_ms = Histogram(TIME_BUCKETS_MS)
+        self.db_ms = Histogram(TIME_BUCKETS_MS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.template_ms = Histogram(TIME_BUCKETS_MS)
+        self.snapshot_cache = dict.fromkeys(SNAPSHOT_CACHE_OUTCOMES, 0)
+
+    def as_dict(self) -> Dict:
+        return {
+            "requests": self.wall_ms.count,
+            "wall_ms": self.wall_ms.as_dict(),
+            "db_queries": self.db_queries.as_dict(),
+            "db_ms": self.db_ms.as_dict(),
+            "template_ms": self.template_ms.as_dict(),
+            "snapshot_cache": dict(self.snapshot_cache),
+        }
+
+
+class RequestProfile:
+    """Measurements of the request being served."""
+
+    __slots__ = ("queries", "query_time", "template_time", "snapshot_cache")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.snapshot_cache = dict.fromkeys(SNAPSHOT_CACHE_OUTCOMES, 0)
+
+    def __call__(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook timing every query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: Dict[str, _ViewMetrics] = {}
+
+    def record(self, view_name: str, wall_time: float, profile: RequestProfile) -> None:
+        with self._lock:
+            metrics = self._views.get(view_name)
+            if metrics is None:
+                metrics = self._views[view_name] = _ViewMetrics()
+            metrics.wall_ms.observe(wall_time * 1000)
+            metrics.db_queries.observe(profile.queries)
+            metrics.db_ms.observe(profile.query_time * 1000)
+            metrics.template_ms.observe(profile.template_time * 1000)
+            for outcome, count in profile.snapshot_cache.items():
+                metrics.snapshot_cache[outcome] += count
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: metrics.as_dict() for name, metrics in sorted(self._views.items())}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+def get_request_metrics() -> Dict[str, Dict]:
+    return registry.snapshot()
+
+
+def reset_request_metrics() -> None:
+    registry.clear()
+
+
+def _record_snapshot_cache_event(sender, outcome, **kwargs):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.snapshot_cache[outcome] += 1
+
+
+class _TimedTemplate:
+    """Template wrapper adding its top-level render time to the current profile."""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return self._template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - start
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """``DjangoTemplates`` whose renders are timed while a request is profiled."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "REQUEST_PROFILING_SAMPLE_RATE", 0)
+        snapshot_cache_event.connect(_record_snapshot_cache_event, dispatch_uid="request_profiling")
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        profiler = self._start_profiler(request)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            wall_time = time.perf_counter() - start
+            _current_profile.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                _cprofile_lock.release()
+
+        view_name = self._view_name(request)
+        registry.record(view_name, wall_time, profile)
+        if profiler is not None:
+            response[PROFILE_DUMP_HEADER] = self._dump(profiler, view_name).name
+        return response
+
+    def _start_profiler(self, request) -> Optional[cProfile.Profile]:
+        requested = PROFILE_HEADER in request.headers and getattr(request, "user", None) is not None and request.user.is_staff
+        sampled = self.sample_rate > 0 and random.randrange(self.sample_rate) == 0
+        if not (requested or sampled) or not _cprofile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    @staticmethod
+    def _view_name(request) -> str:
+        match = getattr(request, "resolver_match", None)
+        return match.view_name if match is not None else "<unresolved>"
+
+    @staticmethod
+    def _dump(profiler: cProfile.Profile, view_name: str) -> Path:
+        """Write ``profiler`` stats for ``pstats``/snakeviz and return the file path."""
+        directory = Path(getattr(settings, "REQUEST_PROFILING_DIR", Path(settings.BASE_DIR) / "profiles"))
+        directory.mkdir(parents=True, exist_ok=True)
+        safe_name = re.sub(r"[^\w.-]+", "_", view_name)
+        path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{os.getpid()}-{time.perf_counter_ns()}.prof"
+        profiler.dump_stats(path)
+        return path
@@ -0,0 +1,254 @@
+"""Batched tax projections over many calculator scenarios at once.
+
+A scenario is a ``(monthly_profit, margin_percent, days_in_month)`` triple, the same
+inputs ``business_calculator`` reads from the query string. The grid engine derives the
+daily bases for every scenario and then evaluates ``build_tax_projection`` for each tax
+system column by column, instead of building one dict per scenario and tax system.
+
+Two modes are available:
+
+* ``"decimal"`` repeats the exact ``Decimal`` arithmetic of ``build_tax_projection``,
+  so every value is identical to the scalar path;
+* ``"float"`` evaluates the same formulas on float64 NumPy arrays. It is meant for
+  large sweeps where a relative error around 1e-12 is acceptable.
+"""
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .regulations import RegulatorySnapshot, resolve_tax_parameters
+
+PROJECTION_FIELDS = (
+    "rate",
+    "rate_percent",
+    "tax_daily",
+    "daily_revenue",
+    "monthly_revenue",
+    "yearly_revenue",
+    "tax_monthly",
+    "tax_yearly",
+)
+GRID_MODES = ("decimal", "float")
+
+_HUNDRED = Decimal("100")
+_ONE = Decimal("1")
+_TWELVE = Decimal(12)
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise ImproperlyConfigured("NumPy is required for mode='float' projection grids.") from exc
+    return numpy
+
+
+@dataclass(frozen=True)
+class ProjectionGrid:
+    """Column-oriented result of ``build_projection_grid``.
+
+    ``tax_columns[code][field]`` holds one value per scenario, in input order, for every
+    field listed in ``PROJECTION_FIELDS``. In float mode all columns are NumPy arrays.
+    """
+
+    mode: str
+    monthly_profit: Sequence
+    margin_percent: Sequence
+    days_in_month: Sequence
+    daily_net_profit: Sequence
+    daily_operational_cost: Sequence
+    tax_columns: Mapping[str, Mapping[str, Sequence]]
+
+    def __len__(self) -> int:
+        return len(self.days_in_month)
+
+    def row(self, index: int, code: str) -> Dict:
+        """Projection of a single scenario in the ``build_tax_projection`` shape."""
+        columns = self.tax_columns[code]
+        return {name: columns[name][index] for name in PROJECTION_FIELDS}
+
+
+def expand_scenarios(
+    monthly_profits: Iterable,
+    margin_percents: Iterable,
+    days_in_month: Iterable,
+) -> Tuple[list, list, list]:
+    """Cartesian product of the parameter ranges as three parallel lists."""
+    combinations = list(itertools.product(monthly_profits, margin_percents, days_in_month))
+    if not combinations:
+        return [], [], []
+    profits, margins, days = zip(*combinations)
+    return list(profits), list(margins), list(days)
+
+
+def derive_daily_bases(monthly_profit: Decimal, margin_percent: Decimal, days_in_month: int) -> Tuple[Decimal, Decimal]:
+    """Daily net profit target and daily operational cost for one scenario."""
+    margin_ratio = margin_percent / _HUNDRED
+    daily_profit_target = monthly_profit / Decimal(days_in_month)
+    monthly_operational_cost = monthly_profit * ((_ONE / margin_ratio) - _ONE)
+    return daily_profit_target, monthly_operational_cost / Decimal(days_in_month)
+
+
+def build_projection_grid(
+    monthly_profit: Sequence,
+    margin_percent: Sequence,
+    days_in_month: Sequence,
+    snapshot: RegulatorySnapshot,
+    tax_system_codes: Optional[Iterable[str]] = None,
+    mode: str = "decimal",
+) -> ProjectionGrid:
+    """Project every scenario under every tax system in a single pass.
+
+    The three input sequences are parallel and must have the same length; use
+    ``expand_scenarios`` to build them from ranges. Inputs are expected to be already
+    normalized (positive profit and days, margin within ``(0, 100)``), as done by the
+    calculator's parameter parsers. Unknown tax codes are skipped, like in
+    ``build_tax_rows``.
+    """
+    if mode not in GRID_MODES:
+        raise ValueError(f"Unknown projection grid mode: {mode!r}")
+    if not len(monthly_profit) == len(margin_percent) == len(days_in_month):
+        raise ValueError("Scenario columns must have the same length")
+
+    if tax_system_codes is None:
+        tax_system_codes = snapshot.tax_systems.keys()
+    tax_parameters = {}
+    for code in tax_system_codes:
+        info = snapshot.get_tax_system(code)
+        if info and code not in tax_parameters:
+            tax_parameters[code] = resolve_tax_parameters(info)
+
+    if mode == "float":
+        return _build_float_grid(monthly_profit, margin_percent, days_in_month, tax_parameters)
+    return _build_decimal_grid(monthly_profit, margin_percent, days_in_month, tax_parameters)
+
+
+def build_grid_tax_rows(
+    grid: ProjectionGrid,
+    index: int,
+    tax_system_codes: Iterable[str],
+    snapshot: RegulatorySnapshot,
+) -> List[Dict]:
+    """``build_tax_rows`` for one scenario of a precomputed grid."""
+    rows = []
+    for code in tax_system_codes:
+        columns = grid.tax_columns.get(code)
+        if columns is None:
+            continue
+        info = snapshot.get_tax_system(code)
+        row = {
+            "code": code,
+            "title": info.get("title", code),
+            "law_reference": info.get("law_reference"),
+            "source_url": info.get("source_url"),
+            "note": info.get("note"),
+        }
+        for name in PROJECTION_FIELDS:
+            row[name] = columns[name][index]
+        rows.append(row)
+    return rows
+
+
+def _build_decimal_grid(monthly_profit, margin_percent, days_in_month, tax_parameters) -> ProjectionGrid:
+    profits = [value if isinstance(value, Decimal) else Decimal(str(value)) for value in monthly_profit]
+    margins = [value if isinstance(value, Decimal) else Decimal(str(value)) for value in margin_percent]
+    days = [int(value) for value in days_in_month]
+    days_decimal = [Decimal(value) for value in days]
+
+    daily_net_profit = []
+    daily_operational_cost = []
+    for profit, margin, day_count in zip(profits, margins, days):
+        net_profit, operational_cost = derive_daily_bases(profit, margin, day_count)
+        daily_net_profit.append(net_profit)
+        daily_operational_cost.append(operational_cost)
+
+    count = len(days)
+    tax_columns = {}
+    for code, (rate, revenue_based, divisor) in tax_parameters.items():
+        if revenue_based:
+            daily_revenue = [
+                (net_profit + operational_cost) / divisor
+                for net_profit, operational_cost in zip(daily_net_profit, daily_operational_cost)
+            ]
+            tax_daily = [revenue * rate for revenue in daily_revenue]
+        else:
+            profit_before_tax = [net_profit / divisor for net_profit in daily_net_profit]
+            daily_revenue = [
+                operational_cost + profit for operational_cost, profit in zip(daily_operational_cost, profit_before_tax)
+            ]
+            tax_daily = [profit * rate for profit in profit_before_tax]
+
+        monthly_revenue = [revenue * day_count for revenue, day_count in zip(daily_revenue, days_decimal)]
+        tax_monthly = [tax * day_count for tax, day_count in zip(tax_daily, days_decimal)]
+        tax_columns[code] = {
+            "rate": [rate] * count,
+            "rate_percent": [rate * _HUNDRED] * count,
+            "tax_daily": tax_daily,
+            "daily_revenue": daily_revenue,
+            "monthly_revenue": monthly_revenue,
+            "yearly_revenue": [revenue * _TWELVE for revenue in monthly_revenue],
+            "tax_monthly": tax_monthly,
+            "tax_yearly": [tax * _TWELVE for tax in tax_monthly],
+        }
+
+    return ProjectionGrid(
+        mode="decimal",
+        monthly_profit=profits,
+        margin_percent=margins,
+        days_in_month=days,
+        daily_net_profit=daily_net_profit,
+        daily_operational_cost=daily_operational_cost,
+        tax_columns=tax_columns,
+    )
+
+
+def _build_float_grid(monthly_profit, margin_percent, days_in_month, tax_parameters) -> ProjectionGrid:
+    np = _import_numpy()
+    profits = np.asarray(monthly_profit, dtype=np.float64)
+    margins = np.asarray(margin_percent, dtype=np.float64)
+    days = np.asarray(days_in_month, dtype=np.int64)
+    days_float = days.astype(np.float64)
+
+    daily_net_profit = profits / days_float
+    daily_operational_cost = profits * (100.0 / margins - 1.0) / days_float
+
+    count = len(days)
+    tax_columns = {}
+    for code, (rate, revenue_based, divisor) in tax_parameters.items():
+        rate_value = float(rate)
+        divisor_value = float(divisor)
+        if revenue_based:
+            daily_revenue = (daily_net_profit + daily_operational_cost) / divisor_value
+            tax_daily = daily_revenue * rate_value
+        else:
+            profit_before_tax = daily_net_profit / divisor_value
+            daily_revenue = daily_operational_cost + profit_before_tax
+            tax_daily = profit_before_tax * rate_value
+
+        monthly_revenue = daily_revenue * days_float
+        tax_monthly = tax_daily * days_float
+        tax_columns[code] = {
+            "rate": np.full(count, rate_value),
+            "rate_percent": np.full(count, rate_value * 100.0),
+            "tax_daily": tax_daily,
+            "daily_revenue": daily_revenue,
+            "monthly_revenue": monthly_revenue,
+            "yearly_revenue": monthly_revenue * 12.0,
+            "tax_monthly": tax_monthly,
+            "tax_yearly": tax_monthly * 12.0,
+        }
+
+    return ProjectionGrid(
+        mode="float",
+        monthly_profit=profits,
+        margin_percent=margins,
+        days_in_month=days,
+        daily_net_profit=daily_net_profit,
+        daily_operational_cost=daily_operational_cost,
+        tax_columns=tax_columns,
+    )
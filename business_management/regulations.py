@@ -1,12 +1,35 @@
 from __future__ import annotations
 
+import bisect
+import hashlib
 import json
-from dataclasses import dataclass
+import os
+import pickle
+import tempfile
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import cached_property
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .lru import LRUCache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+COMPILED_FORMAT = 1
+HISTORY_INDEX_NAME = "index.json"
+DEFAULT_HISTORY_CACHE_SIZE = 8
 
 DEFAULT_REGULATORY_DATA = {
     "checked_at": None,
@@ -83,53 +106,184 @@ DEFAULT_REGULATORY_DATA = {
 }
 
 
-@dataclass
+class FrozenDict(dict):
+    """Read-only ``dict`` that, unlike ``MappingProxyType``, can be pickled."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+def _freeze(value):
+    value_type = type(value)
+    if value_type is str or value_type is FrozenDict or value is None:
+        return value
+    if isinstance(value, Mapping):
+        return FrozenDict({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class _LazyPayload(Mapping):
+    """Read-only payload whose ``lazy`` entries are produced on first access."""
+
+    def __init__(self, base: Mapping, lazy: Dict[str, Callable[[], object]]):
+        self._base = base
+        self._lazy = lazy
+        self._loaded: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        if key in self._base:
+            return self._base[key]
+        if key not in self._lazy:
+            raise KeyError(key)
+        if key not in self._loaded:
+            with self._lock:
+                if key not in self._loaded:
+                    self._loaded[key] = self._lazy[key]()
+        return self._loaded[key]
+
+    def __iter__(self):
+        yield from self._base
+        yield from self._lazy
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._lazy)
+
+    def __repr__(self) -> str:
+        return f"<lazy payload {list(self)!r}>"
+
+
+@dataclass(frozen=True)
+class _OpfIndexes:
+    by_code: Mapping[Optional[str], Mapping]
+    tax_codes: Mapping[Optional[str], Tuple[str, ...]]
+    tax_systems: Mapping[Optional[str], Tuple[Mapping, ...]]
+    allowed_codes: Mapping[Optional[str], frozenset]
+
+
+def _build_opf_indexes(opf: Iterable[Mapping], tax_systems: Mapping[str, Mapping]) -> _OpfIndexes:
+    all_tax_codes = tuple(tax_systems.keys())
+    opf_index = {}
+    opf_tax_codes = {}
+    opf_tax_systems = {}
+    opf_allowed_codes = {}
+    for item in opf:
+        code = item.get("code")
+        if code in opf_index:
+            continue
+        tax_codes = tuple(item.get("tax_systems") or all_tax_codes)
+        resolved = tuple(tax_systems[tax_code] for tax_code in tax_codes if tax_code in tax_systems)
+        opf_index[code] = item
+        opf_tax_codes[code] = tax_codes
+        opf_tax_systems[code] = resolved
+        opf_allowed_codes[code] = frozenset(tax["code"] for tax in resolved)
+    return _OpfIndexes(
+        by_code=FrozenDict(opf_index),
+        tax_codes=FrozenDict(opf_tax_codes),
+        tax_systems=FrozenDict(opf_tax_systems),
+        allowed_codes=FrozenDict(opf_allowed_codes),
+    )
+
+
+def normalize_regulatory_payload(payload: Mapping) -> Dict:
+    normalized = {
+        "checked_at": payload.get("checked_at") or payload.get("fetched_at"),
+        "opf": payload.get("opf") or DEFAULT_REGULATORY_DATA["opf"],
+        "tax_systems": {},
+    }
+
+    raw_tax_systems = payload.get("tax_systems") or payload.get("tax_regimes")
+    if isinstance(raw_tax_systems, dict):
+        source_items = raw_tax_systems.values()
+    else:
+        source_items = raw_tax_systems or []
+
+    for item in source_items:
+        code = item.get("code") or item.get("tax_code") or item.get("id")
+        if not code:
+            continue
+        normalized["tax_systems"][code] = {
+            "code": code,
+            "title": item.get("title") or item.get("name") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("title", code),
+            "effective_rate": str(item.get("effective_rate") or item.get("rate") or item.get("tax_rate") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("effective_rate", "0")),
+            "law_reference": item.get("law_reference") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("law_reference"),
+            "basis": item.get("basis") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("basis", "revenue"),
+            "source_url": item.get("source_url") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("source_url"),
+            "note": item.get("note") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("note"),
+        }
+
+    for code, defaults in DEFAULT_REGULATORY_DATA["tax_systems"].items():
+        normalized["tax_systems"].setdefault(code, defaults)
+
+    normalized.setdefault("default_opf", payload.get("default_opf") or DEFAULT_REGULATORY_DATA["opf"][0]["code"])
+    normalized.setdefault("sources", getattr(settings, "REGULATORY_SOURCES", {}))
+    return normalized
+
+
+def _payload_version(normalized: Mapping) -> str:
+    encoded = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
 class RegulatorySnapshot:
-    payload: Dict
+    """Normalized, read-only view of the regulatory payload.
+
+    The payload is frozen after normalization (mappings become ``FrozenDict`` and
+    lists become tuples), so a single instance can be shared by all threads of a worker.
+    Lookups by OPF code and the tax systems allowed for each OPF are indexed on first use
+    instead of being rescanned on every request. ``version`` is a hash of the normalized
+    payload: it changes whenever the data does, even if ``checked_at`` does not.
+    """
+
+    payload: Mapping
+    version: str = field(init=False, compare=False)
+    _compiled_opf: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        self.payload = self._normalize(self.payload)
+        normalized = normalize_regulatory_payload(self.payload)
+        object.__setattr__(self, "version", _payload_version(normalized))
+        object.__setattr__(self, "payload", _freeze(normalized))
 
-    def _normalize(self, payload: Dict) -> Dict:
-        normalized = {
-            "checked_at": payload.get("checked_at") or payload.get("fetched_at"),
-            "opf": payload.get("opf") or DEFAULT_REGULATORY_DATA["opf"],
-            "tax_systems": {},
-        }
+    @classmethod
+    def from_compiled(cls, data: Mapping) -> "RegulatorySnapshot":
+        """Snapshot from ``compile_regulatory_payload`` output, without re-normalizing.
 
-        raw_tax_systems = payload.get("tax_systems") or payload.get("tax_regimes")
-        if isinstance(raw_tax_systems, dict):
-            source_items = raw_tax_systems.values()
-        else:
-            source_items = raw_tax_systems or []
-
-        for item in source_items:
-            code = item.get("code") or item.get("tax_code") or item.get("id")
-            if not code:
-                continue
-            normalized["tax_systems"][code] = {
-                "code": code,
-                "title": item.get("title") or item.get("name") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("title", code),
-                "effective_rate": str(item.get("effective_rate") or item.get("rate") or item.get("tax_rate") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("effective_rate", "0")),
-                "law_reference": item.get("law_reference") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("law_reference"),
-                "basis": item.get("basis") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("basis", "revenue"),
-                "source_url": item.get("source_url") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("source_url"),
-                "note": item.get("note") or DEFAULT_REGULATORY_DATA["tax_systems"].get(code, {}).get("note"),
-            }
+        The OPF list and its indexes stay pickled until an OPF lookup needs them.
+        """
+        snapshot = cls.__new__(cls)
+        object.__setattr__(snapshot, "version", data["version"])
+        object.__setattr__(snapshot, "_compiled_opf", data["opf"])
+        object.__setattr__(snapshot, "payload", _LazyPayload(data["payload"], {"opf": lambda: snapshot._opf_section[0]}))
+        return snapshot
 
-        for code, defaults in DEFAULT_REGULATORY_DATA["tax_systems"].items():
-            normalized["tax_systems"].setdefault(code, defaults)
+    @cached_property
+    def _opf_section(self) -> Tuple[Tuple[Mapping, ...], _OpfIndexes]:
+        if self._compiled_opf is not None:
+            return pickle.loads(self._compiled_opf)
+        opf = self.payload["opf"]
+        return opf, _build_opf_indexes(opf, self.payload["tax_systems"])
 
-        normalized.setdefault("default_opf", payload.get("default_opf") or DEFAULT_REGULATORY_DATA["opf"][0]["code"])
-        normalized.setdefault("sources", getattr(settings, "REGULATORY_SOURCES", {}))
-        return normalized
+    @property
+    def _opf_indexes(self) -> _OpfIndexes:
+        return self._opf_section[1]
 
     @property
-    def opf(self) -> List[Dict]:
+    def opf(self) -> Tuple[Mapping, ...]:
         return self.payload["opf"]
 
     @property
-    def tax_systems(self) -> Dict[str, Dict]:
+    def tax_systems(self) -> Mapping[str, Mapping]:
         return self.payload["tax_systems"]
 
     @property
@@ -137,24 +291,41 @@ class RegulatorySnapshot:
         return self.payload.get("checked_at")
 
     @property
-    def sources(self) -> Dict:
+    def sources(self) -> Mapping:
         return self.payload.get("sources", {})
 
-    def get_opf(self, code: Optional[str]) -> Dict:
+    def get_opf(self, code: Optional[str]) -> Mapping:
         if not self.opf:
             return {}
         if not code:
             return self.opf[0]
-        for item in self.opf:
-            if item.get("code") == code:
-                return item
-        return self.opf[0]
+        return self._opf_indexes.by_code.get(code, self.opf[0])
 
-    def get_tax_system(self, code: Optional[str]) -> Optional[Dict]:
+    def get_tax_system(self, code: Optional[str]) -> Optional[Mapping]:
         if not code:
             return None
         return self.tax_systems.get(code)
 
+    def get_available_tax_codes(self, opf_code: Optional[str]) -> Tuple[str, ...]:
+        """Tax system codes declared for the OPF, falling back to every known system."""
+        tax_codes = self._opf_indexes.tax_codes
+        if opf_code in tax_codes:
+            return tax_codes[opf_code]
+        return tuple(self.tax_systems.keys())
+
+    def get_available_tax_systems(self, opf_code: Optional[str]) -> Tuple[Mapping, ...]:
+        """Resolved tax systems for the OPF; codes missing from ``tax_systems`` are dropped."""
+        tax_systems = self._opf_indexes.tax_systems
+        if opf_code in tax_systems:
+            return tax_systems[opf_code]
+        return tuple(self.tax_systems.values())
+
+    def is_tax_system_available(self, opf_code: Optional[str], tax_code: Optional[str]) -> bool:
+        allowed_codes = self._opf_indexes.allowed_codes
+        if opf_code in allowed_codes:
+            return tax_code in allowed_codes[opf_code]
+        return tax_code in self.tax_systems
+
 
 def get_regulatory_cache_path() -> Path:
     cache_path = getattr(settings, "REGULATORY_CACHE_FILE", None)
@@ -163,16 +334,340 @@ def get_regulatory_cache_path() -> Path:
     return Path(settings.BASE_DIR) / "regulations_cache.json"
 
 
-def load_regulatory_snapshot() -> RegulatorySnapshot:
-    cache_path = get_regulatory_cache_path()
-    if cache_path.exists():
+def read_regulatory_payload(cache_path: Path) -> Optional[Dict]:
+    """Raw JSON object stored in the cache file, or ``None`` if it is missing or invalid."""
+    try:
+        payload = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def get_compiled_cache_path(cache_path: Path) -> Path:
+    return cache_path.with_suffix(".pickle")
+
+
+def _source_stamp(stat: os.stat_result) -> Tuple[int, int, int]:
+    # every atomic publish creates a new inode, so this also tells apart two rewrites of
+    # the same size within one mtime tick
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def compile_regulatory_payload(payload: Mapping, source_stamp: Tuple[int, int, int]) -> bytes:
+    """Normalized payload in the pickled form read by ``RegulatorySnapshot.from_compiled``.
+
+    ``source_stamp`` identifies the JSON file the payload was written to (inode, size and
+    mtime); the compiled file is only used while the JSON file still matches it.
+    """
+    snapshot = RegulatorySnapshot(payload)
+    base = FrozenDict((key, value) for key, value in snapshot.payload.items() if key != "opf")
+    data = {
+        "format": COMPILED_FORMAT,
+        "source_stamp": tuple(source_stamp),
+        "version": snapshot.version,
+        "payload": base,
+        "opf": pickle.dumps(snapshot._opf_section, protocol=pickle.HIGHEST_PROTOCOL),
+    }
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_compiled_snapshot(cache_path: Path) -> Optional[RegulatorySnapshot]:
+    """Snapshot from the compiled file next to ``cache_path``, if it is current.
+
+    The file is written by ``write_regulatory_payload`` into the project directory and is
+    trusted like the code itself. It is ignored when it is missing, unreadable, of an
+    older format or compiled from a different version of the JSON file.
+    """
+    try:
+        stat = cache_path.stat()
+        data = pickle.loads(get_compiled_cache_path(cache_path).read_bytes())
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("format") != COMPILED_FORMAT:
+        return None
+    if data.get("source_stamp") != _source_stamp(stat):
+        return None
+    return RegulatorySnapshot.from_compiled(data)
+
+
+def read_regulatory_snapshot(cache_path: Path) -> RegulatorySnapshot:
+    """Read the cache, bypassing the in-process snapshot cache.
+
+    The compiled file is preferred; the JSON file is parsed and normalized otherwise.
+    """
+    snapshot = read_compiled_snapshot(cache_path)
+    if snapshot is not None:
+        return snapshot
+    payload = read_regulatory_payload(cache_path)
+    if payload is not None:
+        return RegulatorySnapshot(payload)
+    return RegulatorySnapshot(DEFAULT_REGULATORY_DATA)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write ``data`` to a temporary file next to ``path`` and rename it over ``path``.
+
+    The permissions of the current file are kept (``mkstemp`` would leave the new one
+    readable by its owner only).
+    """
+    try:
+        mode = path.stat().st_mode & 0o777
+    except OSError:
+        mode = 0o644
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_name, mode)
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
         try:
-            payload = json.loads(cache_path.read_text(encoding="utf-8"))
-            if isinstance(payload, dict):
-                return RegulatorySnapshot(payload)
-        except json.JSONDecodeError:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
             pass
-    return RegulatorySnapshot(DEFAULT_REGULATORY_DATA)
+        raise
+
+
+def write_regulatory_payload(payload: Dict, cache_path: Path) -> None:
+    """Publish ``payload`` atomically: readers see either the old file or the new one.
+
+    The JSON file is replaced first, then the compiled file built from the same payload.
+    Until the second rename the compiled file does not match the new JSON and is skipped.
+    """
+    _write_atomic(cache_path, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+    _write_atomic(
+        get_compiled_cache_path(cache_path),
+        compile_regulatory_payload(payload, _source_stamp(cache_path.stat())),
+    )
+
+
+def _cache_file_key(cache_path: Path) -> Tuple:
+    try:
+        stat = cache_path.stat()
+    except OSError:
+        return (str(cache_path), None)
+    return (str(cache_path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+# sent by load_regulatory_snapshot with ``outcome`` set to "hit", "miss" or "reload"
+snapshot_cache_event = Signal()
+
+
+class _SnapshotCache:
+    """Process-wide snapshot holder that re-reads the cache file only when it changes.
+
+    The file is identified by its inode, mtime and size, so a regular request costs a
+    single ``stat`` call. Reloads are serialized by a lock; hits read the current entry
+    without waiting for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry: Optional[Tuple[Tuple, RegulatorySnapshot]] = None
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+
+    def get(self, cache_path: Path) -> RegulatorySnapshot:
+        key = _cache_file_key(cache_path)
+        entry = self._entry
+        if entry is not None and entry[0] == key:
+            with self._lock:
+                self._hits += 1
+            snapshot_cache_event.send(sender=type(self), outcome="hit")
+            return entry[1]
+
+        with self._lock:
+            entry = self._entry
+            if entry is not None and entry[0] == key:
+                self._hits += 1
+                outcome = "hit"
+                snapshot = entry[1]
+            else:
+                self._misses += 1
+                if entry is not None:
+                    self._reloads += 1
+                outcome = "miss" if entry is None else "reload"
+                snapshot = read_regulatory_snapshot(cache_path)
+                self._entry = (key, snapshot)
+        snapshot_cache_event.send(sender=type(self), outcome=outcome)
+        return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entry = None
+            self._hits = 0
+            self._misses = 0
+            self._reloads = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "reloads": self._reloads}
+
+
+_snapshot_cache = _SnapshotCache()
+
+
+def get_regulatory_history_dir() -> Path:
+    history_dir = getattr(settings, "REGULATORY_HISTORY_DIR", None)
+    if history_dir:
+        return Path(history_dir)
+    return Path(settings.BASE_DIR) / "regulations_history"
+
+
+def regulatory_content_hash(payload: Mapping) -> str:
+    """Hash of the normalized payload without ``checked_at``.
+
+    Two refreshes that found the same rules have the same hash, unlike ``version``.
+    """
+    normalized = normalize_regulatory_payload(payload)
+    normalized.pop("checked_at")
+    return _payload_version(normalized)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(value).date()
+
+
+def _read_history_index(history_dir: Path) -> List[Dict]:
+    try:
+        entries = json.loads((history_dir / HISTORY_INDEX_NAME).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return []
+    return entries if isinstance(entries, list) else []
+
+
+@contextmanager
+def _history_lock(history_dir: Path):
+    """Serialize writers of the history index across processes where ``flock`` exists."""
+    with open(history_dir / ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append_regulatory_history(
+    payload: Mapping,
+    effective_from=None,
+    history_dir: Optional[Path] = None,
+) -> Optional[str]:
+    """Record ``payload`` as the rules in force from ``effective_from``.
+
+    ``effective_from`` defaults to the date of ``checked_at``. Each distinct content is
+    stored once, as ``<content hash>.json``, and never rewritten; ``index.json`` is a
+    list of ``effective_from``/``content_hash`` entries sorted by date that only grows.
+    Returns the content hash when a new interval was added, or ``None`` if the same rules
+    were already in force on that date.
+    """
+    history_dir = history_dir or get_regulatory_history_dir()
+    history_dir.mkdir(parents=True, exist_ok=True)
+    if effective_from is None:
+        effective_from = payload.get("checked_at") or timezone.now()
+    day = _as_date(effective_from).isoformat()
+    content_hash = regulatory_content_hash(payload)
+
+    with _history_lock(history_dir):
+        entries = _read_history_index(history_dir)
+        position = bisect.bisect_right([entry["effective_from"] for entry in entries], day)
+        if position and entries[position - 1]["content_hash"] == content_hash:
+            return None
+
+        content_path = history_dir / f"{content_hash}.json"
+        if not content_path.exists():
+            stored = {key: value for key, value in payload.items() if key != "validators"}
+            _write_atomic(content_path, json.dumps(stored, ensure_ascii=False, indent=2).encode("utf-8"))
+        entries.insert(
+            position,
+            {"effective_from": day, "content_hash": content_hash, "recorded_at": timezone.now().isoformat()},
+        )
+        _write_atomic(history_dir / HISTORY_INDEX_NAME, json.dumps(entries, indent=2).encode("utf-8"))
+    return content_hash
+
+
+class _HistoryCache:
+    """Interval index of the snapshot history plus a few parsed versions.
+
+    The index is re-read only when ``index.json`` changes, and turned into parallel lists
+    of dates and hashes for ``bisect``. Parsed snapshots are kept in a small LRU, so
+    looking up many dates does not keep every version in memory.
+    """
+
+    def __init__(self, maxsize: int):
+        self._lock = threading.Lock()
+        self._index: Optional[Tuple[Tuple, List[str], List[str]]] = None
+        self._snapshots = LRUCache(maxsize)
+
+    def _load_index(self, history_dir: Path) -> Tuple[List[str], List[str]]:
+        key = _cache_file_key(history_dir / HISTORY_INDEX_NAME)
+        index = self._index
+        if index is None or index[0] != key:
+            with self._lock:
+                index = self._index
+                if index is None or index[0] != key:
+                    entries = _read_history_index(history_dir)
+                    index = (
+                        key,
+                        [entry["effective_from"] for entry in entries],
+                        [entry["content_hash"] for entry in entries],
+                    )
+                    self._index = index
+        return index[1], index[2]
+
+    def get(self, history_dir: Path, as_of: date) -> Optional[RegulatorySnapshot]:
+        dates, hashes = self._load_index(history_dir)
+        if not hashes:
+            return None
+        # dates before the first entry get the earliest known rules
+        position = max(bisect.bisect_right(dates, as_of.isoformat()) - 1, 0)
+        cache_key = (str(history_dir), hashes[position])
+        snapshot = self._snapshots.get(cache_key)
+        if snapshot is None:
+            payload = read_regulatory_payload(history_dir / f"{hashes[position]}.json")
+            if payload is None:
+                return None
+            snapshot = RegulatorySnapshot(payload)
+            self._snapshots.set(cache_key, snapshot)
+        return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+        self._snapshots.clear()
+
+
+_history_cache = _HistoryCache(getattr(settings, "REGULATORY_HISTORY_CACHE_SIZE", DEFAULT_HISTORY_CACHE_SIZE))
+
+
+def load_regulatory_snapshot(as_of=None) -> RegulatorySnapshot:
+    """Current snapshot, or the one in force on ``as_of`` (a date or ISO date string).
+
+    Dates are resolved against the history written by ``append_regulatory_history``; the
+    current snapshot is returned while the history is empty.
+    """
+    if as_of is not None:
+        snapshot = _history_cache.get(get_regulatory_history_dir(), _as_date(as_of))
+        if snapshot is not None:
+            return snapshot
+    return _snapshot_cache.get(get_regulatory_cache_path())
+
+
+def get_regulatory_snapshot_cache_stats() -> Dict[str, int]:
+    return _snapshot_cache.stats()
+
+
+def clear_regulatory_snapshot_cache() -> None:
+    _snapshot_cache.clear()
+    _history_cache.clear()
 
 
 def _safe_decimal(value: str, default: str = "0") -> Decimal:
@@ -182,14 +677,8 @@ def _safe_decimal(value: str, default: str = "0") -> Decimal:
         return Decimal(default)
 
 
-def build_tax_projection(
-    daily_net_profit: Decimal,
-    daily_operational_cost: Decimal,
-    days_in_month: int,
-    tax_info: Dict,
-) -> Dict:
-    if not tax_info:
-        return {}
+def resolve_tax_parameters(tax_info: Mapping) -> Tuple[Decimal, bool, Decimal]:
+    """Return ``(rate, revenue_based, divisor)`` for a tax system entry."""
     rate = _safe_decimal(tax_info.get("effective_rate"), "0")
     if rate >= Decimal("1"):
         rate = Decimal("0.99")
@@ -198,8 +687,20 @@ def build_tax_projection(
 
     basis = (tax_info.get("basis") or "revenue").lower()
     divisor = Decimal("1") - rate if rate < Decimal("1") else Decimal("0.01")
+    return rate, basis in ("revenue", "patent"), divisor
+
+
+def build_tax_projection(
+    daily_net_profit: Decimal,
+    daily_operational_cost: Decimal,
+    days_in_month: int,
+    tax_info: Dict,
+) -> Dict:
+    if not tax_info:
+        return {}
+    rate, revenue_based, divisor = resolve_tax_parameters(tax_info)
 
-    if basis == "revenue" or basis == "patent":
+    if revenue_based:
         base_without_tax = daily_net_profit + daily_operational_cost
         daily_revenue = base_without_tax / divisor
         tax_daily = daily_revenue * rate
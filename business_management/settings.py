@@ -1,4 +1,8 @@
+import os
 from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-secret'
 DEBUG = True
@@ -14,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.humanize',
     'business_management',
     'orders',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -23,15 +28,17 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'business_management.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'business_management.urls'
 WSGI_APPLICATION = 'business_management.wsgi.application'
+ASGI_APPLICATION = 'business_management.asgi.application'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'business_management.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -48,23 +55,52 @@ TEMPLATES = [
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DATABASE_PATH') or BASE_DIR / 'db.sqlite3',
     }
 }
 
+# DATABASE_PROFILE=production: WAL and pragmas on every connection, persistent
+# connections and retries on "database is locked"; see business_management/database.py
+DATABASE_PROFILES = {
+    'development': {'CONN_MAX_AGE': 0, 'SQLITE_PRAGMAS': {}, 'BUSY_RETRIES': 0},
+    'production': {
+        'CONN_MAX_AGE': 600,
+        'SQLITE_PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000, 'cache_size': -20000},
+        'BUSY_RETRIES': 5,
+    },
+}
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'development')
+if DATABASE_PROFILE not in DATABASE_PROFILES:
+    raise ImproperlyConfigured(
+        f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}; valid profiles: {', '.join(sorted(DATABASE_PROFILES))}"
+    )
+DATABASES['default']['CONN_MAX_AGE'] = DATABASE_PROFILES[DATABASE_PROFILE]['CONN_MAX_AGE']
+DATABASES['default']['CONN_HEALTH_CHECKS'] = DATABASE_PROFILES[DATABASE_PROFILE]['CONN_MAX_AGE'] > 0
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_L10N = True
 USE_TZ = True
 
-STATIC_URL = '/static/'
-import os
-
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # 👈 куда collectstatic положит файлы
 
 REGULATORY_CACHE_FILE = BASE_DIR / 'regulations_cache.json'
+REGULATORY_HISTORY_DIR = BASE_DIR / 'regulations_history'
+
+# Per-view timings and query counts at /metrics/; see business_management/profiling.py
+REQUEST_PROFILING_ENABLED = os.environ.get('REQUEST_PROFILING_ENABLED') == '1'
+REQUEST_PROFILING_SAMPLE_RATE = int(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0'))
+REQUEST_PROFILING_DIR = BASE_DIR / 'profiles'
+
+# Background jobs run by `manage.py run_worker`; see jobs/queue.py
+JOB_FILES_DIR = BASE_DIR / 'job_files'
+# XLSX reports above this many rows are built by the orders.report job
+REPORT_XLSX_MAX_ROWS = 20000
+JOB_SCHEDULES = {
+    'regulatory-refresh': {'task': 'regulations.refresh', 'interval': 24 * 60 * 60},
+}
 REGULATORY_SOURCES = {
     'opf': 'https://www.nalog.gov.ru/opendata/7707329152-spravOKOPF/data-structure-7707329152-spravOKOPF.json',
     'tax_systems': 'https://www.nalog.gov.ru/opendata/7707329152-taxsystem/data-structure-7707329152-taxsystem.json',
@@ -1,4 +1,6 @@
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping
 
 from django import template
 
@@ -11,29 +13,57 @@ def _build_quantize(decimals: int) -> Decimal:
     return Decimal('1').scaleb(-decimals)
 
 
-@register.filter(name='spaced_number')
-def spaced_number(value, decimals=0):
-    """Format numeric values with a space-separated thousands grouping."""
-    if value in (None, ''):
-        return ''
-
+@lru_cache(maxsize=32)
+def _precision(decimals):
+    """Quantizer and format spec for a filter argument such as ``2`` or ``"2"``."""
     try:
         decimals = int(decimals)
     except (TypeError, ValueError):
         decimals = 0
+    return _build_quantize(decimals), f",.{max(decimals, 0)}f"
 
-    try:
-        number = Decimal(str(value))
-    except (InvalidOperation, TypeError, ValueError):
-        return value
 
-    quantize_to = _build_quantize(decimals)
-    number = number.quantize(quantize_to, rounding=ROUND_HALF_UP)
+def _format(value, quantize_to, spec):
+    if value is None or value == '':
+        return ''
 
-    if decimals > 0:
-        formatted = f"{number:,.{decimals}f}"
+    if type(value) is Decimal:
+        number = value
+    elif type(value) is int:
+        number = Decimal(value)
     else:
-        formatted = f"{number:,.0f}"
+        try:
+            number = Decimal(str(value))
+        except (InvalidOperation, TypeError, ValueError):
+            return value
+
+    number = number.quantize(quantize_to, rounding=ROUND_HALF_UP)
+    return format(number, spec).replace(',', ' ')
+
+
+@register.filter(name='spaced_number')
+def spaced_number(value, decimals=0):
+    """Format numeric values with a space-separated thousands grouping."""
+    try:
+        quantize_to, spec = _precision(decimals)
+    except TypeError:  # unhashable argument
+        quantize_to, spec = _precision(0)
+    return _format(value, quantize_to, spec)
+
+
+def spaced_numbers(values: Iterable, decimals=0) -> List:
+    """``spaced_number`` for every value, resolving the precision once."""
+    quantize_to, spec = _precision(decimals)
+    return [_format(value, quantize_to, spec) for value in values]
+
 
-    return formatted.replace(',', ' ')
+def format_rows(rows: Iterable[Mapping], columns: Mapping[str, int]) -> List[Dict]:
+    """Format the ``columns`` of every row; ``columns`` maps a row key to its decimals.
 
+    Returns one dict of formatted strings per row, in the order of ``rows``.
+    """
+    precisions = [(name, *_precision(decimals)) for name, decimals in columns.items()]
+    return [
+        {name: _format(row.get(name), quantize_to, spec) for name, quantize_to, spec in precisions}
+        for row in rows
+    ]
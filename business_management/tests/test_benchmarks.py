@@ -0,0 +1,66 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from business_management import benchmarks
+from orders.models import Order
+
+
+class BenchmarksTest(SimpleTestCase):
+    def test_measure_reports_cost_per_operation(self):
+        result = benchmarks.measure('noop', lambda: None, calls=10, repeat=2, min_time=0.001)
+        self.assertGreater(result.operations, 0)
+        self.assertLessEqual(result.best, result.median)
+        self.assertEqual(result.as_dict()['name'], 'noop')
+
+    def test_command_runs_selected_benchmarks(self):
+        stdout = StringIO()
+        call_command('run_benchmarks', 'formatting.spaced_number', repeat=1, min_time=0.001, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 1 + 3)
+        self.assertTrue(lines[1].startswith('formatting.spaced_number.decimal'))
+
+    def test_command_rejects_unknown_names(self):
+        with self.assertRaises(CommandError):
+            call_command('run_benchmarks', 'missing', stdout=StringIO())
+
+    def test_results_are_saved_and_compared_with_baseline(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        output = Path(tmp_dir.name) / 'results.json'
+        call_command(
+            'run_benchmarks', 'formatting.spaced_number', repeat=1, min_time=0.001, output=output, stdout=StringIO()
+        )
+        saved = json.loads(output.read_text(encoding='utf-8'))
+        self.assertEqual([item['name'] for item in saved['results']][0], 'formatting.spaced_number.decimal')
+
+        baseline = Path(tmp_dir.name) / 'baseline.json'
+        for item in saved['results']:
+            item['best_us'] = item['best_us'] * 1000 if item['name'].endswith('.int') else item['best_us'] / 1000
+        baseline.write_text(json.dumps(saved), encoding='utf-8')
+        stdout = StringIO()
+        with self.assertRaisesMessage(CommandError, 'formatting.spaced_number.decimal, formatting.spaced_number.float'):
+            call_command(
+                'run_benchmarks', 'formatting.spaced_number', repeat=1, min_time=0.001, compare=baseline, stdout=stdout
+            )
+        self.assertEqual(stdout.getvalue().count('регрессия'), 2)
+
+    def test_comparison_threshold(self):
+        comparison = benchmarks.Comparison(name='noop', baseline_us=10.0, current_us=10.5)
+        self.assertAlmostEqual(comparison.change, 0.05)
+        self.assertFalse(comparison.is_regression(0.10))
+        self.assertTrue(comparison.is_regression(0.01))
+
+
+class OrderBenchmarksTest(TestCase):
+    def test_order_benchmarks_post_seeded_carts(self):
+        for name in ('orders.calculate_order.10', 'orders.create_order.10'):
+            func, calls = benchmarks.BENCHMARKS[name]()
+            func()
+        self.assertEqual(Order.objects.get().orderproduct_set.count(), 10)
+        self.assertIn('orders.create_order.1000', benchmarks.TEST_ENVIRONMENT_BENCHMARKS)
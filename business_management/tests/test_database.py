@@ -0,0 +1,105 @@
+import sqlite3
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from business_management import database
+
+
+class RetryOnBusyTest(SimpleTestCase):
+    def setUp(self):
+        database.reset_busy_retry_stats()
+        self.addCleanup(database.reset_busy_retry_stats)
+
+    @override_settings(DATABASE_PROFILE='production')
+    def test_retries_locked_transactions(self):
+        func = mock.Mock(side_effect=[OperationalError('database is locked'), OperationalError('database is locked'), 42])
+        with mock.patch('business_management.database.time.sleep') as sleep:
+            self.assertEqual(database.retry_on_busy(func)(), 42)
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(database.get_busy_retry_stats(), {'retries': 2, 'gave_up': 0})
+
+    @override_settings(DATABASE_PROFILE='production')
+    def test_gives_up_after_the_profile_retries(self):
+        func = mock.Mock(side_effect=OperationalError('database is locked'))
+        with mock.patch('business_management.database.time.sleep'), self.assertRaises(OperationalError):
+            database.retry_on_busy(func)()
+        self.assertEqual(func.call_count, 6)
+        self.assertEqual(database.get_busy_retry_stats(), {'retries': 5, 'gave_up': 1})
+
+    @override_settings(DATABASE_PROFILE='production')
+    def test_does_not_retry_other_errors_or_inner_transactions(self):
+        func = mock.Mock(side_effect=OperationalError('no such table: orders_order'))
+        with self.assertRaises(OperationalError):
+            database.retry_on_busy(func)()
+        self.assertEqual(func.call_count, 1)
+
+        func = mock.Mock(side_effect=OperationalError('database is locked'))
+        with mock.patch.object(connection, 'in_atomic_block', True), self.assertRaises(OperationalError):
+            database.retry_on_busy(func)()
+        self.assertEqual(func.call_count, 1)
+
+    def test_only_locked_errors_count_as_busy(self):
+        self.assertTrue(database.is_busy_error(OperationalError('database is locked')))
+        self.assertTrue(database.is_busy_error(OperationalError('database table is locked: orders_order')))
+        busy = sqlite3.OperationalError('cannot commit transaction')
+        busy.sqlite_errorname = 'SQLITE_BUSY'
+        wrapped = OperationalError('cannot commit transaction')
+        wrapped.__cause__ = busy
+        self.assertTrue(database.is_busy_error(wrapped))
+        self.assertFalse(database.is_busy_error(OperationalError('no such table: busy_hours')))
+
+    @override_settings(DATABASE_PROFILE='prodution')
+    def test_unknown_profile_is_rejected(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'valid profiles: development, production'):
+            database.database_profile()
+
+    def test_development_profile_does_not_retry(self):
+        func = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            database.retry_on_busy(func)()
+        self.assertEqual(func.call_count, 1)
+
+
+class SQLiteConnectionTest(TransactionTestCase):
+    """New connections and worker processes, outside the test transaction."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+
+    def _pragmas(self, profile):
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': str(self.tmp_dir / f'{profile}.sqlite3')})
+        with override_settings(DATABASE_PROFILE=profile):
+            wrapper.ensure_connection()
+        try:
+            return {
+                name: wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size')
+            }
+        finally:
+            wrapper.close()
+
+    def test_production_profile_sets_pragmas_on_new_connections(self):
+        self.assertEqual(
+            self._pragmas('production'),
+            {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'cache_size': -20000},
+        )
+        self.assertEqual(self._pragmas('development')['journal_mode'], 'delete')
+
+    def test_contention_benchmark_compares_profiles(self):
+        stdout = StringIO()
+        call_command('benchmark_write_contention', processes=2, orders=3, products=5, stdout=stdout)
+        rows = {line.split()[0]: line.split()[1:] for line in stdout.getvalue().splitlines()[2:]}
+        self.assertEqual(sorted(rows), ['development', 'production'])
+        for profile, (_per_second, created, locked, _error_rate, _retries) in rows.items():
+            self.assertEqual(int(created) + int(locked), 6, profile)
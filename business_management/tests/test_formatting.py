@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from business_management.templatetags.formatting import format_rows, spaced_number, spaced_numbers
+
+
+class SpacedNumberTest(SimpleTestCase):
+    def test_groups_thousands_and_rounds_half_up(self):
+        self.assertEqual(spaced_number(Decimal('1234567.891')), '1 234 568')
+        self.assertEqual(spaced_number(Decimal('1234567.895'), '2'), '1 234 567.90')
+        self.assertEqual(spaced_number(Decimal('2.5')), '3')
+        self.assertEqual(spaced_number(-1234.5, 1), '-1 234.5')
+        self.assertEqual(spaced_number(1234567), '1 234 567')
+
+    def test_floats_use_their_shortest_repr(self):
+        self.assertEqual(spaced_number(0.125, 2), '0.13')
+        self.assertEqual(spaced_number(1.005, 2), '1.01')
+
+    def test_empty_and_invalid_values(self):
+        self.assertEqual(spaced_number(None), '')
+        self.assertEqual(spaced_number(''), '')
+        self.assertEqual(spaced_number('abc'), 'abc')
+        self.assertEqual(spaced_number(True), True)
+        self.assertEqual(spaced_number('1 000'), '1 000')
+
+    def test_invalid_precision_falls_back_to_integers(self):
+        self.assertEqual(spaced_number(Decimal('1234.56'), 'x'), '1 235')
+        self.assertEqual(spaced_number(Decimal('1234.56'), -2), '1 235')
+        self.assertEqual(spaced_number(Decimal('1234.56'), ['2']), '1 235')
+
+    def test_template_filter(self):
+        rendered = Template('{% load formatting %}{{ value|spaced_number:"2" }}').render(
+            Context({'value': Decimal('9876.5')})
+        )
+        self.assertEqual(rendered, '9 876.50')
+
+    def test_bulk_helpers_match_the_filter(self):
+        values = [Decimal('1234.567'), 1e6, 42, None]
+        self.assertEqual(spaced_numbers(values, '2'), [spaced_number(value, '2') for value in values])
+
+        rows = [{'revenue': Decimal('150000.4'), 'tax': Decimal('9000.125')}, {'revenue': 10, 'tax': None}]
+        self.assertEqual(
+            format_rows(rows, {'revenue': 0, 'tax': 2}),
+            [{'revenue': '150 000', 'tax': '9 000.13'}, {'revenue': '10', 'tax': ''}],
+        )
@@ -0,0 +1,92 @@
+import pstats
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from business_management import profiling, regulations, views
+from orders.catalog import clear_product_catalog
+from orders.delivery import invalidate_delivery_table
+from orders.models import Logistics, Product
+
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.profile_dir = Path(tmp_dir.name)
+        settings_override = override_settings(
+            REQUEST_PROFILING_ENABLED=True,
+            REQUEST_PROFILING_SAMPLE_RATE=0,
+            REQUEST_PROFILING_DIR=self.profile_dir,
+            REGULATORY_CACHE_FILE=self.profile_dir / 'regulations_cache.json',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for reset in (
+            profiling.reset_request_metrics,
+            regulations.clear_regulatory_snapshot_cache,
+            views.clear_calculator_page_cache,
+            invalidate_delivery_table,
+            clear_product_catalog,
+        ):
+            reset()
+            self.addCleanup(reset)
+
+    def test_records_timings_per_view(self):
+        self.client.get(reverse('business_calculator'))
+        self.client.get(reverse('business_calculator'))
+
+        metrics = profiling.get_request_metrics()['business_calculator']
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['wall_ms']['buckets'][-1], {'le': '+Inf', 'count': 2})
+        self.assertGreater(metrics['template_ms']['sum'], 0)
+        self.assertEqual(metrics['snapshot_cache'], {'hit': 1, 'miss': 1, 'reload': 0})
+
+    def test_counts_database_queries(self):
+        product = Product.objects.create(name='Товар', description='', price=Decimal('10.00'), stock=5)
+        Logistics.objects.create(product=product, delivery_cost=Decimal('300.00'), estimated_delivery_time=2)
+        self.client.post('/orders/calculate/', {'product_ids': [product.id], 'quantities': ['1']})
+
+        metrics = profiling.get_request_metrics()['orders.views.calculate_order']
+        self.assertEqual(metrics['db_queries']['count'], 1)
+        self.assertGreater(metrics['db_queries']['sum'], 0)
+
+    def test_staff_can_request_a_profile_dump(self):
+        self.client.get(reverse('business_calculator'), HTTP_X_PROFILE_REQUEST='1')
+        self.assertEqual(list(self.profile_dir.glob('*.prof')), [])
+
+        user = get_user_model().objects.create_user('staff', password='secret', is_staff=True)
+        self.client.force_login(user)
+        response = self.client.get(reverse('business_calculator'), HTTP_X_PROFILE_REQUEST='1')
+
+        dump = self.profile_dir / response[profiling.PROFILE_DUMP_HEADER]
+        self.assertIn('-business_calculator-', dump.name)
+        stats = pstats.Stats(str(dump))
+        self.assertTrue(any(func[2] == 'business_calculator' for func in stats.stats))
+
+    def test_sample_rate_profiles_requests(self):
+        with override_settings(REQUEST_PROFILING_SAMPLE_RATE=1):
+            self.client.get(reverse('business_calculator'))
+        self.assertEqual(len(list(self.profile_dir.glob('*.prof'))), 1)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('business_calculator'))
+        self.assertEqual(self.client.get(reverse('request_metrics')).status_code, 302)
+
+        user = get_user_model().objects.create_user('staff', password='secret', is_staff=True)
+        self.client.force_login(user)
+        response = self.client.get(reverse('request_metrics'))
+        self.assertTrue(response.json()['enabled'])
+        self.assertIn('business_calculator', response.json()['views'])
+
+    def test_disabled_middleware_is_removed_from_the_chain(self):
+        with override_settings(REQUEST_PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.ProfilingMiddleware(lambda request: None)
+            self.client.get(reverse('business_calculator'))
+        self.assertEqual(profiling.get_request_metrics(), {})
@@ -0,0 +1,62 @@
+import math
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from business_management import projections, regulations
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional in minimal environments
+    numpy = None
+
+# float64 mode may differ from the exact Decimal path only by accumulated rounding.
+FLOAT_MODE_RELATIVE_TOLERANCE = 1e-12
+
+
+class ProjectionGridTest(SimpleTestCase):
+    def setUp(self):
+        self.snapshot = regulations.RegulatorySnapshot(regulations.DEFAULT_REGULATORY_DATA)
+        self.profits, self.margins, self.days = projections.expand_scenarios(
+            [Decimal('150000'), Decimal('99999.99'), Decimal('1000000')],
+            [Decimal('10'), Decimal('30'), Decimal('99.9')],
+            [22, 30],
+        )
+
+    def test_expand_scenarios_builds_cartesian_product(self):
+        self.assertEqual(len(self.profits), 18)
+        self.assertEqual((self.profits[1], self.margins[1], self.days[1]), (Decimal('150000'), Decimal('10'), 30))
+
+    def test_decimal_mode_matches_scalar_projection(self):
+        grid = projections.build_projection_grid(self.profits, self.margins, self.days, self.snapshot)
+        self.assertEqual(set(grid.tax_columns), set(self.snapshot.tax_systems))
+        for index in range(len(grid)):
+            net_profit, operational_cost = projections.derive_daily_bases(
+                self.profits[index], self.margins[index], self.days[index]
+            )
+            for code, info in self.snapshot.tax_systems.items():
+                expected = regulations.build_tax_projection(net_profit, operational_cost, self.days[index], info)
+                self.assertEqual(grid.row(index, code), expected)
+
+    def test_unknown_tax_codes_are_skipped(self):
+        grid = projections.build_projection_grid(
+            self.profits, self.margins, self.days, self.snapshot, tax_system_codes=['USN_6', 'UNKNOWN']
+        )
+        self.assertEqual(list(grid.tax_columns), ['USN_6'])
+
+    def test_rejects_columns_of_different_length(self):
+        with self.assertRaises(ValueError):
+            projections.build_projection_grid(self.profits, self.margins[:-1], self.days, self.snapshot)
+
+    @skipUnless(numpy, 'NumPy is not installed')
+    def test_float_mode_agrees_with_decimal_mode(self):
+        exact = projections.build_projection_grid(self.profits, self.margins, self.days, self.snapshot)
+        fast = projections.build_projection_grid(self.profits, self.margins, self.days, self.snapshot, mode='float')
+        for code, columns in exact.tax_columns.items():
+            for field in projections.PROJECTION_FIELDS:
+                for expected, actual in zip(columns[field], fast.tax_columns[code][field]):
+                    self.assertTrue(
+                        math.isclose(float(expected), float(actual), rel_tol=FLOAT_MODE_RELATIVE_TOLERANCE),
+                        f'{code}.{field}: {expected} != {actual}',
+                    )
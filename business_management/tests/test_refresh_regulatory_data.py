@@ -0,0 +1,173 @@
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+
+from business_management import regulations
+
+OPF_PAYLOAD = {'data': [{'code': 'IP', 'name': 'Индивидуальный предприниматель'}]}
+TAX_PAYLOAD = {'data': [{'code': 'USN_6', 'name': 'УСН «Доходы»', 'rate': '0.06'}]}
+
+
+class StubSourceServer(ThreadingHTTPServer):
+    """Serves JSON documents with an ETag and answers 304 to a matching If-None-Match."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubSourceHandler)
+        self.documents = {'/opf.json': OPF_PAYLOAD, '/tax.json': TAX_PAYLOAD}
+        self.etags = {'/opf.json': '"opf-1"', '/tax.json': '"tax-1"'}
+        self.status = None
+        self.barrier = None
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+class StubSourceHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+        if server.barrier is not None:
+            server.barrier.wait()
+        if server.status:
+            self.send_error(server.status)
+            return
+        etag = server.etags[self.path]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = json.dumps(server.documents[self.path], ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RefreshRegulatoryDataTest(SimpleTestCase):
+    def setUp(self):
+        self.server = StubSourceServer()
+        thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = Path(tmp_dir.name)
+        self.cache_path = self.cache_dir / 'regulations_cache.json'
+        settings_override = override_settings(
+            REGULATORY_CACHE_FILE=self.cache_path,
+            REGULATORY_HISTORY_DIR=self.cache_dir / 'history',
+            REGULATORY_SOURCES={'opf': self.server.url('/opf.json'), 'tax_systems': self.server.url('/tax.json')},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _refresh(self, *args):
+        stdout = StringIO()
+        call_command('refresh_regulatory_data', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def _cache(self):
+        return json.loads(self.cache_path.read_text(encoding='utf-8'))
+
+    def test_downloads_sources_and_stores_validators(self):
+        self._refresh()
+        cache = self._cache()
+        self.assertEqual([item['code'] for item in cache['opf']], ['IP'])
+        self.assertEqual(list(cache['tax_systems']), ['USN_6'])
+        self.assertEqual(cache['validators']['opf']['etag'], '"opf-1"')
+        self.assertEqual(cache['validators']['tax_systems']['last_modified'], 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.assertEqual(
+            sorted(path.name for path in self.cache_dir.iterdir()),
+            ['history', 'regulations_cache.json', 'regulations_cache.pickle'],
+        )
+
+    def test_sources_are_fetched_concurrently(self):
+        # each handler waits for the other request: a sequential refresh would time out
+        self.server.barrier = threading.Barrier(2, timeout=5)
+        self._refresh()
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_unchanged_sources_are_answered_with_not_modified(self):
+        self._refresh()
+        first = self._cache()
+        self.server.etags['/tax.json'] = '"tax-2"'
+        self.server.documents['/tax.json'] = {'data': [{'code': 'PSN', 'name': 'Патент', 'rate': '0.06'}]}
+
+        output = self._refresh()
+
+        conditional = {path: headers for path, headers in self.server.requests[2:]}
+        self.assertEqual(conditional['/opf.json']['If-None-Match'], '"opf-1"')
+        self.assertEqual(conditional['/opf.json']['If-Modified-Since'], 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.assertIn('без изменений: opf', output)
+        cache = self._cache()
+        self.assertEqual(cache['opf'], first['opf'])
+        self.assertEqual(list(cache['tax_systems']), ['PSN'])
+        self.assertEqual(cache['validators']['tax_systems']['etag'], '"tax-2"')
+
+    def test_force_skips_conditional_headers(self):
+        self._refresh()
+        self._refresh('--force')
+        self.assertTrue(all('If-None-Match' not in headers for _, headers in self.server.requests[2:]))
+
+    def test_changed_content_is_appended_to_history(self):
+        self._refresh('--effective-from', '2024-01-01')
+        self.server.etags['/tax.json'] = '"tax-2"'
+        self.server.documents['/tax.json'] = {'data': [{'code': 'USN_6', 'name': 'УСН «Доходы»', 'rate': '0.07'}]}
+        self._refresh('--effective-from', '2025-01-01')
+        output = self._refresh('--force', '--effective-from', '2025-06-01')
+
+        self.assertNotIn('в историю добавлена', output)
+        index = json.loads((self.cache_dir / 'history' / 'index.json').read_text(encoding='utf-8'))
+        self.assertEqual([entry['effective_from'] for entry in index], ['2024-01-01', '2025-01-01'])
+        snapshot = regulations.load_regulatory_snapshot(as_of='2024-12-31')
+        self.assertEqual(snapshot.get_tax_system('USN_6')['effective_rate'], '0.06')
+
+    def test_failed_download_keeps_the_published_cache(self):
+        self._refresh()
+        published = self.cache_path.read_bytes()
+        self.server.status = 500
+        with self.assertRaises(CommandError):
+            self._refresh('--force')
+        self.assertEqual(self.cache_path.read_bytes(), published)
+
+
+class WriteRegulatoryPayloadTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = Path(tmp_dir.name)
+        self.cache_path = self.cache_dir / 'regulations_cache.json'
+
+    def test_replaces_file_and_keeps_its_permissions(self):
+        self.cache_path.write_text('{}', encoding='utf-8')
+        self.cache_path.chmod(0o640)
+        regulations.write_regulatory_payload({'checked_at': '2024-01-01'}, self.cache_path)
+        self.assertEqual(regulations.read_regulatory_payload(self.cache_path), {'checked_at': '2024-01-01'})
+        self.assertEqual(self.cache_path.stat().st_mode & 0o777, 0o640)
+
+    def test_failed_write_leaves_no_temporary_files(self):
+        self.cache_path.write_text('{"checked_at": "old"}', encoding='utf-8')
+        with mock.patch('business_management.regulations.os.replace', side_effect=OSError), self.assertRaises(OSError):
+            regulations.write_regulatory_payload({'checked_at': 'new'}, self.cache_path)
+        self.assertEqual(regulations.read_regulatory_payload(self.cache_path), {'checked_at': 'old'})
+        self.assertEqual([path.name for path in self.cache_dir.iterdir()], ['regulations_cache.json'])
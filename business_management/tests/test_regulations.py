@@ -1,6 +1,13 @@
+import dataclasses
+import json
+import os
+import pickle
+import tempfile
+from datetime import date
 from decimal import Decimal
+from pathlib import Path
 
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 
 from business_management import regulations
 
@@ -31,3 +38,192 @@ class RegulatoryHelpersTest(SimpleTestCase):
         snapshot = regulations.RegulatorySnapshot(regulations.DEFAULT_REGULATORY_DATA)
         rows = regulations.build_tax_rows(Decimal('5000'), Decimal('3000'), 30, ['USN_6'], snapshot)
         self.assertEqual(rows[0]['rate_percent'], Decimal('6'))
+
+
+class RegulatorySnapshotIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.snapshot = regulations.RegulatorySnapshot(
+            {
+                'opf': [
+                    {'code': 'IP', 'title': 'ИП', 'tax_systems': ['USN_6', 'UNKNOWN', 'PSN']},
+                    {'code': 'OOO', 'title': 'ООО', 'tax_systems': []},
+                    {'code': 'IP', 'title': 'Дубликат', 'tax_systems': ['OSN_IP']},
+                ],
+            }
+        )
+
+    def test_get_opf_uses_first_match_and_falls_back_to_first_item(self):
+        self.assertEqual(self.snapshot.get_opf('IP')['title'], 'ИП')
+        self.assertEqual(self.snapshot.get_opf('OOO')['title'], 'ООО')
+        self.assertEqual(self.snapshot.get_opf('MISSING')['code'], 'IP')
+
+    def test_available_tax_systems_are_resolved_per_opf(self):
+        self.assertEqual(self.snapshot.get_available_tax_codes('IP'), ('USN_6', 'UNKNOWN', 'PSN'))
+        self.assertEqual([tax['code'] for tax in self.snapshot.get_available_tax_systems('IP')], ['USN_6', 'PSN'])
+        self.assertTrue(self.snapshot.is_tax_system_available('IP', 'PSN'))
+        self.assertFalse(self.snapshot.is_tax_system_available('IP', 'UNKNOWN'))
+
+    def test_opf_without_tax_systems_allows_all_of_them(self):
+        self.assertEqual(
+            self.snapshot.get_available_tax_codes('OOO'),
+            tuple(self.snapshot.tax_systems.keys()),
+        )
+        self.assertTrue(self.snapshot.is_tax_system_available('OOO', 'AUSN'))
+
+    def test_version_tracks_the_normalized_payload(self):
+        default = regulations.RegulatorySnapshot(regulations.DEFAULT_REGULATORY_DATA)
+        same = regulations.RegulatorySnapshot(json.loads(json.dumps(regulations.DEFAULT_REGULATORY_DATA)))
+        changed = regulations.RegulatorySnapshot(dict(regulations.DEFAULT_REGULATORY_DATA, checked_at='2024-01-01'))
+        self.assertEqual(same.version, default.version)
+        self.assertNotEqual(changed.version, default.version)
+        self.assertNotEqual(self.snapshot.version, default.version)
+
+
+class RegulatorySnapshotCacheTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_path = Path(tmp_dir.name) / 'regulations_cache.json'
+        settings_override = override_settings(REGULATORY_CACHE_FILE=self.cache_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        regulations.clear_regulatory_snapshot_cache()
+        self.addCleanup(regulations.clear_regulatory_snapshot_cache)
+
+    def _write_cache(self, checked_at, mtime):
+        payload = dict(regulations.DEFAULT_REGULATORY_DATA, checked_at=checked_at)
+        self.cache_path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+        os.utime(self.cache_path, (mtime, mtime))
+
+    def test_unchanged_file_is_served_from_cache(self):
+        self._write_cache('2024-01-01T00:00:00', 1_700_000_000)
+        first = regulations.load_regulatory_snapshot()
+        second = regulations.load_regulatory_snapshot()
+        self.assertIs(first, second)
+        self.assertEqual(regulations.get_regulatory_snapshot_cache_stats(), {'hits': 1, 'misses': 1, 'reloads': 0})
+
+    def test_changed_file_triggers_reload(self):
+        self._write_cache('2024-01-01T00:00:00', 1_700_000_000)
+        self.assertEqual(regulations.load_regulatory_snapshot().checked_at, '2024-01-01T00:00:00')
+        self._write_cache('2024-01-02T00:00:00', 1_700_086_400)
+        self.assertEqual(regulations.load_regulatory_snapshot().checked_at, '2024-01-02T00:00:00')
+        self.assertEqual(regulations.get_regulatory_snapshot_cache_stats(), {'hits': 0, 'misses': 2, 'reloads': 1})
+
+    def test_snapshot_is_read_only(self):
+        snapshot = regulations.load_regulatory_snapshot()
+        with self.assertRaises(TypeError):
+            snapshot.tax_systems['USN_6'] = {}
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            snapshot.payload = {}
+
+
+class CompiledRegulatorySnapshotTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_path = Path(tmp_dir.name) / 'regulations_cache.json'
+        self.payload = dict(regulations.DEFAULT_REGULATORY_DATA, checked_at='2024-01-01T00:00:00')
+
+    def test_compiled_snapshot_matches_json_snapshot(self):
+        regulations.write_regulatory_payload(self.payload, self.cache_path)
+        compiled = regulations.read_compiled_snapshot(self.cache_path)
+        parsed = regulations.RegulatorySnapshot(self.payload)
+
+        self.assertIsNotNone(compiled)
+        self.assertEqual(compiled.version, parsed.version)
+        self.assertEqual(compiled.checked_at, '2024-01-01T00:00:00')
+        self.assertEqual(compiled.opf, parsed.opf)
+        self.assertEqual(compiled.get_available_tax_codes('OOO'), parsed.get_available_tax_codes('OOO'))
+        self.assertEqual(compiled.get_available_tax_systems('IP'), parsed.get_available_tax_systems('IP'))
+        self.assertTrue(compiled.is_tax_system_available('IP', 'PSN'))
+
+    def test_opf_list_is_loaded_on_first_use(self):
+        regulations.write_regulatory_payload(self.payload, self.cache_path)
+        snapshot = regulations.read_regulatory_snapshot(self.cache_path)
+        self.assertEqual(snapshot.get_tax_system('USN_6')['code'], 'USN_6')
+        self.assertNotIn('_opf_section', snapshot.__dict__)
+        self.assertEqual(snapshot.get_opf('OOO')['code'], 'OOO')
+        self.assertIn('_opf_section', snapshot.__dict__)
+
+    def test_stale_or_broken_compiled_file_falls_back_to_json(self):
+        regulations.write_regulatory_payload(self.payload, self.cache_path)
+        compiled_path = regulations.get_compiled_cache_path(self.cache_path)
+        stale = compiled_path.read_bytes()
+
+        self.cache_path.write_text(
+            json.dumps(dict(self.payload, checked_at='2024-02-01T00:00:00')), encoding='utf-8'
+        )
+        self.assertIsNone(regulations.read_compiled_snapshot(self.cache_path))
+        self.assertEqual(regulations.read_regulatory_snapshot(self.cache_path).checked_at, '2024-02-01T00:00:00')
+
+        compiled_path.write_bytes(stale[:20])
+        self.assertIsNone(regulations.read_compiled_snapshot(self.cache_path))
+
+    def test_frozen_dict_is_read_only_and_picklable(self):
+        frozen = regulations.FrozenDict({'code': 'IP'})
+        with self.assertRaises(TypeError):
+            frozen['code'] = 'OOO'
+        with self.assertRaises(TypeError):
+            frozen.update(code='OOO')
+        restored = pickle.loads(pickle.dumps(frozen))
+        self.assertIsInstance(restored, regulations.FrozenDict)
+        self.assertEqual(restored, {'code': 'IP'})
+
+
+class RegulatoryHistoryTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.history_dir = Path(tmp_dir.name) / 'history'
+        settings_override = override_settings(
+            REGULATORY_CACHE_FILE=Path(tmp_dir.name) / 'regulations_cache.json',
+            REGULATORY_HISTORY_DIR=self.history_dir,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        regulations.clear_regulatory_snapshot_cache()
+        self.addCleanup(regulations.clear_regulatory_snapshot_cache)
+
+    def _payload(self, usn_rate, checked_at='2024-01-01T00:00:00'):
+        tax_systems = dict(regulations.DEFAULT_REGULATORY_DATA['tax_systems'])
+        tax_systems['USN_6'] = dict(tax_systems['USN_6'], effective_rate=usn_rate)
+        return dict(regulations.DEFAULT_REGULATORY_DATA, checked_at=checked_at, tax_systems=tax_systems)
+
+    def _rate(self, as_of):
+        return regulations.load_regulatory_snapshot(as_of=as_of).get_tax_system('USN_6')['effective_rate']
+
+    def test_identical_content_is_stored_once(self):
+        first = regulations.append_regulatory_history(self._payload('0.06'), effective_from='2024-01-01')
+        repeated = regulations.append_regulatory_history(
+            self._payload('0.06', checked_at='2024-02-01T00:00:00'), effective_from='2024-02-01'
+        )
+        self.assertIsNotNone(first)
+        self.assertIsNone(repeated)
+        self.assertEqual(
+            sorted(path.name for path in self.history_dir.glob('*.json')), sorted(['index.json', f'{first}.json'])
+        )
+
+    def test_lookup_returns_rules_in_force_on_date(self):
+        regulations.append_regulatory_history(self._payload('0.06'), effective_from='2024-01-01')
+        regulations.append_regulatory_history(self._payload('0.07'), effective_from='2025-01-01')
+        # recorded late, but effective between the two existing versions
+        regulations.append_regulatory_history(self._payload('0.065'), effective_from='2024-07-01')
+
+        self.assertEqual(self._rate(date(2023, 6, 1)), '0.06')
+        self.assertEqual(self._rate(date(2024, 6, 30)), '0.06')
+        self.assertEqual(self._rate('2024-07-01'), '0.065')
+        self.assertEqual(self._rate(date(2024, 12, 31)), '0.065')
+        self.assertEqual(self._rate(date(2026, 1, 1)), '0.07')
+
+        index = json.loads((self.history_dir / 'index.json').read_text(encoding='utf-8'))
+        self.assertEqual([entry['effective_from'] for entry in index], ['2024-01-01', '2024-07-01', '2025-01-01'])
+
+    def test_versions_are_parsed_once_per_content(self):
+        regulations.append_regulatory_history(self._payload('0.06'), effective_from='2024-01-01')
+        regulations.append_regulatory_history(self._payload('0.07'), effective_from='2025-01-01')
+        first = regulations.load_regulatory_snapshot(as_of=date(2024, 3, 1))
+        self.assertIs(regulations.load_regulatory_snapshot(as_of=date(2024, 9, 1)), first)
+        self.assertIsNot(regulations.load_regulatory_snapshot(as_of=date(2025, 3, 1)), first)
+
+    def test_empty_history_falls_back_to_current_snapshot(self):
+        self.assertIs(regulations.load_regulatory_snapshot(as_of=date(2024, 1, 1)), regulations.load_regulatory_snapshot())
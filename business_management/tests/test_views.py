@@ -0,0 +1,222 @@
+import io
+import json
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from business_management import regulations, views
+
+
+class CalculatorViewTestCase(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_path = Path(tmp_dir.name) / 'regulations_cache.json'
+        self.history_dir = Path(tmp_dir.name) / 'history'
+        settings_override = override_settings(
+            REGULATORY_CACHE_FILE=self.cache_path, REGULATORY_HISTORY_DIR=self.history_dir
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        regulations.clear_regulatory_snapshot_cache()
+        self.addCleanup(regulations.clear_regulatory_snapshot_cache)
+        views.clear_calculator_page_cache()
+        self.addCleanup(views.clear_calculator_page_cache)
+
+
+class BusinessCalculatorViewTest(CalculatorViewTestCase):
+    def test_renders_selected_tax_system(self):
+        response = self.client.get(
+            reverse('business_calculator'), {'opf_code': 'OOO', 'tax_system_code': 'USN_15'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['selected_tax_code'], 'USN_15')
+        self.assertEqual(len(response.context['tax_rows']), 3)
+
+    def test_unavailable_tax_system_falls_back_to_first_allowed(self):
+        response = self.client.get(reverse('business_calculator'), {'opf_code': 'OOO', 'tax_system_code': 'PSN'})
+        self.assertEqual(response.context['selected_tax_code'], 'USN_6')
+
+    def test_equivalent_requests_are_served_from_page_cache(self):
+        first = self.client.get(reverse('business_calculator'))
+        second = self.client.get(
+            reverse('business_calculator'),
+            {'monthly_profit': '150 000', 'days_in_month': '30', 'margin_percent': '30', 'tax_system_code': 'OSN_OOO'},
+        )
+        self.assertEqual(second.content, first.content)
+        self.assertIsNone(second.context)
+        self.assertEqual(views.get_calculator_page_cache_stats()['hits'], 1)
+
+        other = self.client.get(reverse('business_calculator'), {'monthly_profit': '150000.0'})
+        self.assertIsNotNone(other.context)
+
+    def test_page_cache_is_dropped_when_regulatory_data_changes(self):
+        self.client.get(reverse('business_calculator'))
+        payload = dict(regulations.DEFAULT_REGULATORY_DATA, checked_at='2024-01-01T00:00:00')
+        self.cache_path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+
+        response = self.client.get(reverse('business_calculator'))
+        self.assertIsNotNone(response.context)
+        self.assertEqual(response.context['regulatory_snapshot'].checked_at, '2024-01-01T00:00:00')
+        self.assertEqual(views.get_calculator_page_cache_stats()['size'], 1)
+
+    def test_as_of_renders_rules_in_force_on_date(self):
+        tax_systems = dict(regulations.DEFAULT_REGULATORY_DATA['tax_systems'])
+        tax_systems['USN_6'] = dict(tax_systems['USN_6'], effective_rate='0.04')
+        regulations.append_regulatory_history(
+            dict(regulations.DEFAULT_REGULATORY_DATA, tax_systems=tax_systems), effective_from='2020-01-01'
+        )
+        params = {'opf_code': 'IP', 'tax_system_code': 'USN_6'}
+
+        historical = self.client.get(reverse('business_calculator'), dict(params, as_of='2021-01-01'))
+        current = self.client.get(reverse('business_calculator'), params)
+        invalid = self.client.get(reverse('business_calculator'), dict(params, as_of='yesterday'))
+
+        self.assertEqual(historical.context['selected_tax_system']['effective_rate'], '0.04')
+        self.assertEqual(current.context['selected_tax_system']['effective_rate'], '0.06')
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(invalid.json(), {'error': '"as_of" must be a date in YYYY-MM-DD format'})
+
+
+class BusinessCalculatorSweepViewTest(CalculatorViewTestCase):
+    def _post(self, payload):
+        return self.client.post(
+            reverse('business_calculator_sweep'), data=json.dumps(payload), content_type='application/json'
+        )
+
+    def test_scenarios_match_calculator_page(self):
+        response = self._post(
+            {'scenarios': [{'monthly_profit': '150000', 'margin_percent': 30, 'days_in_month': 30, 'opf_code': 'OOO'}]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        result = response.json()['results'][0]
+
+        page = self.client.get(reverse('business_calculator'), {'opf_code': 'OOO'}).context
+        self.assertEqual(result['opf_code'], 'OOO')
+        self.assertEqual(len(result['sales_breakdown']), len(page['sales_breakdown']))
+        self.assertEqual(
+            Decimal(result['sales_breakdown'][1]['profit_per_sale']), page['sales_breakdown'][1]['profit_per_sale']
+        )
+        self.assertEqual(
+            Decimal(result['profitability_rows'][0]['monthly_revenue']), page['profitability_rows'][0]['monthly_revenue']
+        )
+        self.assertEqual([row['code'] for row in result['tax_rows']], [row['code'] for row in page['tax_rows']])
+        self.assertEqual(Decimal(result['tax_rows'][0]['tax_monthly']), page['tax_rows'][0]['tax_monthly'])
+
+    def test_ranges_are_expanded_and_streamed(self):
+        response = self._post(
+            {
+                'opf_code': 'IP',
+                'ranges': {
+                    'monthly_profit': {'start': 100000, 'stop': 200000, 'step': 1000},
+                    'margin_percent': [20, 30, 40],
+                    'days_in_month': [22, 30],
+                },
+            }
+        )
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['count'], 101 * 3 * 2)
+        self.assertEqual(len(body['results']), 606)
+        self.assertEqual(body['results'][-1]['monthly_profit'], '200000')
+        self.assertEqual(body['results'][-1]['days_in_month'], 30)
+
+    def test_rejects_invalid_payloads(self):
+        response = self.client.post(reverse('business_calculator_sweep'), data='{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self._post({'ranges': {'monthly_profit': {'start': 1, 'stop': 10, 'step': 0}}})
+        self.assertEqual(response.status_code, 400)
+        for bound in ('NaN', 'sNaN', 'Infinity'):
+            response = self._post({'ranges': {'monthly_profit': {'start': 1, 'stop': bound, 'step': 1}}})
+            self.assertEqual(response.status_code, 400, bound)
+        # each of these used to burn CPU in int() or overflow the Decimal context
+        huge_ranges = [
+            {'start': 0, 'stop': '1e999999', 'step': 1},
+            {'start': 0, 'stop': 1, 'step': '1e-999999'},
+            {'start': '-1e999999', 'stop': '1e999999', 'step': '1e-999999'},
+            {'start': 0, 'stop': '1e99999999999', 'step': 1},
+        ]
+        for spec in huge_ranges:
+            started = time.monotonic()
+            response = self._post({'ranges': {'monthly_profit': spec}})
+            self.assertEqual(response.status_code, 400, spec)
+            self.assertLess(time.monotonic() - started, 1, spec)
+        for opf_code in (['OOO'], {'code': 'OOO'}):
+            self.assertEqual(self._post({'scenarios': [{'opf_code': opf_code}]}).status_code, 400)
+            self.assertEqual(self._post({'opf_code': opf_code, 'scenarios': [{}]}).status_code, 400)
+
+    def test_out_of_range_scenario_inputs_fall_back(self):
+        response = self._post(
+            {'scenarios': [{'monthly_profit': '1e999999', 'margin_percent': '1e-999999', 'days_in_month': 30}]}
+        )
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content)['results'][0]
+        self.assertEqual((result['monthly_profit'], result['margin_percent']), ('150000', '0.1'))
+
+    @override_settings(CALCULATOR_SWEEP_MAX_SCENARIOS=10)
+    def test_rejects_batches_over_the_limit(self):
+        response = self._post({'ranges': {'monthly_profit': [1, 2, 3, 4], 'margin_percent': [10, 20, 30]}})
+        self.assertEqual(response.status_code, 400)
+
+
+class BusinessCalculatorExportViewTest(CalculatorViewTestCase):
+    def _workbook(self, params):
+        response = self.client.get(reverse('business_calculator_export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        return load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+
+    def test_single_profit_matches_calculator_page(self):
+        workbook = self._workbook({'monthly_profit': '150000', 'margin_percent': '30', 'days_in_month': '30'})
+        page = self.client.get(reverse('business_calculator'), {'opf_code': 'OOO'}).context
+
+        sales = list(workbook['Продажи'].values)
+        self.assertEqual(sales[1][1:], tuple(row['monthly_sales'] for row in page['sales_breakdown']))
+        self.assertAlmostEqual(sales[4][2], float(page['sales_breakdown'][1]['profit_per_sale']))
+
+        profitability = list(workbook['Рентабельность'].values)
+        self.assertEqual(profitability[2][1], float(page['profitability_rows'][0]['monthly_revenue']))
+
+        taxes = [row for row in workbook['Налоги'].values if row[1] == page['selected_opf']['title']]
+        self.assertEqual([row[3] for row in taxes], [row['code'] for row in page['tax_rows']])
+        self.assertAlmostEqual(taxes[0][9], float(page['tax_rows'][0]['tax_monthly']))
+
+    def test_profit_range_covers_every_opf_and_tax_system(self):
+        workbook = self._workbook({'profit_from': '100000', 'profit_to': '200000', 'profit_step': '10000'})
+        self.assertEqual(len(list(workbook['Продажи'].values)), 4 + 11)
+        taxes = list(workbook['Налоги'].values)[1:]
+        snapshot = regulations.load_regulatory_snapshot()
+        per_profit = sum(len(snapshot.get_available_tax_codes(opf['code'])) for opf in snapshot.opf)
+        self.assertEqual(len(taxes), 11 * per_profit)
+        self.assertEqual(taxes[-1][0], 200000)
+
+    @override_settings(CALCULATOR_EXPORT_MAX_PROFITS=5)
+    def test_rejects_invalid_or_oversized_ranges(self):
+        url = reverse('business_calculator_export')
+        self.assertEqual(
+            self.client.get(url, {'profit_from': '1000', 'profit_to': '100', 'profit_step': '10'}).status_code, 400
+        )
+        self.assertEqual(self.client.get(url, {'profit_from': '1000', 'profit_to': '2000'}).status_code, 400)
+        for params in ({'profit_from': 'NaN'}, {'profit_from': '1000', 'profit_to': 'Infinity', 'profit_step': '1'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+        self.assertEqual(
+            self.client.get(url, {'profit_from': '1000', 'profit_to': '100000', 'profit_step': '1000'}).status_code,
+            400,
+        )
+
+    def test_crafted_ranges_are_rejected_quickly(self):
+        url = reverse('business_calculator_export')
+        for params in (
+            {'profit_from': '1000', 'profit_to': '1e999999', 'profit_step': '1'},
+            {'profit_from': '1000', 'profit_to': '2000', 'profit_step': '1e-999999'},
+            {'profit_from': '-1e999999', 'profit_to': '1e999999', 'profit_step': '1e-999999'},
+        ):
+            started = time.monotonic()
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+            self.assertLess(time.monotonic() - started, 1, params)
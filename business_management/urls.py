@@ -6,6 +6,10 @@ from . import views
 urlpatterns = [
     path('', views.landing),  # 👈 главная страница сайта
     path('business-calculator/', views.business_calculator, name='business_calculator'),
+    path('business-calculator/export.xlsx', views.business_calculator_export, name='business_calculator_export'),
+    path('business-calculator/sweep/', views.business_calculator_sweep, name='business_calculator_sweep'),
+    path('metrics/', views.request_metrics, name='request_metrics'),
     path('admin/', admin.site.urls),
     path('orders/', include('orders.urls')),
+    path('jobs/', include('jobs.urls')),
 ]
@@ -1,16 +1,53 @@
-from decimal import Decimal, InvalidOperation
+import json
+from datetime import date
+from decimal import Decimal, DecimalException, InvalidOperation
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
+from .calculator import build_profitability_rows, build_sales_breakdown
+from .exports import XLSX_CONTENT_TYPE, build_calculator_workbook_file
+from .lru import LRUCache
+from .profiling import get_request_metrics
+from .projections import build_grid_tax_rows, build_projection_grid
 from .regulations import (
     build_tax_projection,
     build_tax_rows,
     load_regulatory_snapshot,
 )
+from .templatetags.formatting import format_rows
 
 DEFAULT_MONTHLY_PROFIT = Decimal('150000')
 DEFAULT_DAYS_IN_MONTH = 30
 DEFAULT_MARGIN_PERCENT = Decimal('30')
+# larger inputs, or margins under MIN_MARGIN_PERCENT, overflow the Decimal context
+MAX_INPUT_VALUE = Decimal('1e15')
+MIN_MARGIN_PERCENT = Decimal('0.1')
+MAX_MARGIN_PERCENT = Decimal('99.9')
+
+DEFAULT_SWEEP_MAX_SCENARIOS = 50000
+SWEEP_STREAM_THRESHOLD = 500
+SWEEP_CHUNK_SIZE = 500
+SWEEP_PARAMETERS = ('monthly_profit', 'margin_percent', 'days_in_month')
+
+DEFAULT_EXPORT_MAX_PROFITS = 1000
+DEFAULT_PAGE_CACHE_SIZE = 256
+AS_OF_ERROR = '"as_of" must be a date in YYYY-MM-DD format'
+
+# row key -> decimals, as passed to spaced_number by the calculator tables
+SALES_DISPLAY_COLUMNS = {'sales_per_day': 0, 'profit_per_sale': 2, 'monthly_sales': 0, 'yearly_sales': 0}
+TAX_DISPLAY_COLUMNS = {'daily_revenue': 2, 'tax_daily': 2, 'monthly_revenue': 0, 'tax_monthly': 0, 'yearly_revenue': 0}
+PROFITABILITY_DISPLAY_COLUMNS = {'monthly_revenue': 0, 'yearly_revenue': 0}
+
+# (normalized inputs, snapshot version) -> rendered business_calculator page
+_page_cache = LRUCache(getattr(settings, 'CALCULATOR_PAGE_CACHE_SIZE', DEFAULT_PAGE_CACHE_SIZE))
+_page_cache_version = None
 
 
 def _parse_decimal(value, default):
@@ -19,7 +56,7 @@ def _parse_decimal(value, default):
     try:
         normalized = str(value).replace(' ', '').replace(',', '.')
         parsed = Decimal(normalized)
-        if parsed <= 0:
+        if not parsed.is_finite() or parsed <= 0 or parsed > MAX_INPUT_VALUE:
             return default
         return parsed
     except (InvalidOperation, TypeError, ValueError):
@@ -36,13 +73,44 @@ def _parse_positive_int(value, default):
 
 def _parse_margin_percent(value):
     margin = _parse_decimal(value, DEFAULT_MARGIN_PERCENT)
-    if margin <= 0:
-        return DEFAULT_MARGIN_PERCENT
-    if margin >= Decimal('99.9'):
-        return Decimal('99.9')
+    if margin < MIN_MARGIN_PERCENT:
+        return MIN_MARGIN_PERCENT
+    if margin >= MAX_MARGIN_PERCENT:
+        return MAX_MARGIN_PERCENT
     return margin
 
 
+def _parse_as_of(value):
+    """Date for ``as_of``, or ``None`` when it is missing or not an ISO date."""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def clear_calculator_page_cache():
+    """Drop every rendered page and reset the hit/miss counters."""
+    global _page_cache, _page_cache_version
+    _page_cache = LRUCache(_page_cache.maxsize)
+    _page_cache_version = None
+
+
+def get_calculator_page_cache_stats():
+    return _page_cache.stats()
+
+
+def _cached_page(key, version):
+    """Rendered page for ``key``; entries for older snapshot versions are dropped at once."""
+    global _page_cache_version
+    if version != _page_cache_version:
+        _page_cache.clear()
+        _page_cache_version = version
+        return None
+    return _page_cache.get(key)
+
+
 def landing(request):
     return render(request, 'landing.html')
 
@@ -53,19 +121,36 @@ def business_calculator(request):
     margin_percent = _parse_margin_percent(request.GET.get('margin_percent'))
     margin_ratio = margin_percent / Decimal('100')
 
-    regulatory_snapshot = load_regulatory_snapshot()
+    as_of = _parse_as_of(request.GET.get('as_of'))
+    if request.GET.get('as_of') and as_of is None:
+        return JsonResponse({'error': AS_OF_ERROR}, status=400)
+    regulatory_snapshot = load_regulatory_snapshot(as_of=as_of)
     selected_opf = regulatory_snapshot.get_opf(request.GET.get('opf_code'))
-    available_tax_codes = selected_opf.get('tax_systems') or list(regulatory_snapshot.tax_systems.keys())
-    available_tax_systems = [
-        regulatory_snapshot.get_tax_system(code)
-        for code in available_tax_codes
-        if regulatory_snapshot.get_tax_system(code)
-    ]
+    selected_opf_code = selected_opf.get('code')
+    available_tax_codes = regulatory_snapshot.get_available_tax_codes(selected_opf_code)
+    available_tax_systems = regulatory_snapshot.get_available_tax_systems(selected_opf_code)
     selected_tax_code = request.GET.get('tax_system_code')
-    if selected_tax_code not in [tax['code'] for tax in available_tax_systems] and available_tax_systems:
+    if available_tax_systems and not regulatory_snapshot.is_tax_system_available(selected_opf_code, selected_tax_code):
         selected_tax_code = available_tax_systems[0]['code']
     selected_tax_system = regulatory_snapshot.get_tax_system(selected_tax_code)
 
+    # Decimals are keyed by their string form: 150000 and 150000.0 compare equal but
+    # are rendered differently.
+    # Historical pages share the cache: the key carries the version they were rendered
+    # with, and the cache is dropped only when the current rules change.
+    page_key = (
+        str(monthly_profit),
+        days_in_month,
+        str(margin_percent),
+        selected_opf_code,
+        selected_tax_code,
+        regulatory_snapshot.version,
+    )
+    current_version = regulatory_snapshot.version if as_of is None else load_regulatory_snapshot().version
+    content = _cached_page(page_key, current_version)
+    if content is not None:
+        return HttpResponse(content)
+
     daily_profit_target = monthly_profit / Decimal(days_in_month)
     monthly_operational_cost = monthly_profit * ((Decimal('1') / margin_ratio) - Decimal('1'))
     daily_operational_cost = monthly_operational_cost / Decimal(days_in_month)
@@ -73,32 +158,8 @@ def business_calculator(request):
     pre_tax_daily_base = daily_profit_target + daily_operational_cost
     yearly_profit_goal = monthly_profit * Decimal(12)
 
-    sales_breakdown = []
-    for sales_per_day in range(1, 11):
-        profit_per_sale = daily_profit_target / Decimal(sales_per_day)
-        monthly_sales = sales_per_day * days_in_month
-        yearly_sales = monthly_sales * 12
-        sales_breakdown.append(
-            {
-                'sales_per_day': sales_per_day,
-                'profit_per_sale': profit_per_sale,
-                'monthly_sales': monthly_sales,
-                'yearly_sales': yearly_sales,
-            }
-        )
-
-    profitability_rows = []
-    for margin in range(10, 85, 5):
-        margin_decimal = Decimal(margin) / Decimal(100)
-        monthly_revenue = monthly_profit / margin_decimal
-        yearly_revenue = monthly_revenue * Decimal(12)
-        profitability_rows.append(
-            {
-                'margin': margin,
-                'monthly_revenue': monthly_revenue,
-                'yearly_revenue': yearly_revenue,
-            }
-        )
+    sales_breakdown = build_sales_breakdown(daily_profit_target, days_in_month)
+    profitability_rows = build_profitability_rows(monthly_profit)
 
     tax_projection = build_tax_projection(
         daily_profit_target,
@@ -138,6 +199,210 @@ def business_calculator(request):
         'tax_projection': tax_projection,
         'tax_rate_percent': tax_rate_percent,
         'tax_rows': tax_rows,
+        'sales_breakdown_display': format_rows(sales_breakdown, SALES_DISPLAY_COLUMNS),
+        'tax_rows_display': list(zip(tax_rows, format_rows(tax_rows, TAX_DISPLAY_COLUMNS))),
+        'profitability_rows_display': list(
+            zip(profitability_rows, format_rows(profitability_rows, PROFITABILITY_DISPLAY_COLUMNS))
+        ),
     }
 
-    return render(request, 'business_calculator.html', context)
+    content = render_to_string('business_calculator.html', context, request)
+    _page_cache.set(page_key, content)
+    return HttpResponse(content)
+
+
+class SweepRequestError(ValueError):
+    pass
+
+
+def _normalize_scenario(monthly_profit, margin_percent, days_in_month):
+    return (
+        _parse_decimal(monthly_profit, DEFAULT_MONTHLY_PROFIT),
+        _parse_margin_percent(margin_percent),
+        _parse_positive_int(days_in_month, DEFAULT_DAYS_IN_MONTH),
+    )
+
+
+def _expand_sweep_range(name, spec, max_scenarios):
+    if spec is None:
+        return [None]
+    if isinstance(spec, list):
+        return spec or [None]
+    if not isinstance(spec, dict):
+        return [spec]
+    try:
+        start = Decimal(str(spec['start']))
+        stop = Decimal(str(spec.get('stop', spec['start'])))
+        step = Decimal(str(spec.get('step', 1)))
+    except (KeyError, InvalidOperation):
+        raise SweepRequestError(f'Invalid range for {name}: expected numeric start, stop and step')
+    if not all(value.is_finite() and value.copy_abs() <= MAX_INPUT_VALUE for value in (start, stop, step)):
+        raise SweepRequestError(
+            f'Invalid range for {name}: start, stop and step must be finite numbers up to {MAX_INPUT_VALUE}'
+        )
+    if step <= 0 or stop < start:
+        raise SweepRequestError(f'Invalid range for {name}: step must be positive and stop >= start')
+    # compare the exact quotient first: int() of a huge one takes seconds of CPU
+    try:
+        steps = (stop - start) / step
+    except DecimalException:
+        raise SweepRequestError(f'Invalid range for {name}: step is too small')
+    if steps >= max_scenarios:
+        raise SweepRequestError(f'Too many scenarios requested, the limit is {max_scenarios}')
+    return [start + step * index for index in range(int(steps) + 1)]
+
+
+def _parse_sweep_request(payload, max_scenarios):
+    """Return parallel lists ``(profits, margins, days, opf_codes)`` for the sweep payload.
+
+    The payload carries either an explicit ``scenarios`` list or ``ranges`` that are
+    expanded into their cartesian product. Each value goes through the same parsers as
+    the calculator page, so invalid inputs fall back to the page defaults.
+    """
+    if not isinstance(payload, dict):
+        raise SweepRequestError('Request body must be a JSON object')
+    default_opf_code = payload.get('opf_code')
+    if default_opf_code is not None and not isinstance(default_opf_code, str):
+        raise SweepRequestError('"opf_code" must be a string')
+
+    if 'scenarios' in payload:
+        raw_scenarios = payload['scenarios']
+        if not isinstance(raw_scenarios, list) or not all(isinstance(item, dict) for item in raw_scenarios):
+            raise SweepRequestError('"scenarios" must be a list of objects')
+        if len(raw_scenarios) > max_scenarios:
+            raise SweepRequestError(f'Too many scenarios requested, the limit is {max_scenarios}')
+        rows = [
+            (item.get('monthly_profit'), item.get('margin_percent'), item.get('days_in_month'), item.get('opf_code', default_opf_code))
+            for item in raw_scenarios
+        ]
+        if not all(isinstance(row[3], str) or row[3] is None for row in rows):
+            raise SweepRequestError('"opf_code" must be a string')
+    else:
+        ranges = payload.get('ranges') or {}
+        if not isinstance(ranges, dict):
+            raise SweepRequestError('"ranges" must be an object')
+        values = [_expand_sweep_range(name, ranges.get(name), max_scenarios) for name in SWEEP_PARAMETERS]
+        if len(values[0]) * len(values[1]) * len(values[2]) > max_scenarios:
+            raise SweepRequestError(f'Too many scenarios requested, the limit is {max_scenarios}')
+        rows = [
+            (profit, margin, days, default_opf_code)
+            for profit in values[0]
+            for margin in values[1]
+            for days in values[2]
+        ]
+
+    profits, margins, days, opf_codes = [], [], [], []
+    for monthly_profit, margin_percent, days_in_month, opf_code in rows:
+        profit, margin, day_count = _normalize_scenario(monthly_profit, margin_percent, days_in_month)
+        profits.append(profit)
+        margins.append(margin)
+        days.append(day_count)
+        opf_codes.append(opf_code)
+    return profits, margins, days, opf_codes
+
+
+def _iter_sweep_json(snapshot, profits, margins, days, opf_codes):
+    encoder = DjangoJSONEncoder()
+    yield '{"checked_at": %s, "count": %d, "results": [' % (encoder.encode(snapshot.checked_at), len(days))
+    for start in range(0, len(days), SWEEP_CHUNK_SIZE):
+        stop = start + SWEEP_CHUNK_SIZE
+        grid = build_projection_grid(profits[start:stop], margins[start:stop], days[start:stop], snapshot)
+        encoded = []
+        for offset in range(len(grid)):
+            index = start + offset
+            selected_opf = snapshot.get_opf(opf_codes[index])
+            opf_code = selected_opf.get('code')
+            encoded.append(
+                encoder.encode(
+                    {
+                        'monthly_profit': profits[index],
+                        'margin_percent': margins[index],
+                        'days_in_month': days[index],
+                        'opf_code': opf_code,
+                        'sales_breakdown': build_sales_breakdown(grid.daily_net_profit[offset], days[index]),
+                        'profitability_rows': build_profitability_rows(profits[index]),
+                        'tax_rows': build_grid_tax_rows(
+                            grid, offset, snapshot.get_available_tax_codes(opf_code), snapshot
+                        ),
+                    }
+                )
+            )
+        yield (',' if start else '') + ','.join(encoded)
+    yield ']}'
+
+
+@csrf_exempt
+@require_POST
+def business_calculator_sweep(request):
+    """JSON counterpart of ``business_calculator`` for a batch of scenarios.
+
+    Batches above ``SWEEP_STREAM_THRESHOLD`` scenarios are streamed chunk by chunk.
+    """
+    max_scenarios = getattr(settings, 'CALCULATOR_SWEEP_MAX_SCENARIOS', DEFAULT_SWEEP_MAX_SCENARIOS)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except (UnicodeDecodeError, ValueError):
+        return JsonResponse({'error': 'Request body must be valid JSON'}, status=400)
+    try:
+        profits, margins, days, opf_codes = _parse_sweep_request(payload, max_scenarios)
+    except SweepRequestError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    as_of = _parse_as_of(payload.get('as_of'))
+    if payload.get('as_of') and as_of is None:
+        return JsonResponse({'error': AS_OF_ERROR}, status=400)
+
+    chunks = _iter_sweep_json(load_regulatory_snapshot(as_of=as_of), profits, margins, days, opf_codes)
+    if len(days) > SWEEP_STREAM_THRESHOLD:
+        return StreamingHttpResponse(chunks, content_type='application/json')
+    return HttpResponse(''.join(chunks), content_type='application/json')
+
+
+def business_calculator_export(request):
+    """``business_calculator`` as an XLSX workbook over a range of monthly profits.
+
+    ``profit_from``, ``profit_to`` and ``profit_step`` select the range, and
+    ``profit_step`` is required whenever ``profit_to`` is given; without
+    ``profit_from`` the workbook covers the single ``monthly_profit`` of the page.
+    ``as_of`` picks the regulatory rules in force on that date.
+    """
+    max_profits = getattr(settings, 'CALCULATOR_EXPORT_MAX_PROFITS', DEFAULT_EXPORT_MAX_PROFITS)
+    monthly_profit = _parse_decimal(request.GET.get('monthly_profit'), DEFAULT_MONTHLY_PROFIT)
+    days_in_month = _parse_positive_int(request.GET.get('days_in_month'), DEFAULT_DAYS_IN_MONTH)
+    margin_percent = _parse_margin_percent(request.GET.get('margin_percent'))
+    as_of = _parse_as_of(request.GET.get('as_of'))
+    if request.GET.get('as_of') and as_of is None:
+        return JsonResponse({'error': AS_OF_ERROR}, status=400)
+
+    if request.GET.get('profit_from'):
+        if request.GET.get('profit_to') and not request.GET.get('profit_step'):
+            return JsonResponse({'error': '"profit_step" is required with "profit_to"'}, status=400)
+        spec = {
+            'start': request.GET['profit_from'],
+            'stop': request.GET.get('profit_to') or request.GET['profit_from'],
+            'step': request.GET.get('profit_step') or 1,
+        }
+        try:
+            profits = _expand_sweep_range('monthly_profit', spec, max_profits)
+        except SweepRequestError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        monthly_profits = [_parse_decimal(profit, DEFAULT_MONTHLY_PROFIT) for profit in profits]
+    else:
+        monthly_profits = [monthly_profit]
+
+    workbook = build_calculator_workbook_file(
+        load_regulatory_snapshot(as_of=as_of), monthly_profits, margin_percent, days_in_month
+    )
+    return FileResponse(
+        workbook,
+        as_attachment=True,
+        filename='business-calculator.xlsx',
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+@staff_member_required
+def request_metrics(request):
+    """Per-view histograms collected by ``ProfilingMiddleware``."""
+    return JsonResponse(
+        {'enabled': getattr(settings, 'REQUEST_PROFILING_ENABLED', False), 'views': get_request_metrics()}
+    )
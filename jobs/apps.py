@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+
+    def ready(self):
+        # registers the built-in tasks
+        from . import tasks  # noqa: F401
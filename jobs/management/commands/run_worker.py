@@ -0,0 +1,49 @@
+import os
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.worker import DEFAULT_POLL_INTERVAL, Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает обработчик фоновых задач: берёт задачи из таблицы jobs_job, выполняет их в пуле процессов, "
+        "повторяет упавшие с нарастающей задержкой и ставит задачи по расписанию JOB_SCHEDULES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Процессов в пуле; 0 — выполнять задачи в этом процессе (по умолчанию число CPU)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=DEFAULT_POLL_INTERVAL,
+            help=f"Пауза между опросами очереди в секундах (по умолчанию {DEFAULT_POLL_INTERVAL})",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Выполнить задачи, срок которых наступил, и завершиться",
+        )
+        parser.add_argument("--no-schedule", action="store_true", help="Не ставить задачи по расписанию")
+
+    def handle(self, *args, **options):
+        if options["processes"] < 0 or options["poll_interval"] <= 0:
+            raise CommandError("--processes не может быть отрицательным, --poll-interval должен быть положительным")
+        worker = Worker(
+            processes=options["processes"],
+            poll_interval=options["poll_interval"],
+            schedule=not options["no_schedule"],
+            log=self.stdout.write,
+        )
+        # finish the running jobs instead of leaving them to the stale-job check
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f"Обработчик {worker.name}: процессов {options['processes']}")
+        finished = worker.run(burst=options["burst"])
+        self.stdout.write(self.style.SUCCESS(f"Обработчик остановлен, выполнено задач: {finished}"))
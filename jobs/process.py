@@ -0,0 +1,26 @@
+"""Entry points of the worker's pool processes.
+
+Pool processes are started with ``spawn`` and import this module before Django is set
+up, so nothing here may import models at module level.
+"""
+import signal
+
+
+def initialize_process():
+    import django
+
+    # Ctrl+C reaches the whole process group: the parent stops after the running jobs
+    # finish, so the pool processes must not be interrupted in the middle of one
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+
+
+def run_job(job_id: int):
+    from django.db import close_old_connections
+
+    from .queue import execute_job
+
+    try:
+        return execute_job(job_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,157 @@
+"""Job queue kept in the ``Job`` table.
+
+Workers claim queued jobs whose ``run_after`` has passed with a conditional UPDATE
+(``status='queued'`` -> ``'running'``), so two workers never run the same job. The
+worker process that claimed a job records its outcome: success stores the result, a
+failure requeues the job with exponential backoff until ``max_attempts`` is used up.
+While a job runs, its worker touches ``heartbeat_at`` every ``JOB_HEARTBEAT_INTERVAL``
+seconds, and so does every progress report. A job whose heartbeat is older than
+``JOB_STALE_AFTER`` seconds belonged to a worker that died and is queued again; its
+attempt number changes, so a run that turns up after all can no longer record progress
+or an outcome.
+
+``JOB_SCHEDULES`` enqueues recurring jobs, such as the daily regulatory refresh, from
+inside the app: a schedule gets a new job once its last one is ``interval`` seconds old.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from business_management.database import retry_on_busy
+
+from .models import Job
+from .registry import TASKS, JobContext, JobError, get_task
+
+DEFAULT_RETRY_DELAY = 30
+DEFAULT_MAX_RETRY_DELAY = 3600
+DEFAULT_HEARTBEAT_INTERVAL = 30
+DEFAULT_STALE_AFTER = 300
+MAX_ERROR_LENGTH = 2000
+# due jobs looked at beyond the claim limit, for the exclusive ones that have to wait
+MAX_SKIPPED_CANDIDATES = 50
+
+
+def enqueue(task: str, args: Optional[Dict] = None, run_after: Optional[datetime] = None, schedule: str = "") -> Job:
+    """Queue a run of the registered ``task`` with JSON-serializable ``args``."""
+    args = args or {}
+    if not isinstance(args, dict):
+        raise JobError("Job args must be an object")
+    try:
+        json.dumps(args)
+    except (TypeError, ValueError) as exc:
+        raise JobError(f"Job args must be JSON-serializable: {exc}")
+    registered = get_task(task)
+    registered.check_args(args)
+    return Job.objects.create(
+        task=task,
+        args=args,
+        max_attempts=registered.max_attempts,
+        run_after=run_after or timezone.now(),
+        schedule=schedule,
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the attempt after ``attempts`` failed ones."""
+    base = getattr(settings, "JOB_RETRY_DELAY", DEFAULT_RETRY_DELAY)
+    cap = getattr(settings, "JOB_MAX_RETRY_DELAY", DEFAULT_MAX_RETRY_DELAY)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+@retry_on_busy
+def claim_jobs(worker: str, limit: int) -> List[Job]:
+    """Mark up to ``limit`` due jobs as running for ``worker`` and return them."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by("run_after", "id")
+    claimed = []
+    with transaction.atomic():
+        for job_id, task_name in list(candidates.values_list("id", "task")[: limit + MAX_SKIPPED_CANDIDATES]):
+            task = TASKS.get(task_name)
+            if task is not None and task.exclusive and Job.objects.filter(task=task_name, status=Job.RUNNING).exists():
+                continue
+            if Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+                status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now, attempts=F("attempts") + 1
+            ):
+                claimed.append(job_id)
+                if len(claimed) == limit:
+                    break
+    return list(Job.objects.filter(id__in=claimed).order_by("run_after", "id"))
+
+
+def execute_job(job_id: int):
+    """Run a claimed job's task and return its result."""
+    job = Job.objects.get(id=job_id)
+    task = get_task(job.task)
+    # checked again for jobs queued before the task's signature changed
+    task.check_args(job.args)
+    return task.func(JobContext(job.id, job.attempts), **job.args)
+
+
+@retry_on_busy
+def touch_jobs(worker: str, job_ids) -> int:
+    """Heartbeat of the jobs ``worker`` is running."""
+    return Job.objects.filter(id__in=job_ids, status=Job.RUNNING, worker=worker).update(heartbeat_at=timezone.now())
+
+
+def _finish(job: Job, **fields) -> bool:
+    # only the run that still owns the job may record its outcome: a stale job that was
+    # requeued and claimed again has another worker or attempt number
+    owned = Job.objects.filter(id=job.id, status=Job.RUNNING, worker=job.worker, attempts=job.attempts)
+    return bool(owned.update(**fields))
+
+
+@retry_on_busy
+def complete_job(job: Job, result) -> bool:
+    try:
+        json.dumps(result)
+    except (TypeError, ValueError) as exc:
+        return fail_job(job, JobError(f"Task result is not JSON-serializable: {exc}"))
+    return _finish(job, status=Job.SUCCEEDED, result=result, progress=1, error="", finished_at=timezone.now())
+
+
+@retry_on_busy
+def fail_job(job: Job, exc: BaseException) -> bool:
+    """Requeue ``job`` after a backoff, or fail it for good."""
+    error = f"{type(exc).__name__}: {exc}"[:MAX_ERROR_LENGTH]
+    with transaction.atomic():
+        # keep the claimed attempt number, it is what _finish checks ownership with
+        job.refresh_from_db(fields=["max_attempts"])
+        if isinstance(exc, JobError) or job.attempts >= job.max_attempts:
+            return _finish(job, status=Job.FAILED, error=error, finished_at=timezone.now())
+        return _finish(job, status=Job.QUEUED, error=error, run_after=timezone.now() + retry_delay(job.attempts))
+
+
+@retry_on_busy
+def requeue_stale_jobs() -> int:
+    """Queue again, or fail when out of attempts, the jobs whose heartbeat stopped."""
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, "JOB_STALE_AFTER", DEFAULT_STALE_AFTER))
+    stale = Job.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff), status=Job.RUNNING
+    )
+    error = "Worker stopped responding"
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=F("max_attempts")).update(status=Job.FAILED, error=error, finished_at=now)
+        return failed + stale.update(status=Job.QUEUED, worker="", error=error)
+
+
+@retry_on_busy
+def enqueue_scheduled_jobs() -> List[Job]:
+    """Queue a job for every ``JOB_SCHEDULES`` entry whose last job is old enough."""
+    now = timezone.now()
+    queued = []
+    with transaction.atomic():
+        for name, entry in getattr(settings, "JOB_SCHEDULES", {}).items():
+            since = now - timedelta(seconds=entry["interval"])
+            if not Job.objects.filter(schedule=name, created_at__gt=since).exists():
+                queued.append(enqueue(entry["task"], entry.get("args"), schedule=name))
+    return queued
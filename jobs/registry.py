@@ -0,0 +1,99 @@
+"""Tasks the worker can run, by name.
+
+A task is a function registered with ``@task(name)``. It is called in a worker process
+with a ``JobContext`` and the job's ``args`` as keyword arguments, and returns a
+JSON-serializable result. Any exception fails the attempt and the job is retried with
+backoff, except ``JobError``, which fails the job at once (bad arguments and other
+errors a retry cannot fix). ``args`` that do not match the function's signature are
+rejected when the job is queued and again before it runs. Jobs of an ``exclusive`` task are not claimed while another
+job of the same task is running.
+"""
+from __future__ import annotations
+
+import inspect
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+from django.db import OperationalError
+from django.utils import timezone
+
+from business_management.database import is_busy_error, retry_on_busy
+
+from .models import Job
+
+DEFAULT_MAX_ATTEMPTS = 3
+# progress is written at most this often, plus once at the end
+PROGRESS_INTERVAL = 0.5
+
+
+class JobError(Exception):
+    pass
+
+
+class UnknownTaskError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    max_attempts: int
+    exclusive: bool = False
+
+    def check_args(self, args: Dict) -> None:
+        """Raise ``JobError`` unless the task can be called with ``args``."""
+        try:
+            inspect.signature(self.func).bind(None, **args)
+        except TypeError as exc:
+            raise JobError(f"Bad args for task {self.name!r}: {exc}")
+
+
+TASKS: Dict[str, Task] = {}
+
+
+def task(name: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS, exclusive: bool = False):
+    def register(func):
+        TASKS[name] = Task(name=name, func=func, max_attempts=max_attempts, exclusive=exclusive)
+        return func
+
+    return register
+
+
+def get_task(name: str) -> Task:
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise UnknownTaskError(f"Unknown task {name!r}, expected one of: {', '.join(sorted(TASKS))}")
+
+
+class JobContext:
+    """What a running task knows about its job; ``progress`` is visible to pollers."""
+
+    def __init__(self, job_id: int, attempt: int):
+        self.job_id = job_id
+        self.attempt = attempt
+        self._reported_at = 0.0
+
+    def progress(self, fraction: float, note: str = "") -> None:
+        """Record progress; it also counts as a heartbeat of the job."""
+        now = time.monotonic()
+        if fraction < 1 and now - self._reported_at < PROGRESS_INTERVAL:
+            return
+        try:
+            _record_progress(self.job_id, self.attempt, min(max(fraction, 0.0), 1.0), note[:255])
+        except OperationalError as exc:
+            # a report lost to a locked database must not fail the task; the next one is sent
+            if not is_busy_error(exc):
+                raise
+        else:
+            self._reported_at = now
+
+
+@retry_on_busy
+def _record_progress(job_id: int, attempt: int, fraction: float, note: str) -> None:
+    # a run whose job was requeued as stale no longer owns it
+    Job.objects.filter(id=job_id, status=Job.RUNNING, attempts=attempt).update(
+        progress=fraction, progress_note=note, heartbeat_at=timezone.now()
+    )
@@ -0,0 +1,71 @@
+"""Built-in tasks: regulatory refresh, rollup rebuild and report exports.
+
+Exports are written to ``JOB_FILES_DIR`` and served by ``/jobs/<id>/file/`` once the
+job has succeeded.
+"""
+from __future__ import annotations
+
+from datetime import date
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+
+from orders.reports import REPORT_FORMATS, REPORTS, ReportError, ReportFilters, iter_csv, write_xlsx
+from orders.rollups import DEFAULT_REBUILD_CHUNK_DAYS, rebuild_rollups
+
+from .registry import JobError, task
+
+DEFAULT_FILES_DIR_NAME = "job_files"
+
+
+def get_job_files_dir() -> Path:
+    return Path(getattr(settings, "JOB_FILES_DIR", Path(settings.BASE_DIR) / DEFAULT_FILES_DIR_NAME))
+
+
+@task("regulations.refresh")
+def refresh_regulations(context, force=False, effective_from=None):
+    options = {"force": bool(force), "stdout": StringIO()}
+    if effective_from:
+        try:
+            options["effective_from"] = date.fromisoformat(effective_from)
+        except (TypeError, ValueError):
+            raise JobError("effective_from must be a date in YYYY-MM-DD format")
+    call_command("refresh_regulatory_data", **options)
+    return {"output": options["stdout"].getvalue().strip()}
+
+
+# exclusive: a second rebuild would only wait for the first one's write lock
+@task("orders.rebuild_rollups", exclusive=True)
+def rebuild_order_rollups(context, chunk_days=DEFAULT_REBUILD_CHUNK_DAYS):
+    def report(processed, days_done, days_total):
+        context.progress(days_done / days_total, f"{processed} orders")
+
+    try:
+        processed = rebuild_rollups(chunk_days=int(chunk_days), on_chunk=report)
+    except (TypeError, ValueError) as exc:
+        raise JobError(str(exc))
+    return {"orders": processed}
+
+
+@task("orders.report")
+def export_order_report(context, report, format="xlsx", date_from=None, date_to=None, status=None):
+    if report not in REPORTS or format not in REPORT_FORMATS:
+        raise JobError(f"Unknown report {report}.{format}")
+    try:
+        filters = ReportFilters.from_query({"date_from": date_from, "date_to": date_to, "status": status})
+    except ReportError as exc:
+        raise JobError(str(exc))
+
+    files_dir = get_job_files_dir()
+    files_dir.mkdir(parents=True, exist_ok=True)
+    filename = f"{report}-job{context.job_id}.{format}"
+    path = files_dir / filename
+    if format == "csv":
+        with path.open("w", encoding="utf-8", newline="") as fileobj:
+            fileobj.writelines(iter_csv(REPORTS[report], filters))
+    else:
+        with path.open("wb") as fileobj:
+            write_xlsx(REPORTS[report], filters, fileobj)
+    return {"file": filename}
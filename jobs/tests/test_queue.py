@@ -0,0 +1,258 @@
+import signal
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.process import initialize_process
+from jobs.queue import (
+    claim_jobs,
+    complete_job,
+    enqueue,
+    enqueue_scheduled_jobs,
+    fail_job,
+    requeue_stale_jobs,
+    retry_delay,
+    touch_jobs,
+)
+from jobs.registry import TASKS, JobContext, JobError, Task, UnknownTaskError
+from jobs.worker import Worker
+
+
+def _add(context, a, b):
+    context.progress(0.5, 'halfway')
+    return {'sum': a + b}
+
+
+def _flaky(context):
+    raise RuntimeError('source is down')
+
+
+def _invalid(context):
+    raise JobError('bad arguments')
+
+
+def _slow(context):
+    time.sleep(0.2)
+    return {}
+
+
+TEST_TASKS = {
+    'tests.add': Task('tests.add', _add, 3),
+    'tests.flaky': Task('tests.flaky', _flaky, 2),
+    'tests.invalid': Task('tests.invalid', _invalid, 3),
+    'tests.slow': Task('tests.slow', _slow, 1),
+}
+
+
+def run_due_jobs():
+    return Worker(processes=0, schedule=False).run(burst=True)
+
+
+@override_settings(JOB_RETRY_DELAY=10, JOB_MAX_RETRY_DELAY=60, JOB_SCHEDULES={})
+class JobQueueTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(TASKS, TEST_TASKS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_runs_job_and_stores_result(self):
+        job = enqueue('tests.add', {'a': 2, 'b': 3})
+        self.assertEqual(run_due_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'sum': 5})
+        self.assertEqual(job.progress, 1)
+        self.assertEqual(job.progress_note, 'halfway')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_attempt_is_retried_with_backoff_then_fails(self):
+        job = enqueue('tests.flaky')
+        run_due_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.error, 'RuntimeError: source is down')
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+
+        # not due yet
+        self.assertEqual(run_due_jobs(), 0)
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        run_due_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_job_error_fails_without_retry(self):
+        job = enqueue('tests.invalid')
+        run_due_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.error, 'JobError: bad arguments')
+
+    def test_retry_delay_doubles_up_to_cap(self):
+        self.assertEqual([retry_delay(n).total_seconds() for n in range(1, 6)], [10, 20, 40, 60, 60])
+
+    def test_enqueue_validates_task_and_args(self):
+        with self.assertRaises(UnknownTaskError):
+            enqueue('tests.missing')
+        with self.assertRaises(JobError):
+            enqueue('tests.add', [1, 2])
+        with self.assertRaises(JobError):
+            enqueue('tests.add', {'a': object()})
+        self.assertEqual(enqueue('tests.flaky').max_attempts, 2)
+
+    def test_claimed_job_is_not_claimed_again(self):
+        first = enqueue('tests.add', {'a': 1, 'b': 1})
+        second = enqueue('tests.add', {'a': 2, 'b': 2})
+        self.assertEqual([job.id for job in claim_jobs('worker-a', 1)], [first.id])
+        self.assertEqual([job.id for job in claim_jobs('worker-b', 5)], [second.id])
+        self.assertEqual(claim_jobs('worker-c', 5), [])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.worker, first.attempts), (Job.RUNNING, 'worker-a', 1))
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_stale_running_jobs_are_requeued_or_failed(self):
+        retried = enqueue('tests.add', {'a': 1, 'b': 1})
+        exhausted = enqueue('tests.flaky')
+        claim_jobs('dead-worker', 2)
+        Job.objects.filter(id=exhausted.id).update(attempts=2)
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(requeue_stale_jobs(), 2)
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retried.status, retried.worker), (Job.QUEUED, ''))
+        self.assertEqual(exhausted.status, Job.FAILED)
+
+        run_due_jobs()
+        retried.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), (Job.SUCCEEDED, 2))
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_long_job_with_recent_heartbeat_is_not_requeued(self):
+        job = enqueue('tests.add', {'a': 1, 'b': 1})
+        claim_jobs('busy-worker', 1)
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.update(started_at=hour_ago, heartbeat_at=hour_ago)
+        self.assertEqual(touch_jobs('busy-worker', [job.id]), 1)
+        self.assertEqual(touch_jobs('other-worker', [job.id]), 0)
+
+        self.assertEqual(requeue_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.RUNNING, 'busy-worker'))
+
+    def test_progress_is_a_heartbeat_of_the_owning_run_only(self):
+        job = enqueue('tests.add', {'a': 1, 'b': 1})
+        (claimed,) = claim_jobs('worker-a', 1)
+        Job.objects.update(heartbeat_at=None)
+        JobContext(job.id, claimed.attempts).progress(0.25, 'first quarter')
+        JobContext(job.id, claimed.attempts + 1).progress(0.75, 'another run')
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.progress_note), (0.25, 'first quarter'))
+        self.assertIsNotNone(job.heartbeat_at)
+
+    @mock.patch('django.setup')
+    def test_pool_processes_ignore_ctrl_c(self, setup):
+        with mock.patch('jobs.process.signal.signal') as set_handler:
+            initialize_process()
+        set_handler.assert_called_once_with(signal.SIGINT, signal.SIG_IGN)
+        setup.assert_called_once_with()
+
+    def test_args_not_matching_the_task_fail_at_once(self):
+        with self.assertRaisesMessage(JobError, "Bad args for task 'tests.add'"):
+            enqueue('tests.add', {'a': 1, 'c': 2})
+        self.assertFalse(Job.objects.exists())
+
+        job = enqueue('tests.add', {'a': 1, 'b': 2})
+        Job.objects.update(args={'a': 1})
+        run_due_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertIn("missing a required argument: 'b'", job.error)
+
+    def test_locked_progress_report_does_not_fail_the_task(self):
+        job = enqueue('tests.add', {'a': 1, 'b': 1})
+        (claimed,) = claim_jobs('worker-a', 1)
+        context = JobContext(job.id, claimed.attempts)
+        with mock.patch('jobs.registry._record_progress', side_effect=OperationalError('database is locked')):
+            context.progress(0.25)
+        context.progress(0.5, 'halfway')
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.progress_note), (0.5, 'halfway'))
+
+    @override_settings(JOB_HEARTBEAT_INTERVAL=0.02)
+    def test_inline_job_sends_heartbeats_while_it_runs(self):
+        job = enqueue('tests.slow')
+        worker = Worker(processes=0, schedule=False)
+        with mock.patch('jobs.worker.touch_jobs', return_value=1) as touch:
+            self.assertEqual(worker.run(burst=True), 1)
+        self.assertGreater(touch.call_count, 1)
+        self.assertEqual(touch.call_args.args, (worker.name, [job.id]))
+        calls = touch.call_count
+        time.sleep(0.05)
+        self.assertEqual(touch.call_count, calls)
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_requeued_run_cannot_record_its_outcome(self):
+        job = enqueue('tests.add', {'a': 1, 'b': 1})
+        (first_run,) = claim_jobs('worker-a', 1)
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        requeue_stale_jobs()
+        (second_run,) = claim_jobs('worker-a', 1)
+
+        self.assertFalse(complete_job(first_run, {'sum': 3}))
+        self.assertFalse(fail_job(first_run, RuntimeError('late')))
+        self.assertTrue(complete_job(second_run, {'sum': 2}))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.SUCCEEDED, {'sum': 2}, 2))
+
+    def test_outcome_is_kept_while_database_is_locked(self):
+        job = enqueue('tests.add', {'a': 2, 'b': 3})
+        worker = Worker(processes=0, poll_interval=0.01, schedule=False)
+        locked = OperationalError('database is locked')
+        with mock.patch('jobs.worker.complete_job', side_effect=[locked, True]) as complete:
+            self.assertEqual(worker.run(burst=True), 1)
+        self.assertEqual(complete.call_count, 2)
+        self.assertEqual(complete.call_args.args[0].id, job.id)
+
+    def test_schedule_enqueues_once_per_interval(self):
+        schedules = {'nightly-add': {'task': 'tests.add', 'args': {'a': 1, 'b': 2}, 'interval': 3600}}
+        with override_settings(JOB_SCHEDULES=schedules):
+            self.assertEqual(len(enqueue_scheduled_jobs()), 1)
+            self.assertEqual(enqueue_scheduled_jobs(), [])
+            Job.objects.update(created_at=timezone.now() - timedelta(hours=2))
+            self.assertEqual(len(enqueue_scheduled_jobs()), 1)
+        self.assertEqual(Job.objects.filter(schedule='nightly-add').count(), 2)
+
+    @mock.patch('jobs.tasks.call_command')
+    def test_regulatory_refresh_is_scheduled_by_default(self, call_command):
+        with override_settings(JOB_SCHEDULES={'regulatory-refresh': {'task': 'regulations.refresh', 'interval': 86400}}):
+            Worker(processes=0).run(burst=True)
+        job = Job.objects.get(schedule='regulatory-refresh')
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(call_command.call_args.args, ('refresh_regulatory_data',))
+        self.assertFalse(call_command.call_args.kwargs['force'])
+
+    def test_regulatory_refresh_rejects_bad_date(self):
+        job = enqueue('regulations.refresh', {'effective_from': '01.01.2025'})
+        run_due_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_exclusive_task_waits_for_the_running_job(self):
+        first = enqueue('orders.rebuild_rollups')
+        second = enqueue('orders.rebuild_rollups')
+        other = enqueue('tests.add', {'a': 1, 'b': 1})
+        # the waiting rebuild does not take the second slot
+        self.assertEqual([job.id for job in claim_jobs('worker-a', 2)], [first.id, other.id])
+        self.assertEqual(claim_jobs('worker-b', 5), [])
+
+        Job.objects.filter(id=first.id).update(status=Job.SUCCEEDED)
+        self.assertEqual([job.id for job in claim_jobs('worker-b', 5)], [second.id])
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from jobs.models import Job
+from jobs.worker import Worker
+from orders.models import Order, OrderProduct, Product
+
+
+class JobViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user('manager', password='secret', is_staff=True)
+        cement = Product.objects.create(name='Цемент', description='', price=Decimal('5.00'), stock=0)
+        order = Order.objects.create(
+            customer_name='Иван', customer_email='ivan@example.com', status='Paid', total_price=Decimal('10.00')
+        )
+        OrderProduct.objects.create(order=order, product=cement, quantity=2, price=cement.price)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+        files_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(files_dir.cleanup)
+        settings_override = override_settings(JOB_FILES_DIR=files_dir.name, JOB_SCHEDULES={})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _enqueue(self, payload):
+        return self.client.post(reverse('enqueue_job'), json.dumps(payload), content_type='application/json')
+
+    def test_background_report_export(self):
+        response = self.client.get(reverse('orders_report', args=['sales', 'csv']), {'background': '1'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status_url'], reverse('job_status', args=[job_id]))
+        self.assertEqual(
+            self.client.get(reverse('job_progress', args=[job_id])).json(),
+            {'status': 'queued', 'progress': 0.0, 'progress_note': ''},
+        )
+
+        Worker(processes=0, schedule=False).run(burst=True)
+        status = self.client.get(reverse('job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], 'succeeded')
+        self.assertEqual(status['result'], {'file': f'sales-job{job_id}.csv'})
+
+        response = self.client.get(status['file_url'])
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(len(rows), 2)
+
+    def test_enqueue_job(self):
+        response = self._enqueue({'task': 'orders.rebuild_rollups', 'args': {'chunk_days': 30}})
+        self.assertEqual(response.status_code, 202)
+        Worker(processes=0, schedule=False).run(burst=True)
+        job = Job.objects.get(id=response.json()['id'])
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {'orders': 1}))
+
+    def test_enqueue_rejects_unknown_task_and_bad_args(self):
+        self.assertEqual(self._enqueue({'task': 'missing'}).status_code, 400)
+        self.assertEqual(self._enqueue({'task': 'orders.report', 'args': [1]}).status_code, 400)
+        self.assertEqual(self._enqueue({'task': 'orders.rebuild_rollups', 'args': {'chunk_size': 100}}).status_code, 400)
+        self.assertEqual(self._enqueue(['orders.report']).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_report_has_no_file(self):
+        job_id = self._enqueue({'task': 'orders.report', 'args': {'report': 'missing'}}).json()['id']
+        Worker(processes=0, schedule=False).run(burst=True)
+        status = self.client.get(reverse('job_status', args=[job_id])).json()
+        self.assertEqual(status['status'], 'failed')
+        self.assertNotIn('file_url', status)
+        self.assertEqual(self.client.get(reverse('job_file', args=[job_id])).status_code, 404)
+
+    def test_requires_staff_user(self):
+        self.client.logout()
+        self.assertEqual(self._enqueue({'task': 'orders.rebuild_rollups'}).status_code, 302)
+        self.assertEqual(self.client.get(reverse('job_status', args=[1])).status_code, 302)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.enqueue_job, name='enqueue_job'),
+    path('<int:job_id>/', views.job_status, name='job_status'),
+    path('<int:job_id>/progress/', views.job_progress, name='job_progress'),
+    path('<int:job_id>/file/', views.job_file, name='job_file'),
+]
@@ -0,0 +1,82 @@
+import json
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .models import Job
+from .queue import enqueue
+from .registry import JobError, UnknownTaskError
+from .tasks import get_job_files_dir
+
+
+def job_accepted_response(job):
+    return JsonResponse(
+        {'id': job.id, 'status': job.status, 'status_url': reverse('job_status', args=[job.id])},
+        status=202,
+    )
+
+
+def _job_data(job):
+    data = {
+        'id': job.id,
+        'task': job.task,
+        'args': job.args,
+        'status': job.status,
+        'progress': job.progress,
+        'progress_note': job.progress_note,
+        'result': job.result,
+        'error': job.error,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_after': job.run_after.isoformat(),
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at and job.started_at.isoformat(),
+        'finished_at': job.finished_at and job.finished_at.isoformat(),
+    }
+    if job.status == Job.SUCCEEDED and isinstance(job.result, dict) and 'file' in job.result:
+        data['file_url'] = reverse('job_file', args=[job.id])
+    return data
+
+
+@csrf_exempt
+@require_POST
+@staff_member_required
+def enqueue_job(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(data, dict) or not isinstance(data.get('task'), str):
+        return JsonResponse({'error': 'Request body must be an object with a task name'}, status=400)
+    try:
+        job = enqueue(data['task'], data.get('args'))
+    except (JobError, UnknownTaskError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return job_accepted_response(job)
+
+
+@staff_member_required
+def job_status(request, job_id):
+    return JsonResponse(_job_data(get_object_or_404(Job, id=job_id)))
+
+
+@staff_member_required
+def job_progress(request, job_id):
+    # the cheap endpoint to poll while the job runs
+    job = get_object_or_404(Job.objects.only('status', 'progress', 'progress_note'), id=job_id)
+    return JsonResponse({'status': job.status, 'progress': job.progress, 'progress_note': job.progress_note})
+
+
+@staff_member_required
+def job_file(request, job_id):
+    job = get_object_or_404(Job, id=job_id, status=Job.SUCCEEDED)
+    if not isinstance(job.result, dict) or 'file' not in job.result:
+        raise Http404('Job has no file')
+    path = get_job_files_dir() / job.result['file']
+    if not path.is_file():
+        raise Http404('Job file is gone')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
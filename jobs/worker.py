@@ -0,0 +1,204 @@
+"""The ``run_worker`` loop: claims jobs and runs them in a pool of processes.
+
+The main process polls the ``Job`` table, enqueues scheduled jobs, sends the heartbeat
+of every running job and records every outcome; the pool processes only run task code
+and report progress. They are started with ``spawn``, so none of them inherits the
+parent's database connections. With no processes, jobs run one at a time in the main
+process, which is handy for debugging; a thread then sends the heartbeat of the running
+job, so a long job without progress reports is not taken for a dead one.
+
+While another connection holds SQLite's write lock for long, for instance during
+``rebuild_rollups``, the loop's own writes fail with "database is locked". The loop
+then logs it and tries again on its next round; outcomes are kept until recorded.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+from business_management.database import is_busy_error
+
+from .process import initialize_process, run_job
+from .queue import (
+    DEFAULT_HEARTBEAT_INTERVAL,
+    claim_jobs,
+    complete_job,
+    enqueue_scheduled_jobs,
+    execute_job,
+    fail_job,
+    requeue_stale_jobs,
+    touch_jobs,
+)
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class Worker:
+    def __init__(
+        self,
+        processes: int,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        schedule: bool = True,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.schedule = schedule
+        self.log = log or (lambda message: None)
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stopping = False
+        self.heartbeat_interval = getattr(settings, "JOB_HEARTBEAT_INTERVAL", DEFAULT_HEARTBEAT_INTERVAL)
+        self._beaten_at = time.monotonic()
+        # (job, result, exception) not recorded yet because the database was locked
+        self._outcomes = []
+
+    def stop(self, *args) -> None:
+        """Claim nothing more and return once the running jobs finish."""
+        self.stopping = True
+
+    def run(self, burst: bool = False) -> int:
+        """Process jobs until stopped; with ``burst``, until no job is due. Returns jobs run."""
+        if self.processes <= 0:
+            return self._run_inline(burst)
+        pool = self._new_pool()
+        running = {}
+        finished = 0
+        broken = False
+        try:
+            while True:
+                finished += self._record_outcomes()
+                if not self.stopping and not broken:
+                    for job in self._poll(self.processes - len(running)):
+                        self.log(f"Задача {job.id} ({job.task}) запущена, попытка {job.attempts}")
+                        running[pool.submit(run_job, job.id)] = job
+                self._heartbeat([job.id for job in running.values()])
+                if not running:
+                    if (burst or self.stopping) and not self._outcomes:
+                        return finished
+                    time.sleep(self.poll_interval)
+                    continue
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        self._outcomes.append((job, future.result(), None))
+                    except BrokenProcessPool as exc:
+                        # a pool process died (killed, out of memory): the pool takes no more work,
+                        # so its jobs count as failed attempts and a new pool replaces it
+                        broken = True
+                        self._outcomes.append((job, None, exc))
+                    except Exception as exc:
+                        self._outcomes.append((job, None, exc))
+                if broken and not running:
+                    pool.shutdown(wait=True)
+                    pool = self._new_pool()
+                    broken = False
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initialize_process,
+        )
+
+    def _run_inline(self, burst: bool) -> int:
+        finished = 0
+        while True:
+            finished += self._record_outcomes()
+            jobs = [] if self.stopping else self._poll(1)
+            if not jobs:
+                if (burst or self.stopping) and not self._outcomes:
+                    return finished
+                time.sleep(self.poll_interval)
+                continue
+            job = jobs[0]
+            self.log(f"Задача {job.id} ({job.task}) запущена, попытка {job.attempts}")
+            finished_job = threading.Event()
+            beating = threading.Thread(target=self._beat_until, args=(job.id, finished_job), daemon=True)
+            beating.start()
+            try:
+                self._outcomes.append((job, execute_job(job.id), None))
+            except Exception as exc:
+                self._outcomes.append((job, None, exc))
+            finally:
+                finished_job.set()
+                beating.join()
+
+    def _beat_until(self, job_id: int, finished: threading.Event) -> None:
+        """Send the heartbeat of an inline job from a thread until ``finished`` is set."""
+        try:
+            while not finished.wait(self.heartbeat_interval):
+                self._heartbeat([job_id])
+        except Exception as exc:
+            self.log(f"Пульс задачи {job_id} остановлен: {exc!r}")
+        finally:
+            connection.close()
+
+    def _locked(self, exc: OperationalError, action: str) -> None:
+        if not is_busy_error(exc):
+            raise exc
+        self.log(f"База данных заблокирована, {action} — в следующем цикле")
+
+    def _poll(self, limit: int) -> List:
+        """Enqueue scheduled jobs, requeue stale ones and claim up to ``limit`` jobs."""
+        try:
+            if self.schedule:
+                for job in enqueue_scheduled_jobs():
+                    self.log(f"Задача {job.id} ({job.task}) поставлена по расписанию {job.schedule}")
+            requeue_stale_jobs()
+            return claim_jobs(self.name, limit)
+        except OperationalError as exc:
+            self._locked(exc, "очередь будет прочитана")
+            return []
+
+    def _heartbeat(self, job_ids: List[int]) -> None:
+        if not job_ids or time.monotonic() - self._beaten_at < self.heartbeat_interval:
+            return
+        try:
+            touch_jobs(self.name, job_ids)
+        except OperationalError as exc:
+            self._locked(exc, "пульс задач будет отправлен")
+        else:
+            self._beaten_at = time.monotonic()
+
+    def _record_outcomes(self) -> int:
+        pending, self._outcomes = self._outcomes, []
+        for index, (job, result, exc) in enumerate(pending):
+            try:
+                if exc is None:
+                    self._succeeded(job, result)
+                else:
+                    self._failed(job, exc)
+            except OperationalError as error:
+                self._locked(error, "результаты задач будут записаны")
+                self._outcomes = pending[index:]
+                return index
+        return len(pending)
+
+    def _succeeded(self, job, result) -> None:
+        if complete_job(job, result):
+            self.log(f"Задача {job.id} ({job.task}) выполнена")
+        else:
+            self.log(f"Задача {job.id} ({job.task}) выполнена, но уже передана другому обработчику")
+
+    def _failed(self, job, exc) -> None:
+        if not fail_job(job, exc):
+            self.log(f"Задача {job.id} ({job.task}) завершилась ошибкой {exc!r}, но уже передана другому обработчику")
+            return
+        job.refresh_from_db(fields=["status", "run_after"])
+        if job.status == job.QUEUED:
+            self.log(f"Задача {job.id} ({job.task}) завершилась ошибкой {exc!r}, повтор после {job.run_after:%H:%M:%S}")
+        else:
+            self.log(f"Задача {job.id} ({job.task}) не выполнена: {exc!r}")
@@ -1,5 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_init, post_save
 
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'orders'
\ No newline at end of file
+    name = 'orders'
+
+    def ready(self):
+        from .catalog import product_changed
+        from .delivery import logistics_changed
+        from .models import Logistics, Order, Product
+        from .rollups import order_saved, remember_order
+
+        post_save.connect(logistics_changed, sender=Logistics, dispatch_uid='delivery_table_logistics_saved')
+        post_delete.connect(logistics_changed, sender=Logistics, dispatch_uid='delivery_table_logistics_deleted')
+        post_save.connect(product_changed, sender=Product, dispatch_uid='product_catalog_product_saved')
+        post_delete.connect(product_changed, sender=Product, dispatch_uid='product_catalog_product_deleted')
+        post_init.connect(remember_order, sender=Order, dispatch_uid='rollups_order_initialized')
+        post_save.connect(order_saved, sender=Order, dispatch_uid='rollups_order_saved')
@@ -0,0 +1,162 @@
+"""Read-through cache of the product fields used for pricing.
+
+``product_catalog.get_many(ids)`` returns ``ProductRecord`` entries and loads all the
+misses with one query. Records are immutable and every pricing call asks for its whole
+cart at once, so a request prices every line from the same records even while other
+requests invalidate them.
+
+Saving or deleting a ``Product`` through the ORM drops its record and bumps the
+product's own stock version (signal handlers are registered in ``OrdersConfig.ready``);
+a load that started before the bump is served but not kept, so a record never outlives
+the change it raced with. ``invalidate_all`` bumps the catalog version,
+which turns every cached record into a miss; it also happens every
+``PRODUCT_CATALOG_TTL`` seconds so price changes made by other processes or by
+``QuerySet.update`` are picked up. Because of that delay the catalog only serves
+quotes; ``place_order`` reads the prices it charges inside its own transaction.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, Iterable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import Product
+
+DEFAULT_CATALOG_TTL = 60
+
+
+class ProductRecord:
+    """Pricing view of a product; ``__slots__`` keeps a million of them cheap.
+
+    ``version`` is the catalog version and ``stock_version`` the product's own version
+    the record was loaded at.
+    """
+
+    __slots__ = ("id", "name", "price", "version", "stock_version")
+
+    def __init__(self, id: int, name: str, price: Decimal, version: int, stock_version: int = 0):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.version = version
+        self.stock_version = stock_version
+
+    def __repr__(self) -> str:
+        return f"<ProductRecord {self.id} {self.name!r} {self.price} v{self.version}.{self.stock_version}>"
+
+
+class ProductCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[int, ProductRecord] = {}
+        self._version = 0
+        # product id -> stock version, bumped by every invalidation of the product
+        self._stock_versions: Dict[int, int] = {}
+        self._expires_at = 0.0
+        self._hits = 0
+        self._misses = 0
+
+    def _current_version(self) -> int:
+        if time.monotonic() >= self._expires_at:
+            with self._lock:
+                if time.monotonic() >= self._expires_at:
+                    self._bump()
+        return self._version
+
+    def _bump(self) -> None:
+        # callers hold the lock
+        self._version += 1
+        self._records = {}
+        # loads started before the bump are discarded by the version check anyway
+        self._stock_versions = {}
+        self._expires_at = time.monotonic() + getattr(settings, "PRODUCT_CATALOG_TTL", DEFAULT_CATALOG_TTL)
+
+    def _cached(self, product_ids: Iterable[int]):
+        version = self._current_version()
+        records = self._records
+        found = {}
+        missing = set()
+        for product_id in product_ids:
+            record = records.get(product_id)
+            if record is not None and record.version == version:
+                found[product_id] = record
+            else:
+                missing.add(product_id)
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(missing)
+            token = (version, {product_id: self._stock_versions.get(product_id, 0) for product_id in missing})
+        return token, found, missing
+
+    def _load(self, token, product_ids) -> Dict[int, ProductRecord]:
+        version, stock_versions = token
+        loaded = {
+            product_id: ProductRecord(product_id, name, price, version, stock_versions.get(product_id, 0))
+            for product_id, name, price in Product.objects.filter(id__in=product_ids).values_list("id", "name", "price")
+        }
+        with self._lock:
+            # rows read before their product was invalidated may be outdated: serve them, don't keep them
+            if version == self._version:
+                self._records.update(
+                    (product_id, record)
+                    for product_id, record in loaded.items()
+                    if record.stock_version == self._stock_versions.get(product_id, 0)
+                )
+        return loaded
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, ProductRecord]:
+        """Records of the known ``product_ids``; unknown ids are left out."""
+        token, found, missing = self._cached(set(product_ids))
+        if missing:
+            found.update(self._load(token, missing))
+        return found
+
+    async def aget_many(self, product_ids: Iterable[int]) -> Dict[int, ProductRecord]:
+        """Async ``get_many``: only the query for misses leaves the event loop."""
+        token, found, missing = self._cached(set(product_ids))
+        if missing:
+            found.update(await sync_to_async(self._load)(token, missing))
+        return found
+
+    def invalidate(self, product_ids: Iterable[int]) -> None:
+        with self._lock:
+            for product_id in product_ids:
+                self._stock_versions[product_id] = self._stock_versions.get(product_id, 0) + 1
+                self._records.pop(product_id, None)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._bump()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bump()
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._records), "version": self._version, "hits": self._hits, "misses": self._misses}
+
+
+product_catalog = ProductCatalog()
+
+
+def clear_product_catalog() -> None:
+    product_catalog.clear()
+
+
+def get_product_catalog_stats() -> Dict[str, int]:
+    return product_catalog.stats()
+
+
+def product_changed(sender, instance, **kwargs):
+    """``post_save``/``post_delete`` receiver for ``Product``, run now and on commit."""
+    product_ids = (instance.pk,)
+    product_catalog.invalidate(product_ids)
+    transaction.on_commit(lambda: product_catalog.invalidate(product_ids))
@@ -0,0 +1,179 @@
+"""Delivery quotes served from an in-memory table of ``Logistics`` options.
+
+The table maps a product id to its delivery options and is loaded with one query. When
+``Logistics`` rows are saved or deleted through the ORM, the signal handlers registered
+in ``OrdersConfig.ready`` mark those products stale, and the next quote reloads only
+the stale products that are in the cart. Writes that bypass signals (``bulk_create``,
+``QuerySet.update``) and writes from other processes show up after
+``DELIVERY_TABLE_TTL`` seconds, when the whole table is reloaded.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, Mapping, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import Logistics
+
+CHEAPEST = "cheapest"
+FASTEST = "fastest"
+STRATEGIES = (CHEAPEST, FASTEST)
+
+# the option's cost is charged once per cart line, or once per unit of the line
+PER_LINE = "per_line"
+PER_UNIT = "per_unit"
+COST_MODES = (PER_LINE, PER_UNIT)
+
+DEFAULT_TABLE_TTL = 300
+
+
+class DeliveryError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class DeliveryOption:
+    __slots__ = ("cost", "days")
+
+    cost: Decimal
+    days: int
+
+
+@dataclass(frozen=True)
+class DeliveryQuote:
+    cost: Decimal
+    # the order arrives with its slowest line; None when no line has a delivery option
+    days: Optional[int]
+    options: Mapping[int, DeliveryOption]
+
+
+_SORT_KEYS = {
+    CHEAPEST: lambda option: (option.cost, option.days),
+    FASTEST: lambda option: (option.days, option.cost),
+}
+
+
+def check_delivery_options(strategy: str, cost_mode: str) -> None:
+    if strategy not in STRATEGIES:
+        raise DeliveryError(f"Unknown delivery strategy {strategy!r}, expected one of: {', '.join(STRATEGIES)}")
+    if cost_mode not in COST_MODES:
+        raise DeliveryError(f"Unknown delivery cost mode {cost_mode!r}, expected one of: {', '.join(COST_MODES)}")
+
+
+def _best_options(options: Iterable[DeliveryOption]) -> Dict[str, DeliveryOption]:
+    options = tuple(options)
+    return {strategy: min(options, key=key) for strategy, key in _SORT_KEYS.items()}
+
+
+class DeliveryTable:
+    """Best delivery option per product and strategy, kept in memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._best: Dict[int, Dict[str, DeliveryOption]] = {}
+        self._stale: Set[int] = set()
+        self._loaded_at: Optional[float] = None
+
+    def _ttl(self) -> float:
+        return getattr(settings, "DELIVERY_TABLE_TTL", DEFAULT_TABLE_TTL)
+
+    def _needs_query(self, product_ids: Iterable[int]) -> bool:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self._ttl():
+            return True
+        stale = self._stale
+        return bool(stale) and not stale.isdisjoint(product_ids)
+
+    def _load(self, product_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, DeliveryOption]]:
+        rows = Logistics.objects.values_list("product_id", "delivery_cost", "estimated_delivery_time")
+        if product_ids is not None:
+            rows = rows.filter(product_id__in=product_ids)
+        options: Dict[int, list] = {}
+        for product_id, cost, days in rows:
+            options.setdefault(product_id, []).append(DeliveryOption(cost, days))
+        return {product_id: _best_options(product_options) for product_id, product_options in options.items()}
+
+    def refresh(self, product_ids: Iterable[int]) -> None:
+        """Reload the whole table if it expired, else the stale ones of ``product_ids``."""
+        product_ids = set(product_ids)
+        with self._lock:
+            loaded_at = self._loaded_at
+            if loaded_at is None or time.monotonic() - loaded_at > self._ttl():
+                self._stale = set()
+                self._best = self._load()
+                self._loaded_at = time.monotonic()
+                return
+            reload_ids = self._stale & product_ids
+            if not reload_ids:
+                return
+            self._stale = self._stale - reload_ids
+            best = dict(self._best)
+            for product_id in reload_ids:
+                best.pop(product_id, None)
+            best.update(self._load(reload_ids))
+            self._best = best
+
+    def quote(self, demand: Mapping[int, int], strategy: str = CHEAPEST, cost_mode: str = PER_LINE) -> DeliveryQuote:
+        """Quote ``demand`` (product id -> quantity); products without options are free."""
+        check_delivery_options(strategy, cost_mode)
+        if self._needs_query(demand):
+            self.refresh(demand)
+        return self._quote(demand, strategy, cost_mode)
+
+    async def aquote(self, demand: Mapping[int, int], strategy: str = CHEAPEST, cost_mode: str = PER_LINE) -> DeliveryQuote:
+        """Async ``quote``: only a table reload, when needed, leaves the event loop."""
+        check_delivery_options(strategy, cost_mode)
+        if self._needs_query(demand):
+            await sync_to_async(self.refresh)(demand)
+        return self._quote(demand, strategy, cost_mode)
+
+    def _quote(self, demand: Mapping[int, int], strategy: str, cost_mode: str) -> DeliveryQuote:
+        best = self._best
+        chosen = {}
+        cost = Decimal("0")
+        for product_id, quantity in demand.items():
+            product_options = best.get(product_id)
+            if product_options is None:
+                continue
+            option = chosen[product_id] = product_options[strategy]
+            cost += option.cost * quantity if cost_mode == PER_UNIT else option.cost
+        days = max((option.days for option in chosen.values()), default=None)
+        return DeliveryQuote(cost=cost, days=days, options=chosen)
+
+    def invalidate(self, product_ids: Iterable[int] = ()) -> None:
+        """Mark ``product_ids`` stale; without ids, drop the whole table."""
+        product_ids = set(product_ids)
+        with self._lock:
+            if product_ids:
+                self._stale = self._stale | product_ids
+            else:
+                self._best = {}
+                self._stale = set()
+                self._loaded_at = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"products": len(self._best), "stale": len(self._stale)}
+
+
+delivery_table = DeliveryTable()
+
+
+def invalidate_delivery_table() -> None:
+    delivery_table.invalidate()
+
+
+def logistics_changed(sender, instance, **kwargs):
+    """``post_save``/``post_delete`` receiver for ``Logistics``.
+
+    The product is marked stale right away, which makes this process read its own
+    uncommitted changes, and again on commit so no reload can keep the old rows.
+    """
+    product_ids = (instance.product_id,)
+    delivery_table.invalidate(product_ids)
+    transaction.on_commit(lambda: delivery_table.invalidate(product_ids))
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from business_management.database import retry_on_busy
+from business_management.lru import LRUCache
+
+from .models import IdempotencyKey, Order
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+DEFAULT_CACHE_SIZE = 1024
+
+# key -> (request_hash, order_id) for keys committed by this process
+_recent_keys = LRUCache(getattr(settings, "ORDERS_IDEMPOTENCY_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+
+
+class IdempotencyKeyError(ValueError):
+    pass
+
+
+class IdempotencyKeyReusedError(IdempotencyKeyError):
+    def __init__(self, key: str):
+        self.key = key
+        super().__init__(f"Idempotency key {key!r} was already used for a different request")
+
+
+def request_fingerprint(*parts) -> str:
+    encoded = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _lookup(key: str) -> Optional[Tuple[str, Optional[int]]]:
+    cached = _recent_keys.get(key)
+    if cached is not None:
+        return cached
+    stored = IdempotencyKey.objects.filter(key=key).values_list("request_hash", "order_id").first()
+    if stored is not None and stored[1] is not None:
+        _recent_keys.set(key, stored)
+    return stored
+
+
+def _resolve(key: str, fingerprint: str, stored: Tuple[str, Optional[int]]) -> int:
+    request_hash, order_id = stored
+    if request_hash != fingerprint:
+        raise IdempotencyKeyReusedError(key)
+    return order_id
+
+
+@retry_on_busy
+def _claim_and_create(key: str, fingerprint: str, create_order: Callable[[], Order]) -> Order:
+    with transaction.atomic():
+        record = IdempotencyKey.objects.create(key=key, request_hash=fingerprint)
+        order = create_order()
+        IdempotencyKey.objects.filter(pk=record.pk).update(order=order)
+    return order
+
+
+def run_once(key: str, fingerprint: str, create_order: Callable[[], Order]) -> Tuple[int, bool]:
+    """Run ``create_order`` at most once per idempotency key.
+
+    Returns ``(order_id, created)``. A key seen before is answered from the in-memory
+    front cache or the ``IdempotencyKey`` table without touching the order tables. A new
+    key is claimed by inserting its row in the same transaction as the order: a
+    concurrent request with the same key fails on the unique index, after the first one
+    commits, and then returns the committed order. Failed attempts roll the key back, so
+    they can be retried.
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyKeyError(f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters long")
+
+    stored = _lookup(key)
+    if stored is not None:
+        return _resolve(key, fingerprint, stored), False
+
+    try:
+        order = _claim_and_create(key, fingerprint, create_order)
+    except IntegrityError:
+        stored = _lookup(key)
+        if stored is None:
+            raise
+        return _resolve(key, fingerprint, stored), False
+
+    transaction.on_commit(lambda: _recent_keys.set(key, (fingerprint, order.id)))
+    return order.id, True
+
+
+def clear_idempotency_cache() -> None:
+    _recent_keys.clear()
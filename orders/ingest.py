@@ -0,0 +1,206 @@
+"""Bulk import of orders from ERP exports.
+
+Records are plain dicts, one per order::
+
+    {"customer_name": "...", "customer_email": "...", "status": "Pending",
+     "items": [{"product_id": 1, "quantity": 2}, ...]}
+
+``product_ids``/``quantities`` lists, as sent to ``/orders/create/``, are accepted
+instead of ``items``; repeated products are merged into one line. Records are
+committed in chunks: each chunk loads its products with one query and inserts its
+orders and lines with two ``bulk_create`` calls inside one transaction, which also
+updates the daily sales rollups. Invalid records are skipped and reported; they never
+abort a chunk. Imported orders are recorded as they come from the ERP and do not
+reserve stock.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+
+from .models import Order, OrderProduct, Product
+from .pricing import PricingError, merge_cart_lines, parse_cart
+from .rollups import record_order_lines, record_orders
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+class RecordError(ValueError):
+    pass
+
+
+@dataclass
+class ChunkReport:
+    index: int
+    orders: int
+    lines: int
+    rejected: int
+    seconds: float
+
+    @property
+    def orders_per_second(self) -> float:
+        return self.orders / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "chunk": self.index,
+            "orders": self.orders,
+            "lines": self.lines,
+            "rejected": self.rejected,
+            "seconds": round(self.seconds, 4),
+            "orders_per_second": round(self.orders_per_second, 1),
+        }
+
+
+@dataclass
+class ImportReport:
+    chunks: List[ChunkReport] = field(default_factory=list)
+    errors: List[Dict] = field(default_factory=list)
+    rejected: int = 0
+
+    @property
+    def orders(self) -> int:
+        return sum(chunk.orders for chunk in self.chunks)
+
+    @property
+    def lines(self) -> int:
+        return sum(chunk.lines for chunk in self.chunks)
+
+    @property
+    def seconds(self) -> float:
+        return sum(chunk.seconds for chunk in self.chunks)
+
+    def add_error(self, record_number: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"record": record_number, "error": message})
+
+    def as_dict(self) -> Dict:
+        return {
+            "orders": self.orders,
+            "lines": self.lines,
+            "rejected": self.rejected,
+            "seconds": round(self.seconds, 4),
+            "chunks": [chunk.as_dict() for chunk in self.chunks],
+            "errors": self.errors,
+        }
+
+
+def parse_record(record) -> Tuple[str, str, str, Dict[int, int]]:
+    if not isinstance(record, dict):
+        raise RecordError("Record must be a JSON object")
+    customer_name = record.get("customer_name")
+    customer_email = record.get("customer_email")
+    if not customer_name or not customer_email:
+        raise RecordError("customer_name and customer_email are required")
+
+    if "items" in record:
+        items = record["items"]
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise RecordError("items must be a list of objects")
+        product_ids = [item.get("product_id") for item in items]
+        quantities = [item.get("quantity") for item in items]
+    else:
+        product_ids = record.get("product_ids") or []
+        quantities = record.get("quantities") or []
+    try:
+        cart = parse_cart(product_ids, quantities)
+    except PricingError as exc:
+        raise RecordError(str(exc))
+    if not cart:
+        raise RecordError("Order has no lines")
+    return customer_name, customer_email, record.get("status") or "Pending", merge_cart_lines(cart)
+
+
+def iter_ndjson(lines: Iterable) -> Iterator:
+    """Decode newline-delimited JSON, yielding ``RecordError`` for undecodable lines."""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield RecordError(f"Invalid JSON: {exc}")
+
+
+def _import_chunk(index: int, numbered_records, report: ImportReport) -> ChunkReport:
+    started = time.perf_counter()
+    rejected_before = report.rejected
+    parsed = []
+    for number, record in numbered_records:
+        if isinstance(record, RecordError):
+            report.add_error(number, str(record))
+            continue
+        try:
+            parsed.append((number, parse_record(record)))
+        except RecordError as exc:
+            report.add_error(number, str(exc))
+
+    products = Product.objects.in_bulk({pid for _, (_, _, _, cart) in parsed for pid in cart})
+    orders = []
+    carts = []
+    for number, (customer_name, customer_email, status, cart) in parsed:
+        missing = sorted(pid for pid in cart if pid not in products)
+        if missing:
+            report.add_error(number, f"Unknown product ids: {', '.join(str(pid) for pid in missing)}")
+            continue
+        orders.append(
+            Order(
+                customer_name=customer_name,
+                customer_email=customer_email,
+                status=status,
+                total_price=sum((products[pid].price * qty for pid, qty in cart.items()), Decimal("0")),
+            )
+        )
+        carts.append(cart)
+
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        lines = [
+            OrderProduct(order=order, product_id=pid, quantity=qty, price=products[pid].price)
+            for order, cart in zip(orders, carts)
+            for pid, qty in cart.items()
+        ]
+        OrderProduct.objects.bulk_create(lines)
+        # bulk_create sends no signals, so the rollups are updated here
+        record_orders(orders)
+        record_order_lines(zip(orders, carts), {pid: product.price for pid, product in products.items()})
+
+    return ChunkReport(
+        index=index,
+        orders=len(orders),
+        lines=len(lines),
+        rejected=report.rejected - rejected_before,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def import_orders(
+    records: Iterable,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[ChunkReport], None]] = None,
+) -> ImportReport:
+    """Import ``records`` in transactions of ``chunk_size`` orders each."""
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    report = ImportReport()
+    numbered = enumerate(records, start=1)
+    for index in itertools.count(1):
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            break
+        chunk_report = _import_chunk(index, chunk, report)
+        report.chunks.append(chunk_report)
+        if on_chunk is not None:
+            on_chunk(chunk_report)
+    return report
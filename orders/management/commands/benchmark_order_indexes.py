@@ -0,0 +1,146 @@
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Sum
+
+from orders.models import Logistics, Order, OrderProduct
+
+BENCHMARK_ALIAS = "orders_index_benchmark"
+MIGRATION_BEFORE = "0002_idempotencykey"
+MIGRATION_AFTER = "0003_order_indexes_and_unique_lines"
+STATUSES = ("Pending", "Paid", "Shipped", "Delivered", "Cancelled")
+SEED_BATCH = 50000
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет отдельную SQLite-базу заказами и сравнивает время типовых запросов "
+        "к заказам до и после миграции с индексами orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1_000_000, help="Количество заказов (по умолчанию 1 000 000)")
+        parser.add_argument("--products", type=int, default=2000, help="Количество товаров")
+        parser.add_argument("--customers", type=int, default=50000, help="Количество разных email покупателей")
+        parser.add_argument("--repeat", type=int, default=5, help="Сколько раз выполнять каждый запрос")
+        parser.add_argument(
+            "--database",
+            help="Путь к файлу SQLite; по умолчанию создаётся временный файл и удаляется после замера",
+        )
+
+    def handle(self, *args, **options):
+        if options["orders"] <= 0 or options["repeat"] <= 0:
+            raise CommandError("--orders и --repeat должны быть положительными")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = options["database"] or str(Path(tmp_dir) / "orders_benchmark.sqlite3")
+            connections.settings[BENCHMARK_ALIAS] = connections.configure_settings(
+                {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": path}}
+            )["default"]
+            try:
+                self._run(options)
+            finally:
+                connections[BENCHMARK_ALIAS].close()
+                del connections[BENCHMARK_ALIAS]
+                del connections.settings[BENCHMARK_ALIAS]
+
+    def _run(self, options):
+        call_command("migrate", "orders", MIGRATION_BEFORE, database=BENCHMARK_ALIAS, verbosity=0)
+        rng = random.Random(42)
+        started = time.perf_counter()
+        self._seed(rng, options)
+        self.stdout.write(f"Заполнено {options['orders']} заказов за {time.perf_counter() - started:.1f} с")
+
+        queries = self._queries(rng, options)
+        before = self._measure(queries, options["repeat"])
+        started = time.perf_counter()
+        call_command("migrate", "orders", MIGRATION_AFTER, database=BENCHMARK_ALIAS, verbosity=0)
+        self.stdout.write(f"Миграция с индексами применена за {time.perf_counter() - started:.1f} с")
+        after = self._measure(queries, options["repeat"])
+
+        self.stdout.write(f"{'Запрос':<32}{'до, мс':>12}{'после, мс':>12}{'ускорение':>12}")
+        for name in queries:
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            self.stdout.write(f"{name:<32}{before[name]:>12.2f}{after[name]:>12.2f}{speedup:>11.1f}x")
+
+    def _seed(self, rng, options):
+        connection = connections[BENCHMARK_ALIAS]
+        now = datetime(2025, 1, 1)
+        with transaction.atomic(using=BENCHMARK_ALIAS), connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO orders_product (name, description, price, stock, created_at) VALUES (%s, %s, %s, %s, %s)",
+                [(f"Товар {index}", "", str(Decimal(rng.randint(100, 100000)) / 100), 1000, now.isoformat(sep=" "))
+                 for index in range(options["products"])],
+            )
+            cursor.executemany(
+                "INSERT INTO orders_logistics (product_id, delivery_cost, estimated_delivery_time) VALUES (%s, %s, %s)",
+                [(pid, str(rng.randint(100, 2000)), rng.randint(1, 14))
+                 for pid in range(1, options["products"] + 1) for _ in range(2)],
+            )
+            for start in range(0, options["orders"], SEED_BATCH):
+                count = min(SEED_BATCH, options["orders"] - start)
+                cursor.executemany(
+                    "INSERT INTO orders_order (customer_name, customer_email, order_date, status, total_price) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    [
+                        (
+                            "Покупатель",
+                            f"customer{rng.randrange(options['customers'])}@example.com",
+                            (now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))).isoformat(sep=" "),
+                            rng.choice(STATUSES),
+                            "1000.00",
+                        )
+                        for _ in range(count)
+                    ],
+                )
+                cursor.executemany(
+                    "INSERT INTO orders_orderproduct (order_id, product_id, quantity) VALUES (%s, %s, %s)",
+                    [
+                        (order_id, rng.randint(1, options["products"]), rng.randint(1, 5))
+                        for order_id in range(start + 1, start + count + 1)
+                    ],
+                )
+        connection.close()
+
+    def _queries(self, rng, options):
+        db = BENCHMARK_ALIAS
+        email = f"customer{rng.randrange(options['customers'])}@example.com"
+        period = (datetime(2024, 6, 1, tzinfo=timezone.utc), datetime(2024, 7, 1, tzinfo=timezone.utc))
+        cart = [rng.randint(1, options["products"]) for _ in range(20)]
+        order_id = rng.randint(1, options["orders"])
+        return {
+            "latest_orders": lambda: list(Order.objects.using(db).order_by("-order_date").values_list("id")[:50]),
+            "status_latest": lambda: list(
+                Order.objects.using(db).filter(status="Shipped").order_by("-order_date").values_list("id")[:50]
+            ),
+            "status_period_count": lambda: Order.objects.using(db).filter(
+                status="Pending", order_date__range=period
+            ).count(),
+            "customer_history": lambda: list(
+                Order.objects.using(db).filter(customer_email=email).order_by("-order_date").values_list("id")
+            ),
+            "order_lines": lambda: list(OrderProduct.objects.using(db).filter(order_id=order_id).values_list("id")),
+            "cart_delivery_quote": lambda: Logistics.objects.using(db).filter(product__in=cart).aggregate(
+                total=Sum("delivery_cost")
+            ),
+        }
+
+    def _measure(self, queries, repeat):
+        results = {}
+        for name, query in queries.items():
+            query()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+        return results
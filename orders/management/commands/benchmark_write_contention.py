@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections
+
+from business_management.database import get_busy_retry_stats, is_busy_error
+from orders.models import Product
+from orders.services import place_order
+
+READY_SUFFIX = ".ready"
+GO_FILE = "go"
+WORKER_TIMEOUT = 600
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает несколько процессов, которые одновременно создают заказы в отдельной SQLite-базе, "
+        "и сравнивает пропускную способность и долю ошибок «database is locked» для профилей БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4, help="Количество процессов-писателей (по умолчанию 4)")
+        parser.add_argument("--orders", type=int, default=200, help="Заказов на процесс (по умолчанию 200)")
+        parser.add_argument("--cart-size", type=int, default=3, help="Позиций в заказе (по умолчанию 3)")
+        parser.add_argument("--products", type=int, default=50, help="Товаров в базе (по умолчанию 50)")
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            choices=sorted(settings.DATABASE_PROFILES),
+            default=["development", "production"],
+            help="Профили из DATABASE_PROFILES, каждый замеряется на своей новой базе",
+        )
+        # processes started by the command itself: database setup and writers
+        parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+        parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+        parser.add_argument("--barrier", help=argparse.SUPPRESS)
+        parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["prepare"]:
+            return self._prepare(options)
+        if options["worker"]:
+            return self._work(options)
+        if min(options["processes"], options["orders"], options["cart_size"]) <= 0:
+            raise CommandError("--processes, --orders и --cart-size должны быть положительными")
+        if options["cart_size"] > options["products"]:
+            raise CommandError("--cart-size не может быть больше --products")
+
+        self.stdout.write(
+            f"{options['processes']} процессов по {options['orders']} заказов, {options['cart_size']} позиций в заказе"
+        )
+        self.stdout.write(
+            f"{'Профиль':<14}{'заказов/с':>12}{'создано':>10}{'блокировок':>12}{'доля ошибок':>13}{'повторов':>10}"
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for profile in options["profiles"]:
+                path = Path(tmp_dir) / f"{profile}.sqlite3"
+                totals = self._run(profile, path, Path(tmp_dir) / profile, options)
+                attempts = totals["created"] + totals["locked"]
+                self.stdout.write(
+                    f"{profile:<14}{totals['created'] / totals['seconds'] if totals['seconds'] else 0:>12.1f}"
+                    f"{totals['created']:>10}{totals['locked']:>12}{totals['locked'] / attempts:>12.1%}"
+                    f"{totals['retries']:>10}"
+                )
+
+    def _command(self, profile, path, *arguments):
+        """This command in a new process, with ``path`` as its database."""
+        return {
+            "args": [sys.executable, str(Path(settings.BASE_DIR) / "manage.py"), "benchmark_write_contention", *arguments],
+            "env": {**os.environ, "DATABASE_PROFILE": profile, "DATABASE_PATH": str(path)},
+            "cwd": settings.BASE_DIR,
+        }
+
+    def _run(self, profile, path, barrier, options):
+        prepare = subprocess.run(
+            **self._command(profile, path, "--prepare", f"--products={options['products']}"),
+            capture_output=True,
+            text=True,
+            timeout=WORKER_TIMEOUT,
+        )
+        if prepare.returncode != 0:
+            raise CommandError(f"Не удалось подготовить базу профиля {profile}: {prepare.stderr.strip()}")
+
+        barrier.mkdir()
+        arguments = ["--worker", f"--barrier={barrier}", f"--orders={options['orders']}", f"--cart-size={options['cart_size']}"]
+        workers = [
+            subprocess.Popen(
+                **self._command(profile, path, *arguments, f"--seed={index}"),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            for index in range(options["processes"])
+        ]
+        try:
+            # start every worker at once, after all of them loaded Django
+            deadline = time.monotonic() + WORKER_TIMEOUT
+            while len(list(barrier.glob(f"*{READY_SUFFIX}"))) < len(workers):
+                if time.monotonic() > deadline or any(worker.poll() is not None for worker in workers):
+                    raise CommandError(f"Процессы профиля {profile} не запустились")
+                time.sleep(0.01)
+            (barrier / GO_FILE).touch()
+
+            totals = {"created": 0, "locked": 0, "retries": 0, "seconds": 0.0}
+            for worker in workers:
+                output, _ = worker.communicate(timeout=WORKER_TIMEOUT)
+                if worker.returncode != 0:
+                    raise CommandError(f"Процесс профиля {profile} завершился с кодом {worker.returncode}")
+                result = json.loads(output.strip().splitlines()[-1])
+                for name in ("created", "locked", "retries"):
+                    totals[name] += result[name]
+                totals["seconds"] = max(totals["seconds"], result["seconds"])
+            return totals
+        finally:
+            for worker in workers:
+                if worker.poll() is None:
+                    worker.kill()
+                    worker.wait()
+
+    def _prepare(self, options):
+        call_command("migrate", "orders", verbosity=0)
+        Product.objects.bulk_create(
+            [
+                Product(name=f"Товар {index}", description="", price=Decimal("99.90"), stock=10**9)
+                for index in range(options["products"])
+            ]
+        )
+
+    def _work(self, options):
+        rng = random.Random(options["seed"])
+        product_ids = list(Product.objects.values_list("id", flat=True))
+        close_old_connections()
+        barrier = Path(options["barrier"])
+        (barrier / f"{os.getpid()}{READY_SUFFIX}").touch()
+        while not (barrier / GO_FILE).exists():
+            time.sleep(0.001)
+
+        created = locked = 0
+        started = time.perf_counter()
+        for _ in range(options["orders"]):
+            cart = rng.sample(product_ids, options["cart_size"])
+            try:
+                place_order("Бенчмарк", "benchmark@example.com", cart, ["1"] * len(cart))
+                created += 1
+            except OperationalError as exc:
+                if not is_busy_error(exc):
+                    raise
+                locked += 1
+            finally:
+                # end of a request: closes the connection unless CONN_MAX_AGE keeps it
+                close_old_connections()
+        seconds = time.perf_counter() - started
+        self.stdout.write(
+            json.dumps(
+                {"created": created, "locked": locked, "seconds": seconds, "retries": get_busy_retry_stats()["retries"]}
+            )
+        )
@@ -0,0 +1,84 @@
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.ingest import DEFAULT_CHUNK_SIZE, import_orders, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует заказы из файла JSON (массив) или NDJSON (по заказу в строке) "
+        "пакетами через bulk_create и выводит скорость загрузки по каждому пакету."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу с заказами или '-' для чтения из stdin")
+        parser.add_argument(
+            "--format",
+            choices=("json", "ndjson"),
+            help="Формат файла; по умолчанию определяется по расширению (.json — массив, иначе NDJSON)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"Количество заказов в одной транзакции (по умолчанию {DEFAULT_CHUNK_SIZE})",
+        )
+        parser.add_argument(
+            "--quiet",
+            action="store_true",
+            help="Не выводить статистику по пакетам, только итог",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size должен быть положительным")
+        file_format = options["format"] or ("json" if path.endswith(".json") else "ndjson")
+
+        if path == "-":
+            stream = sys.stdin
+        else:
+            try:
+                stream = Path(path).open(encoding="utf-8")
+            except OSError as exc:
+                raise CommandError(f"Не удалось открыть {path}: {exc}")
+
+        try:
+            if file_format == "json":
+                try:
+                    records = json.load(stream)
+                except ValueError as exc:
+                    raise CommandError(f"Некорректный JSON: {exc}")
+                if not isinstance(records, list):
+                    raise CommandError("JSON-файл должен содержать массив заказов")
+            else:
+                records = iter_ndjson(stream)
+            report = import_orders(records, chunk_size=options["chunk_size"], on_chunk=self._report_chunk(options))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in report.errors:
+            self.stderr.write(f"Запись {error['record']}: {error['error']}")
+        orders_per_second = report.orders / report.seconds if report.seconds else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Импортировано {report.orders} заказов ({report.lines} строк), отклонено {report.rejected}, "
+                f"{report.seconds:.1f} с, {orders_per_second:.0f} заказов/с"
+            )
+        )
+
+    def _report_chunk(self, options):
+        if options["quiet"]:
+            return None
+
+        def report(chunk):
+            self.stdout.write(
+                f"Пакет {chunk.index}: {chunk.orders} заказов, {chunk.lines} строк, "
+                f"отклонено {chunk.rejected}, {chunk.seconds:.2f} с ({chunk.orders_per_second:.0f} заказов/с)"
+            )
+
+        return report
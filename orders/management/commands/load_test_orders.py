@@ -0,0 +1,76 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import Product
+
+ENDPOINTS = {
+    "calculate": "/orders/calculate/",
+    "async-calculate": "/orders/async/calculate/",
+}
+REQUEST_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест расчёта заказа: параллельно отправляет запросы на запущенный сервер "
+        "и выводит пропускную способность и перцентили задержки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Адрес запущенного сервера")
+        parser.add_argument(
+            "--endpoint",
+            choices=sorted(ENDPOINTS),
+            default="calculate",
+            help="calculate — синхронное представление, async-calculate — асинхронное",
+        )
+        parser.add_argument("--requests", type=int, default=1000, help="Всего запросов (по умолчанию 1000)")
+        parser.add_argument("--concurrency", type=int, default=32, help="Одновременных запросов (по умолчанию 32)")
+        parser.add_argument(
+            "--cart-size",
+            type=int,
+            default=10,
+            help="Позиций в корзине; берутся первые товары из базы (по умолчанию 10)",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["requests"], options["concurrency"], options["cart_size"]) <= 0:
+            raise CommandError("--requests, --concurrency и --cart-size должны быть положительными")
+        product_ids = list(Product.objects.order_by("id").values_list("id", flat=True)[: options["cart_size"]])
+        if len(product_ids) < options["cart_size"]:
+            raise CommandError(f"В базе только {len(product_ids)} товаров, нужно {options['cart_size']}")
+
+        url = options["url"].rstrip("/") + ENDPOINTS[options["endpoint"]]
+        data = {"product_ids": product_ids, "quantities": ["1"] * len(product_ids)}
+        sessions = threading.local()
+
+        def send(_):
+            session = getattr(sessions, "session", None)
+            if session is None:
+                session = sessions.session = requests.Session()
+            start = time.perf_counter()
+            try:
+                ok = session.post(url, data=data, timeout=REQUEST_TIMEOUT).status_code == 200
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(send, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(f"{url}: {len(results)} запросов, {options['concurrency']} параллельно, ошибок: {errors}")
+        self.stdout.write(f"пропускная способность: {len(results) / elapsed:.1f} запросов/с")
+        self.stdout.write(
+            "задержка, мс: "
+            f"p50 {percentiles[49] * 1000:.1f}, p95 {percentiles[94] * 1000:.1f}, p99 {percentiles[98] * 1000:.1f}"
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.rollups import DEFAULT_REBUILD_CHUNK_DAYS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает дневные сводки продаж (по товарам и по статусам) из таблиц заказов "
+        "по несколько дней в короткой транзакции: создание заказов ждёт только пересчёта своих дней. "
+        "Запускайте после развёртывания и после правок заказов в обход ORM "
+        "(QuerySet.update, удаление заказов), лучше в часы низкой нагрузки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=DEFAULT_REBUILD_CHUNK_DAYS,
+            help=f"Количество дней в одной транзакции (по умолчанию {DEFAULT_REBUILD_CHUNK_DAYS})",
+        )
+        parser.add_argument(
+            "--quiet",
+            action="store_true",
+            help="Не выводить прогресс по дням, только итог",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_days"] <= 0:
+            raise CommandError("--chunk-days должен быть положительным")
+        processed = rebuild_rollups(chunk_days=options["chunk_days"], on_chunk=self._report_chunk(options))
+        self.stdout.write(self.style.SUCCESS(f"Сводки пересчитаны: {processed} заказов"))
+
+    def _report_chunk(self, options):
+        if options["quiet"]:
+            return None
+
+        def report(processed, days_done, days_total):
+            self.stdout.write(f"Обработано {processed} заказов (дней {days_done} из {days_total})")
+
+        return report
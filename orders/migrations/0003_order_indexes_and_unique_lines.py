@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    OrderProduct = apps.get_model('orders', 'OrderProduct')
+    lines = OrderProduct.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        lines.values('order_id', 'product_id')
+        .annotate(rows=Count('id'), total=Sum('quantity'), keep=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for line in duplicates.iterator():
+        lines.filter(id=line['keep']).update(quantity=line['total'])
+        lines.filter(order_id=line['order_id'], product_id=line['product_id']).exclude(id=line['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='logistics',
+            index=models.Index(fields=['product', 'delivery_cost', 'estimated_delivery_time'], name='logistics_product_quote_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date'], name='order_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'order_date'], name='order_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_email', 'order_date'], name='order_email_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderproduct',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='orderproduct_unique_line'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_product_prices(apps, schema_editor):
+    # existing lines never stored their price; the current product price is the best guess
+    OrderProduct = apps.get_model('orders', 'OrderProduct')
+    Product = apps.get_model('orders', 'Product')
+    OrderProduct.objects.update(price=Subquery(Product.objects.filter(id=OuterRef('product_id')).values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_daily_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderproduct',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(copy_product_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='orderproduct',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
@@ -15,12 +15,63 @@ class Order(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     products = models.ManyToManyField(Product, through='OrderProduct')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['order_date'], name='order_date_idx'),
+            models.Index(fields=['status', 'order_date'], name='order_status_date_idx'),
+            models.Index(fields=['customer_email', 'order_date'], name='order_email_date_idx'),
+        ]
+
 class OrderProduct(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
+    # unit price the line was sold at
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='orderproduct_unique_line'),
+        ]
 
 class Logistics(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     delivery_cost = models.DecimalField(max_digits=10, decimal_places=2)
-    estimated_delivery_time = models.IntegerField()
\ No newline at end of file
+    estimated_delivery_time = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['product', 'delivery_cost', 'estimated_delivery_time'],
+                name='logistics_product_quote_idx',
+            ),
+        ]
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(max_length=64)
+    order = models.ForeignKey(Order, null=True, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='daily_product_sales_unique_day'),
+        ]
+
+class DailyStatusSales(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=50)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='daily_status_sales_unique_day'),
+        ]
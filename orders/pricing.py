@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .catalog import ProductRecord, product_catalog
+from .delivery import CHEAPEST, PER_LINE, DeliveryError, check_delivery_options, delivery_table
+
+
+class PricingError(ValueError):
+    pass
+
+
+class InvalidCartError(PricingError):
+    pass
+
+
+class MissingProductsError(PricingError):
+    def __init__(self, product_ids: Sequence[int]):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Unknown product ids: {', '.join(str(pid) for pid in self.product_ids)}")
+
+
+@dataclass(frozen=True)
+class CartLine:
+    product: ProductRecord
+    quantity: int
+
+    @property
+    def line_total(self) -> Decimal:
+        return self.product.price * self.quantity
+
+
+@dataclass(frozen=True)
+class CartQuote:
+    lines: Tuple[CartLine, ...]
+    subtotal: Decimal
+    delivery_cost: Decimal
+    delivery_days: Optional[int] = None
+
+    @property
+    def total_price(self) -> Decimal:
+        return self.subtotal + self.delivery_cost
+
+
+def parse_cart(product_ids: Sequence, quantities: Sequence) -> List[Tuple[int, int]]:
+    """Validate the parallel ``product_ids``/``quantities`` lists of an order form."""
+    if len(product_ids) != len(quantities):
+        raise InvalidCartError("product_ids and quantities must have the same length")
+    cart = []
+    for raw_pid, raw_qty in zip(product_ids, quantities):
+        try:
+            pid = int(raw_pid)
+            qty = int(raw_qty)
+        except (TypeError, ValueError):
+            raise InvalidCartError(f"Invalid cart line: product_id={raw_pid!r}, quantity={raw_qty!r}")
+        if qty <= 0:
+            raise InvalidCartError(f"Quantity must be positive for product {pid}")
+        cart.append((pid, qty))
+    return cart
+
+
+def merge_cart_lines(cart: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Sum quantities of repeated products, keeping the order of first appearance."""
+    merged: Dict[int, int] = {}
+    for pid, qty in cart:
+        merged[pid] = merged.get(pid, 0) + qty
+    return merged
+
+
+def fetch_products(product_ids: Iterable[int]) -> Dict[int, ProductRecord]:
+    """Catalog records of all products of a cart, failing on unknown ids.
+
+    Products missing from ``product_catalog`` are loaded with a single query.
+    """
+    wanted = set(product_ids)
+    products = product_catalog.get_many(wanted)
+    missing = wanted.difference(products)
+    if missing:
+        raise MissingProductsError(missing)
+    return products
+
+
+def _check_delivery(strategy: str, cost_mode: str) -> None:
+    try:
+        check_delivery_options(strategy, cost_mode)
+    except DeliveryError as exc:
+        raise InvalidCartError(str(exc))
+
+
+def _build_quote(cart, products, delivery) -> CartQuote:
+    lines = tuple(CartLine(products[pid], qty) for pid, qty in cart)
+    return CartQuote(
+        lines=lines,
+        subtotal=sum((line.line_total for line in lines), Decimal("0")),
+        delivery_cost=delivery.cost,
+        delivery_days=delivery.days,
+    )
+
+
+def price_cart(
+    product_ids: Sequence, quantities: Sequence, strategy: str = CHEAPEST, cost_mode: str = PER_LINE
+) -> CartQuote:
+    """Price a cart with at most one query for its products, whatever its size.
+
+    Delivery comes from the in-memory ``delivery_table``: one option per product, picked
+    by ``strategy``, and charged per line or per unit depending on ``cost_mode``.
+    """
+    _check_delivery(strategy, cost_mode)
+    cart = parse_cart(product_ids, quantities)
+    products = fetch_products(pid for pid, _ in cart)
+    delivery = delivery_table.quote(merge_cart_lines(cart), strategy, cost_mode)
+    return _build_quote(cart, products, delivery)
+
+
+async def afetch_products(product_ids: Iterable[int]) -> Dict[int, ProductRecord]:
+    """Async ``fetch_products``."""
+    wanted = set(product_ids)
+    products = await product_catalog.aget_many(wanted)
+    missing = wanted.difference(products)
+    if missing:
+        raise MissingProductsError(missing)
+    return products
+
+
+async def aprice_cart(
+    product_ids: Sequence, quantities: Sequence, strategy: str = CHEAPEST, cost_mode: str = PER_LINE
+) -> CartQuote:
+    """Async ``price_cart``."""
+    _check_delivery(strategy, cost_mode)
+    cart = parse_cart(product_ids, quantities)
+    products = await afetch_products(pid for pid, _ in cart)
+    delivery = await delivery_table.aquote(merge_cart_lines(cart), strategy, cost_mode)
+    return _build_quote(cart, products, delivery)
@@ -0,0 +1,252 @@
+"""Order and sales reports exported as CSV or XLSX in constant memory.
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)`` and written out as they
+arrive: CSV is streamed straight into the response, XLSX goes through openpyxl's
+write-only mode into a temporary file that is then streamed back. A workbook cannot be
+streamed while it is being written, so an XLSX export of more than
+``REPORT_XLSX_MAX_ROWS`` rows is handed to the ``orders.report`` background job instead
+of holding the request until the whole file is built. Revenue per product
+is ``quantity * OrderProduct.price``, the price each line was sold at; revenue per
+status uses ``Order.total_price``. The ``daily-*`` reports read
+the precomputed rollups of ``orders.rollups`` instead of the order tables.
+"""
+from __future__ import annotations
+
+import csv
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, QuerySet, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .models import DailyProductSales, DailyStatusSales, Order, OrderProduct
+
+REPORT_CHUNK_SIZE = 2000
+CSV_CONTENT_TYPE = "text/csv; charset=utf-8"
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+REPORT_FORMATS = ("csv", "xlsx")
+# larger XLSX exports are built by a background job; see export_report
+DEFAULT_XLSX_MAX_ROWS = 20000
+
+_LINE_TOTAL = ExpressionWrapper(
+    F("quantity") * F("price"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+class ReportError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ReportFilters:
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    status: Optional[str] = None
+
+    @classmethod
+    def from_query(cls, params) -> "ReportFilters":
+        return cls(
+            date_from=_parse_date(params.get("date_from"), "date_from"),
+            date_to=_parse_date(params.get("date_to"), "date_to"),
+            status=params.get("status") or None,
+        )
+
+    def filter_kwargs(self, prefix: str = "") -> Dict:
+        """Range lookups on ``order_date`` so the (status, order_date) index can be used."""
+        kwargs = {}
+        if self.date_from:
+            kwargs[f"{prefix}order_date__gte"] = _start_of_day(self.date_from)
+        if self.date_to:
+            kwargs[f"{prefix}order_date__lt"] = _start_of_day(self.date_to + timedelta(days=1))
+        if self.status:
+            kwargs[f"{prefix}status"] = self.status
+        return kwargs
+
+
+@dataclass(frozen=True)
+class Report:
+    name: str
+    columns: Tuple[str, ...]
+    queryset: Callable[[ReportFilters], QuerySet]
+
+    def rows(self, filters: ReportFilters) -> Iterator[tuple]:
+        return self.queryset(filters).iterator(chunk_size=REPORT_CHUNK_SIZE)
+
+    def count(self, filters: ReportFilters) -> int:
+        return self.queryset(filters).count()
+
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ReportError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def _start_of_day(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _order_lines(filters: ReportFilters) -> QuerySet:
+    return (
+        OrderProduct.objects.filter(**filters.filter_kwargs("order__"))
+        .annotate(line_total=_LINE_TOTAL)
+        .order_by("order_id", "product_id")
+        .values_list(
+            "order_id",
+            "order__order_date",
+            "order__status",
+            "order__customer_name",
+            "order__customer_email",
+            "product_id",
+            "product__name",
+            "quantity",
+            "price",
+            "line_total",
+        )
+    )
+
+
+def _sales_by_day_product_status(filters: ReportFilters) -> QuerySet:
+    return (
+        OrderProduct.objects.filter(**filters.filter_kwargs("order__"))
+        .annotate(day=TruncDate("order__order_date"))
+        .values("day", "order__status", "product_id", "product__name")
+        .annotate(orders=Count("id"), quantity_total=Sum("quantity"), revenue=Sum(_LINE_TOTAL))
+        .order_by("day", "order__status", "product_id")
+        .values_list("day", "order__status", "product_id", "product__name", "orders", "quantity_total", "revenue")
+    )
+
+
+def _revenue_by_day_status(filters: ReportFilters) -> QuerySet:
+    return (
+        Order.objects.filter(**filters.filter_kwargs())
+        .annotate(day=TruncDate("order_date"))
+        .values("day", "status")
+        .annotate(orders=Count("id"), revenue=Sum("total_price"))
+        .order_by("day", "status")
+        .values_list("day", "status", "orders", "revenue")
+    )
+
+
+def _day_kwargs(filters: ReportFilters) -> Dict:
+    kwargs = {}
+    if filters.date_from:
+        kwargs["day__gte"] = filters.date_from
+    if filters.date_to:
+        kwargs["day__lte"] = filters.date_to
+    return kwargs
+
+
+def _daily_product_sales(filters: ReportFilters) -> QuerySet:
+    # the product rollup is not split by status, so the status filter does not apply
+    return (
+        DailyProductSales.objects.filter(**_day_kwargs(filters))
+        .order_by("day", "product_id")
+        .values_list("day", "product_id", "product__name", "orders", "quantity", "revenue")
+    )
+
+
+def _daily_status_sales(filters: ReportFilters) -> QuerySet:
+    kwargs = _day_kwargs(filters)
+    if filters.status:
+        kwargs["status"] = filters.status
+    return (
+        DailyStatusSales.objects.filter(**kwargs)
+        .order_by("day", "status")
+        .values_list("day", "status", "orders", "revenue")
+    )
+
+
+REPORTS = {
+    report.name: report
+    for report in (
+        Report(
+            name="orders",
+            columns=(
+                "Заказ",
+                "Дата",
+                "Статус",
+                "Покупатель",
+                "Email",
+                "Товар ID",
+                "Товар",
+                "Количество",
+                "Цена",
+                "Сумма",
+            ),
+            queryset=_order_lines,
+        ),
+        Report(
+            name="sales",
+            columns=("День", "Статус", "Товар ID", "Товар", "Заказов", "Количество", "Выручка"),
+            queryset=_sales_by_day_product_status,
+        ),
+        Report(
+            name="revenue",
+            columns=("День", "Статус", "Заказов", "Выручка"),
+            queryset=_revenue_by_day_status,
+        ),
+        Report(
+            name="daily-products",
+            columns=("День", "Товар ID", "Товар", "Заказов", "Количество", "Выручка"),
+            queryset=_daily_product_sales,
+        ),
+        Report(
+            name="daily-statuses",
+            columns=("День", "Статус", "Заказов", "Выручка"),
+            queryset=_daily_status_sales,
+        ),
+    )
+}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(report: Report, filters: ReportFilters) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    # BOM so that Excel opens the Cyrillic text as UTF-8
+    yield "\ufeff" + writer.writerow(report.columns)
+    for row in report.rows(filters):
+        yield writer.writerow(row)
+
+
+def _xlsx_value(value):
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def write_xlsx(report: Report, filters: ReportFilters, fileobj) -> None:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=report.name)
+    sheet.append(report.columns)
+    for row in report.rows(filters):
+        sheet.append([_xlsx_value(value) for value in row])
+    workbook.save(fileobj)
+
+
+def build_xlsx_file(report: Report, filters: ReportFilters):
+    """Write the workbook to an anonymous temporary file, rewound for streaming.
+
+    Nothing can be sent until the workbook is complete, so the time to the first byte
+    grows with the report; callers bound the row count first.
+    """
+    fileobj = tempfile.TemporaryFile()
+    try:
+        write_xlsx(report, filters, fileobj)
+    except BaseException:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj
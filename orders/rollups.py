@@ -0,0 +1,224 @@
+"""Daily sales rollups maintained incrementally as orders are written.
+
+``DailyStatusSales`` holds orders and revenue (``Order.total_price``) per day and
+status, ``DailyProductSales`` holds orders, units and revenue (quantity times
+``OrderProduct.price``, the price the line was sold at) per day and product. Dashboards over a year read a few hundred
+rollup rows instead of aggregating every order.
+
+Rows are changed with deltas: missing rows are inserted as zeros with
+``bulk_create(ignore_conflicts=True)``, then one UPDATE per day adds the deltas with
+``F()`` expressions, so concurrent writers never lose each other's increments. The
+changes run in the caller's transaction and roll back with it.
+
+The status table follows ``Order`` saves through the signal handlers registered in
+``OrdersConfig.ready``: a new order is added, and a change of status, total or date
+moves it between rows. ``place_order`` and the bulk import record their lines
+explicitly (``bulk_create`` sends no signals, and the import records its orders too).
+Writes that bypass both, such as ``QuerySet.update`` or deletes, are only reflected
+after ``manage.py rebuild_rollups``, which recomputes a few days per transaction.
+"""
+from __future__ import annotations
+
+import itertools
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Max, Min, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from business_management.database import retry_on_busy
+
+from .models import DailyProductSales, DailyStatusSales, Order, OrderProduct
+
+DEFAULT_REBUILD_CHUNK_DAYS = 7
+# keys per UPDATE: every key adds a few parameters per CASE, keep well under SQLite's limit
+UPDATE_BATCH_SIZE = 500
+
+_LINE_TOTAL = ExpressionWrapper(
+    F("quantity") * F("price"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def order_day(order_date: datetime) -> date:
+    """Day of ``order_date`` in the current time zone, as ``TruncDate`` computes it."""
+    if timezone.is_aware(order_date):
+        return timezone.localdate(order_date)
+    return order_date.date()
+
+
+def _apply(model, key_field: str, deltas: Mapping[Tuple[date, object], Mapping[str, object]]) -> None:
+    """Add ``deltas`` ({(day, key): {field: amount}}) to the rows of ``model``."""
+    by_day = defaultdict(dict)
+    for (day, key), values in deltas.items():
+        if any(values.values()):
+            by_day[day][key] = values
+    for day, rows in by_day.items():
+        keys = iter(rows)
+        while True:
+            batch = list(itertools.islice(keys, UPDATE_BATCH_SIZE))
+            if not batch:
+                break
+            model.objects.bulk_create([model(day=day, **{key_field: key}) for key in batch], ignore_conflicts=True)
+            fields = rows[batch[0]].keys()
+            model.objects.filter(day=day, **{f"{key_field}__in": batch}).update(
+                **{
+                    field: Case(
+                        *[When(**{key_field: key}, then=F(field) + Value(rows[key][field])) for key in batch],
+                        default=F(field),
+                    )
+                    for field in fields
+                }
+            )
+
+
+def _status_deltas(orders: Iterable[Tuple[date, str, Decimal]], sign: int = 1) -> Dict:
+    deltas = defaultdict(lambda: {"orders": 0, "revenue": Decimal("0")})
+    for day, status, total_price in orders:
+        row = deltas[day, status]
+        row["orders"] += sign
+        row["revenue"] += sign * total_price
+    return deltas
+
+
+def record_orders(orders: Iterable[Order]) -> None:
+    """Add new ``orders`` to the status rollup; for orders created without signals."""
+    _apply(
+        DailyStatusSales,
+        "status",
+        _status_deltas((order_day(order.order_date), order.status, order.total_price) for order in orders),
+    )
+
+
+def record_order_lines(carts: Iterable[Tuple[Order, Mapping[int, int]]], prices: Mapping[int, Decimal]) -> None:
+    """Add the lines of new orders to the product rollup.
+
+    ``carts`` pairs every order with its merged cart (product id -> quantity) and
+    ``prices`` maps product ids to the price the lines were sold at.
+    """
+    deltas = defaultdict(lambda: {"orders": 0, "quantity": 0, "revenue": Decimal("0")})
+    for order, cart in carts:
+        day = order_day(order.order_date)
+        for product_id, quantity in cart.items():
+            row = deltas[day, product_id]
+            row["orders"] += 1
+            row["quantity"] += quantity
+            row["revenue"] += prices[product_id] * quantity
+    _apply(DailyProductSales, "product_id", deltas)
+
+
+def _snapshot(order: Order) -> Optional[Tuple[datetime, str, Decimal]]:
+    # read __dict__ so that deferred fields are not loaded one query at a time
+    values = order.__dict__
+    if order.pk is None or not all(name in values for name in ("order_date", "status", "total_price")):
+        return None
+    return values["order_date"], values["status"], values["total_price"]
+
+
+def remember_order(sender, instance, **kwargs):
+    """``post_init`` receiver for ``Order``: keep what the status rollup counted it as."""
+    instance._rollup_snapshot = _snapshot(instance)
+
+
+def order_saved(sender, instance, created, raw=False, **kwargs):
+    """``post_save`` receiver for ``Order``: add new orders, move changed ones."""
+    if raw:
+        return
+    current = _snapshot(instance)
+    previous = None if created else getattr(instance, "_rollup_snapshot", None)
+    if current is None or (not created and previous is None) or previous == current:
+        instance._rollup_snapshot = current
+        return
+    deltas = _status_deltas([(order_day(current[0]), *current[1:])])
+    if previous is not None:
+        for key, values in _status_deltas([(order_day(previous[0]), *previous[1:])], sign=-1).items():
+            row = deltas[key]
+            row["orders"] += values["orders"]
+            row["revenue"] += values["revenue"]
+    _apply(DailyStatusSales, "status", deltas)
+    instance._rollup_snapshot = current
+
+
+def _start_of_day(day: date) -> datetime:
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def _day_span() -> Optional[Tuple[date, date]]:
+    """First and last day with orders or rollup rows, or ``None`` when there are none."""
+    dates = Order.objects.aggregate(first=Min("order_date"), last=Max("order_date"))
+    days = [order_day(dates["first"]), order_day(dates["last"])] if dates["first"] else []
+    for model in (DailyStatusSales, DailyProductSales):
+        rows = model.objects.aggregate(first=Min("day"), last=Max("day"))
+        if rows["first"]:
+            days += [rows["first"], rows["last"]]
+    return (min(days), max(days)) if days else None
+
+
+@retry_on_busy
+def _rebuild_days(first_day: date, end_day: date) -> int:
+    """Replace the rollup rows of ``first_day`` up to ``end_day`` (excluded); returns orders counted."""
+    period = {"order_date__gte": _start_of_day(first_day), "order_date__lt": _start_of_day(end_day)}
+    status_rows = (
+        Order.objects.filter(**period)
+        .annotate(day=TruncDate("order_date"))
+        .values("day", "status")
+        .annotate(count=Count("id"), total=Sum("total_price"))
+        .order_by()
+    )
+    product_rows = (
+        OrderProduct.objects.filter(**{f"order__{lookup}": value for lookup, value in period.items()})
+        .annotate(day=TruncDate("order__order_date"))
+        .values("day", "product_id")
+        .annotate(count=Count("id"), units=Sum("quantity"), total=Sum(_LINE_TOTAL))
+        .order_by()
+    )
+    with transaction.atomic():
+        # the delete takes the write lock first, so no order of the range changes until commit
+        DailyProductSales.objects.filter(day__gte=first_day, day__lt=end_day).delete()
+        DailyStatusSales.objects.filter(day__gte=first_day, day__lt=end_day).delete()
+        status_deltas = {
+            (row["day"], row["status"]): {"orders": row["count"], "revenue": row["total"]} for row in status_rows
+        }
+        _apply(DailyStatusSales, "status", status_deltas)
+        _apply(
+            DailyProductSales,
+            "product_id",
+            {
+                (row["day"], row["product_id"]): {"orders": row["count"], "quantity": row["units"], "revenue": row["total"]}
+                for row in product_rows
+            },
+        )
+    return sum(values["orders"] for values in status_deltas.values())
+
+
+def rebuild_rollups(chunk_days: int = DEFAULT_REBUILD_CHUNK_DAYS, on_chunk=None) -> int:
+    """Recompute both rollups from the order tables, ``chunk_days`` days at a time.
+
+    Every range of days is one short transaction that deletes the range's rollup rows
+    and recomputes them from the range's orders, so order writers only wait for the
+    range being rebuilt and readers see each range switch to its new totals at once.
+    A change made while the rebuild runs either lands before its range's transaction,
+    which then counts it, or after it, as a delta on the rebuilt rows. Product revenue
+    comes from the price stored on each order line. ``on_chunk(processed, days_done,
+    days_total)`` runs after every range. Returns the number of orders processed.
+    """
+    if chunk_days <= 0:
+        raise ValueError("chunk_days must be positive")
+    span = _day_span()
+    if span is None:
+        return 0
+    start_day, final_day = span
+    days_total = (final_day - start_day).days + 1
+    processed = 0
+    for offset in range(0, days_total, chunk_days):
+        days_done = min(offset + chunk_days, days_total)
+        processed += _rebuild_days(start_day + timedelta(days=offset), start_day + timedelta(days=days_done))
+        if on_chunk is not None:
+            on_chunk(processed, days_done, days_total)
+    return processed
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Dict, Sequence
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Case, Exists, F, Value, When
+
+from business_management.database import retry_on_busy
+
+from .models import Order, OrderProduct, Product
+from .pricing import MissingProductsError, merge_cart_lines, parse_cart
+from .rollups import record_order_lines
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, product_ids: Sequence[int]):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Not enough stock for products: {', '.join(str(pid) for pid in self.product_ids)}")
+
+
+def reserve_stock(demand: Dict[int, int]) -> None:
+    """Decrement ``Product.stock`` for every product of the cart in one UPDATE.
+
+    Each row is only touched while its stock still covers the requested quantity, and
+    the ``NOT EXISTS`` guard makes the statement all-or-nothing, so concurrent orders can
+    never drive stock below zero. Must be called inside a transaction: when some product
+    cannot be reserved the caller's transaction is rolled back by the raised error.
+    """
+    if not demand:
+        return
+    # one flat CASE instead of a chain of ORs: SQLite limits expression depth to 1000,
+    # which a chain of per-product conditions exceeds for large carts
+    requested = Case(*[When(id=pid, then=Value(qty)) for pid, qty in demand.items()])
+    cart = Product.objects.filter(id__in=demand).alias(requested=requested)
+
+    updated = (
+        cart.filter(stock__gte=F("requested"))
+        .filter(~Exists(cart.filter(stock__lt=F("requested"))))
+        .update(stock=F("stock") - requested)
+    )
+    if updated == len(demand):
+        return
+
+    stock = dict(Product.objects.filter(id__in=demand).values_list("id", "stock"))
+    missing = set(demand).difference(stock)
+    if missing:
+        raise MissingProductsError(missing)
+    raise InsufficientStockError([pid for pid, qty in demand.items() if stock[pid] < qty])
+
+
+@retry_on_busy
+def place_order(customer_name: str, customer_email: str, product_ids: Sequence, quantities: Sequence) -> Order:
+    """Create an order and its lines in one transaction, reserving stock first.
+
+    Repeated products are merged into one line. Stock is reserved with a single conditional UPDATE before anything else, prices
+    are read in the same transaction with one query and the total is known before the
+    order is inserted, so the order row is written once and all lines go in one
+    ``bulk_create``. The daily sales rollups are updated in the same transaction.
+    When SQLite reports the database as locked, the whole transaction is retried.
+
+    Prices do not come from ``product_catalog``: its records may be up to
+    ``PRODUCT_CATALOG_TTL`` seconds behind a change made by another process, which is
+    fine for a quote but not for the amount an order is charged.
+    """
+    demand = merge_cart_lines(parse_cart(product_ids, quantities))
+
+    with transaction.atomic():
+        # every product exists once the reservation succeeded
+        reserve_stock(demand)
+        prices = dict(Product.objects.filter(id__in=demand).values_list("id", "price"))
+        total_price = sum((prices[pid] * qty for pid, qty in demand.items()), Decimal("0"))
+        order = Order.objects.create(
+            customer_name=customer_name,
+            customer_email=customer_email,
+            total_price=total_price,
+        )
+        OrderProduct.objects.bulk_create(
+            [OrderProduct(order=order, product_id=pid, quantity=qty, price=prices[pid]) for pid, qty in demand.items()]
+        )
+        record_order_lines([(order, demand)], prices)
+    return order
+
+
+async def aplace_order(customer_name: str, customer_email: str, product_ids: Sequence, quantities: Sequence) -> Order:
+    """Async ``place_order``.
+
+    Django has no async transactions, so the whole transaction runs in the thread
+    ``sync_to_async`` uses for ORM work; the event loop is free while it does.
+    """
+    return await sync_to_async(place_order)(customer_name, customer_email, product_ids, quantities)
@@ -0,0 +1,88 @@
+import asyncio
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import AsyncClient, LiveServerTestCase, TestCase
+
+from orders import views
+from orders.catalog import clear_product_catalog
+from orders.delivery import invalidate_delivery_table
+from orders.models import Logistics, Order, Product
+
+
+class AsyncOrderViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'Товар {index}', description='', price=Decimal('10.50'), stock=10) for index in range(3)]
+        )
+        Logistics.objects.create(product=cls.products[0], delivery_cost=Decimal('300'), estimated_delivery_time=2)
+
+    def setUp(self):
+        for reset in (invalidate_delivery_table, clear_product_catalog):
+            reset()
+            self.addCleanup(reset)
+
+    def _cart(self, quantities):
+        return {
+            'customer_name': 'Иван',
+            'customer_email': 'ivan@example.com',
+            'product_ids': [product.id for product in self.products[: len(quantities)]],
+            'quantities': quantities,
+        }
+
+    async def test_quote_matches_sync_view(self):
+        data = self._cart(['2', '3'])
+        response = await self.async_client.post('/orders/async/calculate/', data)
+        self.assertEqual(response.status_code, 200)
+        expected = await self.async_client.post('/orders/calculate/', data)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(Decimal(response.json()['total_price']), Decimal('352.50'))
+
+    async def test_quote_reports_missing_products(self):
+        response = await self.async_client.post('/orders/async/calculate/', {'product_ids': [999999], 'quantities': ['1']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_product_ids'], [999999])
+
+    async def test_creates_order_and_reserves_stock(self):
+        response = await self.async_client.post('/orders/async/create/', self._cart(['4', '1']))
+        self.assertEqual(response.status_code, 200)
+        order = await Order.objects.aget(id=response.json()['order_id'])
+        self.assertEqual(order.total_price, Decimal('52.50'))
+        product = await Product.objects.aget(id=self.products[0].id)
+        self.assertEqual(product.stock, 6)
+
+    async def test_insufficient_stock_and_idempotent_replay(self):
+        response = await self.async_client.post('/orders/async/create/', self._cart(['11']))
+        self.assertEqual(response.status_code, 409)
+
+        first = await self.async_client.post('/orders/async/create/', self._cart(['1']), headers={'Idempotency-Key': 'k1'})
+        replay = await self.async_client.post('/orders/async/create/', self._cart(['1']), headers={'Idempotency-Key': 'k1'})
+        self.assertEqual(replay.json()['order_id'], first.json()['order_id'])
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(await Order.objects.acount(), 1)
+
+    async def test_rejects_get(self):
+        response = await self.async_client.get('/orders/async/calculate/')
+        self.assertEqual(response.status_code, 405)
+
+    async def test_views_stay_coroutines_and_skip_csrf(self):
+        for view in (views.acalculate_order, views.acreate_order):
+            self.assertTrue(asyncio.iscoroutinefunction(view))
+        client = AsyncClient(enforce_csrf_checks=True)
+        response = await client.post('/orders/async/calculate/', self._cart(['1']))
+        self.assertEqual(response.status_code, 200)
+
+
+class LoadTestOrdersCommandTest(LiveServerTestCase):
+    def test_reports_throughput_against_a_running_server(self):
+        Product.objects.bulk_create(
+            [Product(name=f'Товар {index}', description='', price=Decimal('1.00'), stock=10) for index in range(2)]
+        )
+        stdout = StringIO()
+        call_command(
+            'load_test_orders', url=self.live_server_url, requests=6, concurrency=3, cart_size=2, stdout=stdout
+        )
+        self.assertIn('6 запросов, 3 параллельно, ошибок: 0', stdout.getvalue())
+        self.assertIn('запросов/с', stdout.getvalue())
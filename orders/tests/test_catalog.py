@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from orders.catalog import ProductCatalog, clear_product_catalog, get_product_catalog_stats, product_catalog
+from orders.models import Product
+
+
+class ProductCatalogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'Товар {index}', description='', price=Decimal('10.00'), stock=5) for index in range(3)]
+        )
+        cls.ids = [product.id for product in cls.products]
+
+    def setUp(self):
+        clear_product_catalog()
+        self.addCleanup(clear_product_catalog)
+
+    def test_loads_misses_with_one_query_and_serves_hits_from_memory(self):
+        with self.assertNumQueries(1):
+            records = product_catalog.get_many(self.ids[:2])
+        self.assertEqual({record.name for record in records.values()}, {'Товар 0', 'Товар 1'})
+        with self.assertNumQueries(1):
+            product_catalog.get_many(self.ids)
+        with self.assertNumQueries(0):
+            self.assertEqual(sorted(product_catalog.get_many(self.ids)), sorted(self.ids))
+        self.assertEqual(get_product_catalog_stats()['hits'], 5)
+
+    def test_unknown_ids_are_left_out(self):
+        self.assertEqual(list(product_catalog.get_many([self.ids[0], 999999])), [self.ids[0]])
+
+    def test_save_and_delete_drop_the_record(self):
+        product = self.products[0]
+        product_catalog.get_many([product.id])
+        product.price = Decimal('11.00')
+        product.save()
+        self.assertEqual(product_catalog.get_many([product.id])[product.id].price, Decimal('11.00'))
+        product.delete()
+        self.assertEqual(product_catalog.get_many([product.id]), {})
+
+    def test_invalidate_all_bumps_the_version(self):
+        version = product_catalog.get_many([self.ids[0]])[self.ids[0]].version
+        Product.objects.filter(id=self.ids[0]).update(price=Decimal('12.00'))
+        product_catalog.invalidate_all()
+        record = product_catalog.get_many([self.ids[0]])[self.ids[0]]
+        self.assertEqual((record.version, record.price), (version + 1, Decimal('12.00')))
+
+    @override_settings(PRODUCT_CATALOG_TTL=0)
+    def test_expired_catalog_reloads(self):
+        catalog = ProductCatalog()
+        catalog.get_many(self.ids)
+        with self.assertNumQueries(1):
+            catalog.get_many(self.ids)
+
+    def test_load_racing_an_invalidation_is_served_but_not_kept(self):
+        token, found, missing = product_catalog._cached(self.ids[:2])
+        product_catalog.invalidate([self.ids[0]])
+        self.assertEqual(sorted(product_catalog._load(token, missing)), sorted(self.ids[:2]))
+        # only the invalidated product is dropped; the other one was loaded at its current version
+        self.assertEqual(sorted(product_catalog._records), [self.ids[1]])
+
+    def test_save_bumps_the_stock_version(self):
+        product = self.products[0]
+        before = product_catalog.get_many([product.id])[product.id].stock_version
+        product.save()
+        self.assertGreater(product_catalog.get_many([product.id])[product.id].stock_version, before)
@@ -0,0 +1,108 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+
+from orders.idempotency import clear_idempotency_cache, request_fingerprint, run_once
+from orders.models import IdempotencyKey, Order, Product
+from orders.services import place_order
+
+
+class IdempotencyTestMixin:
+    def setUp(self):
+        super().setUp()
+        clear_idempotency_cache()
+        self.addCleanup(clear_idempotency_cache)
+
+
+class CreateOrderIdempotencyTest(IdempotencyTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Цемент', description='', price=Decimal('5'), stock=10)
+
+    def _post(self, key, quantity='1'):
+        return self.client.post(
+            '/orders/create/',
+            {
+                'customer_name': 'Иван',
+                'customer_email': 'ivan@example.com',
+                'product_ids': [self.product.id],
+                'quantities': [quantity],
+            },
+            headers={'Idempotency-Key': key},
+        )
+
+    def test_retry_returns_original_order_without_writing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._post('retry-1')
+        with self.assertNumQueries(0):
+            second = self._post('retry-1')
+
+        self.assertEqual(second.json()['order_id'], first.json()['order_id'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 9)
+
+    def test_retry_is_answered_from_the_table_after_cache_loss(self):
+        first = self._post('retry-2')
+        clear_idempotency_cache()
+        with self.assertNumQueries(1):
+            second = self._post('retry-2')
+        self.assertEqual(second.json()['order_id'], first.json()['order_id'])
+
+    def test_key_reused_with_different_payload_is_rejected(self):
+        self._post('retry-3')
+        response = self._post('retry-3', quantity='2')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_attempt_releases_the_key(self):
+        self.assertEqual(self._post('retry-4', quantity='50').status_code, 409)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self._post('retry-4', quantity='50').status_code, 409)
+
+
+class ConcurrentIdempotencyTest(IdempotencyTestMixin, TransactionTestCase):
+    WORKERS = 6
+
+    def test_concurrent_duplicates_create_one_order(self):
+        product = Product.objects.create(name='Песок', description='', price=Decimal('1'), stock=100)
+        fingerprint = request_fingerprint('Иван', 'ivan@example.com', [product.id], [1])
+        order_ids = []
+        results_lock = threading.Lock()
+        start = threading.Barrier(self.WORKERS)
+
+        def worker():
+            start.wait()
+            try:
+                for _attempt in range(100):
+                    try:
+                        order_id, _created = run_once(
+                            'concurrent-key',
+                            fingerprint,
+                            lambda: place_order('Иван', 'ivan@example.com', [product.id], [1]),
+                        )
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry.
+                        time.sleep(0.001)
+                        continue
+                    with results_lock:
+                        order_ids.append(order_id)
+                    break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(order_ids), self.WORKERS)
+        self.assertEqual(len(set(order_ids)), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 99)
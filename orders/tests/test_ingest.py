@@ -0,0 +1,103 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from orders.ingest import import_orders
+from orders.models import Order, OrderProduct, Product
+
+
+class OrderIngestTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'Товар {index}', description='', price=Decimal('3.00'), stock=0) for index in range(5)]
+        )
+
+    def _record(self, index, items=None):
+        return {
+            'customer_name': f'Клиент {index}',
+            'customer_email': f'client{index}@example.com',
+            'items': items or [{'product_id': self.products[index % 5].id, 'quantity': 2}],
+        }
+
+
+class ImportOrdersTest(OrderIngestTestCase):
+    def test_imports_records_in_chunks(self):
+        records = [self._record(index) for index in range(25)]
+        chunks = []
+        # per chunk: product prefetch, savepoint, orders insert, lines insert,
+        # insert and update of both rollups, release
+        with self.assertNumQueries(9 * 3):
+            report = import_orders(records, chunk_size=10, on_chunk=chunks.append)
+
+        self.assertEqual([chunk.orders for chunk in chunks], [10, 10, 5])
+        self.assertEqual((report.orders, report.lines, report.rejected), (25, 25, 0))
+        self.assertEqual(Order.objects.count(), 25)
+        self.assertEqual(set(Order.objects.values_list('total_price', flat=True)), {Decimal('6.00')})
+
+    def test_invalid_records_are_reported_and_skipped(self):
+        records = [
+            self._record(0),
+            {'customer_name': 'Без почты', 'items': []},
+            self._record(2, items=[{'product_id': 999999, 'quantity': 1}]),
+            self._record(3, items=[{'product_id': self.products[0].id, 'quantity': 0}]),
+        ]
+        report = import_orders(records)
+        self.assertEqual(report.orders, 1)
+        self.assertEqual([error['record'] for error in report.errors], [2, 4, 3])
+        self.assertEqual(OrderProduct.objects.count(), 1)
+
+
+class ImportOrdersViewTest(OrderIngestTestCase):
+    def setUp(self):
+        staff = get_user_model().objects.create_user('manager', password='secret', is_staff=True)
+        self.client.force_login(staff)
+
+    def test_accepts_json_array(self):
+        response = self.client.post(
+            '/orders/import/?chunk_size=2',
+            data=json.dumps([self._record(index) for index in range(3)]),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['orders'], 3)
+        self.assertEqual([chunk['orders'] for chunk in data['chunks']], [2, 1])
+
+    def test_accepts_ndjson_stream(self):
+        body = '\n'.join([json.dumps(self._record(0)), '{broken', '', json.dumps(self._record(1))]) + '\n'
+        response = self.client.post('/orders/import/', data=body, content_type='application/x-ndjson')
+        data = response.json()
+        self.assertEqual((data['orders'], data['rejected']), (2, 1))
+        self.assertEqual(data['errors'][0]['record'], 2)
+
+    def test_rejects_invalid_chunk_size(self):
+        response = self.client.post('/orders/import/?chunk_size=0', data='[]', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_staff_user(self):
+        self.client.logout()
+        response = self.client.post(
+            '/orders/import/', data=json.dumps([self._record(0)]), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Order.objects.exists())
+
+
+class ImportOrdersCommandTest(OrderIngestTestCase):
+    def test_imports_ndjson_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'orders.ndjson'
+            path.write_text('\n'.join(json.dumps(self._record(index)) for index in range(7)), encoding='utf-8')
+            stdout = StringIO()
+            call_command('import_orders', str(path), '--chunk-size', '3', stdout=stdout)
+
+        self.assertEqual(Order.objects.count(), 7)
+        self.assertEqual(stdout.getvalue().count('Пакет'), 3)
+        self.assertIn('Импортировано 7 заказов', stdout.getvalue())
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from orders.catalog import clear_product_catalog
+from orders.delivery import invalidate_delivery_table
+from orders.models import Logistics, Product
+
+
+class CalculateOrderViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'Товар {index}', description='', price=Decimal('10.50'), stock=100) for index in range(120)]
+        )
+        Logistics.objects.create(product=cls.products[0], delivery_cost=Decimal('300'), estimated_delivery_time=2)
+        Logistics.objects.create(product=cls.products[1], delivery_cost=Decimal('150'), estimated_delivery_time=5)
+
+    def setUp(self):
+        for reset in (invalidate_delivery_table, clear_product_catalog):
+            reset()
+            self.addCleanup(reset)
+
+    def _post(self, product_ids, quantities, **options):
+        return self.client.post(
+            '/orders/calculate/', {'product_ids': product_ids, 'quantities': quantities, **options}
+        )
+
+    def test_prices_cart_and_adds_delivery(self):
+        response = self._post([self.products[0].id, self.products[2].id], ['2', '3'])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(Decimal(data['total_price']), Decimal('352.50'))
+        self.assertEqual(Decimal(data['delivery_cost']), Decimal('300'))
+        self.assertEqual(data['items'], [{'product': 'Товар 0', 'quantity': 2}, {'product': 'Товар 2', 'quantity': 3}])
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        # the first quote loads the delivery table, later ones only fetch uncached products
+        with self.assertNumQueries(2):
+            self._post([self.products[0].id], ['1'])
+        for size in (2, 10, 120):
+            products = self.products[:size]
+            with self.subTest(size=size), self.assertNumQueries(1):
+                response = self._post([product.id for product in products], ['1'] * size)
+                self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self._post([product.id for product in self.products], ['1'] * len(self.products))
+
+    def test_product_changes_are_picked_up(self):
+        product = self.products[2]
+        self._post([product.id], ['1'])
+        product.price = Decimal('12.00')
+        product.save()
+        with self.assertNumQueries(1):
+            response = self._post([product.id, self.products[3].id], ['1', '1'])
+        self.assertEqual(Decimal(response.json()['total_price']), Decimal('22.50'))
+
+    def test_picks_one_option_per_product_by_strategy(self):
+        Logistics.objects.create(product=self.products[0], delivery_cost=Decimal('500'), estimated_delivery_time=1)
+        cart = ([self.products[0].id, self.products[1].id], ['1', '1'])
+
+        cheapest = self._post(*cart).json()
+        self.assertEqual((Decimal(cheapest['delivery_cost']), cheapest['delivery_days']), (Decimal('450'), 5))
+        fastest = self._post(*cart, delivery_strategy='fastest').json()
+        self.assertEqual((Decimal(fastest['delivery_cost']), fastest['delivery_days']), (Decimal('650'), 5))
+
+    def test_per_unit_cost_mode_multiplies_by_quantity(self):
+        response = self._post([self.products[0].id, self.products[1].id], ['2', '3'], delivery_cost_mode='per_unit')
+        self.assertEqual(Decimal(response.json()['delivery_cost']), Decimal('1050'))
+
+    def test_rejects_unknown_delivery_options(self):
+        response = self._post([self.products[0].id], ['1'], delivery_strategy='slowest')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('slowest', response.json()['error'])
+
+    def test_logistics_changes_are_picked_up(self):
+        self._post([self.products[0].id], ['1'])
+        option = Logistics.objects.get(product=self.products[0])
+        option.delivery_cost = Decimal('120')
+        option.save()
+        with self.assertNumQueries(2):
+            response = self._post([self.products[0].id, self.products[2].id], ['1', '1'])
+        self.assertEqual(Decimal(response.json()['delivery_cost']), Decimal('120'))
+
+        option.delete()
+        self.assertEqual(Decimal(self._post([self.products[0].id], ['1']).json()['delivery_cost']), Decimal('0'))
+
+    def test_reports_missing_products(self):
+        response = self._post([self.products[0].id, 999999, 888888], ['1', '1', '1'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_product_ids'], [888888, 999999])
+
+    def test_rejects_invalid_quantities(self):
+        response = self._post([self.products[0].id], ['0'])
+        self.assertEqual(response.status_code, 400)
+        response = self._post([self.products[0].id], ['1', '2'])
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,97 @@
+import csv
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from jobs.models import Job
+from orders.models import Order, OrderProduct, Product
+
+
+class OrderReportsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user('manager', password='secret', is_staff=True)
+        cement = Product.objects.create(name='Цемент', description='', price=Decimal('5.00'), stock=0)
+        sand = Product.objects.create(name='Песок', description='', price=Decimal('2.50'), stock=0)
+        orders = [
+            (datetime(2024, 3, 1, 10, tzinfo=timezone.utc), 'Pending', [(cement, 2), (sand, 4)]),
+            (datetime(2024, 3, 1, 18, tzinfo=timezone.utc), 'Paid', [(cement, 1)]),
+            (datetime(2024, 3, 1, 19, tzinfo=timezone.utc), 'Paid', [(cement, 3)]),
+            (datetime(2024, 3, 2, 9, tzinfo=timezone.utc), 'Paid', [(sand, 2)]),
+        ]
+        for order_date, status, lines in orders:
+            order = Order.objects.create(
+                customer_name='Иван',
+                customer_email='ivan@example.com',
+                status=status,
+                total_price=sum(product.price * qty for product, qty in lines),
+            )
+            Order.objects.filter(pk=order.pk).update(order_date=order_date)
+            OrderProduct.objects.bulk_create(
+                [OrderProduct(order=order, product=product, quantity=qty, price=product.price) for product, qty in lines]
+            )
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def _csv_rows(self, report, **params):
+        response = self.client.get(reverse('orders_report', args=[report, 'csv']), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_sales_report_groups_by_day_status_and_product(self):
+        rows = self._csv_rows('sales')
+        self.assertEqual(rows[0][0], 'День')
+        cement_id = str(Product.objects.get(name='Цемент').id)
+        sand_id = str(Product.objects.get(name='Песок').id)
+        self.assertEqual(
+            [row[:6] + [Decimal(row[6])] for row in rows[1:] if row[0] == '2024-03-01'],
+            [
+                ['2024-03-01', 'Paid', cement_id, 'Цемент', '2', '4', Decimal('20')],
+                ['2024-03-01', 'Pending', cement_id, 'Цемент', '1', '2', Decimal('10')],
+                ['2024-03-01', 'Pending', sand_id, 'Песок', '1', '4', Decimal('10')],
+            ],
+        )
+        self.assertEqual(len(rows), 1 + 4)
+
+    def test_revenue_report_respects_date_and_status_filters(self):
+        rows = self._csv_rows('revenue', date_from='2024-03-01', date_to='2024-03-01', status='Paid')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:3], ['2024-03-01', 'Paid', '2'])
+        self.assertEqual(Decimal(rows[1][3]), Decimal('20'))
+
+    def test_orders_report_exports_xlsx(self):
+        response = self.client.get(reverse('orders_report', args=['orders', 'xlsx']))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook['orders'].values)
+        self.assertEqual(len(rows), 1 + 5)
+        self.assertEqual(rows[1][6:], ('Цемент', 2, 5, 10))
+
+    @override_settings(REPORT_XLSX_MAX_ROWS=4)
+    def test_large_xlsx_export_is_sent_to_background_job(self):
+        response = self.client.get(reverse('orders_report', args=['orders', 'xlsx']), {'status': 'Paid'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(reverse('orders_report', args=['orders', 'xlsx']))
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(id=response.json()['id'])
+        self.assertEqual((job.task, job.args), ('orders.report', {'report': 'orders', 'format': 'xlsx'}))
+
+    def test_rejects_unknown_report_and_bad_dates(self):
+        self.assertEqual(self.client.get(reverse('orders_report', args=['unknown', 'csv'])).status_code, 404)
+        response = self.client.get(reverse('orders_report', args=['sales', 'csv']), {'date_from': '01.03.2024'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_staff_user(self):
+        self.client.logout()
+        response = self.client.get(reverse('orders_report', args=['sales', 'csv']))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,164 @@
+import csv
+import io
+import threading
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from orders.catalog import clear_product_catalog
+from orders.ingest import import_orders
+from orders.models import DailyProductSales, DailyStatusSales, Order, Product
+from orders.rollups import order_day, rebuild_rollups
+from orders.services import place_order
+
+
+class DailyRollupsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cement = Product.objects.create(name='Цемент', description='', price=Decimal('5.00'), stock=100)
+        cls.sand = Product.objects.create(name='Песок', description='', price=Decimal('2.50'), stock=100)
+
+    def setUp(self):
+        clear_product_catalog()
+        self.addCleanup(clear_product_catalog)
+
+    def _product_rows(self):
+        return sorted(DailyProductSales.objects.values_list('day', 'product_id', 'orders', 'quantity', 'revenue'))
+
+    def _status_rows(self):
+        return sorted(DailyStatusSales.objects.values_list('day', 'status', 'orders', 'revenue'))
+
+    def test_placed_orders_are_added_to_both_rollups(self):
+        first = place_order('Иван', 'ivan@example.com', [self.cement.id, self.sand.id], ['2', '4'])
+        place_order('Пётр', 'petr@example.com', [self.cement.id], ['1'])
+        day = order_day(first.order_date)
+
+        self.assertEqual(
+            self._product_rows(),
+            [(day, self.cement.id, 2, 3, Decimal('15.00')), (day, self.sand.id, 1, 4, Decimal('10.00'))],
+        )
+        self.assertEqual(self._status_rows(), [(day, 'Pending', 2, Decimal('25.00'))])
+
+    def test_status_changes_move_the_order_between_rows(self):
+        order = place_order('Иван', 'ivan@example.com', [self.cement.id], ['2'])
+        day = order_day(order.order_date)
+
+        order = Order.objects.get(id=order.id)
+        order.status = 'Paid'
+        order.save()
+        order.save()
+        self.assertEqual(self._status_rows(), [(day, 'Paid', 1, Decimal('10.00')), (day, 'Pending', 0, Decimal('0.00'))])
+
+        # select and update of the order, nothing for the rollups
+        with self.assertNumQueries(2):
+            Order.objects.get(id=order.id).save()
+
+    def test_imported_orders_are_added_to_both_rollups(self):
+        record = {
+            'customer_name': 'Иван',
+            'customer_email': 'ivan@example.com',
+            'status': 'Paid',
+            'product_ids': [self.sand.id],
+            'quantities': [2],
+        }
+        records = [record] * 3
+        import_orders(records, chunk_size=2)
+        day = order_day(Order.objects.first().order_date)
+
+        self.assertEqual(self._product_rows(), [(day, self.sand.id, 3, 6, Decimal('15.00'))])
+        self.assertEqual(self._status_rows(), [(day, 'Paid', 3, Decimal('15.00'))])
+
+    def test_rebuild_matches_the_order_tables(self):
+        for quantity in ('1', '2', '3'):
+            place_order('Иван', 'ivan@example.com', [self.cement.id, self.sand.id], [quantity, '1'])
+        incremental = (self._product_rows(), self._status_rows())
+        moved = Order.objects.order_by('id').first()
+        Order.objects.filter(id=moved.id).update(order_date=datetime(2024, 3, 1, 10, tzinfo=timezone.utc), status='Paid')
+
+        stdout = StringIO()
+        call_command('rebuild_rollups', chunk_days=2, stdout=stdout)
+        self.assertIn('Сводки пересчитаны: 3 заказов', stdout.getvalue())
+        self.assertIn('дней', stdout.getvalue())
+
+        day = order_day(moved.order_date)
+        self.assertEqual(
+            self._product_rows(),
+            [
+                (date(2024, 3, 1), self.cement.id, 1, 1, Decimal('5.00')),
+                (date(2024, 3, 1), self.sand.id, 1, 1, Decimal('2.50')),
+                (day, self.cement.id, 2, 5, Decimal('25.00')),
+                (day, self.sand.id, 2, 2, Decimal('5.00')),
+            ],
+        )
+        self.assertEqual(
+            self._status_rows(), [(date(2024, 3, 1), 'Paid', 1, Decimal('7.50')), (day, 'Pending', 2, Decimal('30.00'))]
+        )
+
+        Order.objects.filter(id=moved.id).update(order_date=moved.order_date, status='Pending')
+        call_command('rebuild_rollups', quiet=True, stdout=StringIO())
+        self.assertEqual((self._product_rows(), self._status_rows()), incremental)
+
+    def test_rebuild_uses_the_price_lines_were_sold_at(self):
+        order = place_order('Иван', 'ivan@example.com', [self.cement.id], ['2'])
+        Product.objects.filter(id=self.cement.id).update(price=Decimal('7.00'))
+        rebuild_rollups()
+        day = order_day(order.order_date)
+        self.assertEqual(self._product_rows(), [(day, self.cement.id, 1, 2, Decimal('10.00'))])
+
+    def test_daily_reports_read_the_rollups(self):
+        order = place_order('Иван', 'ivan@example.com', [self.cement.id], ['2'])
+        day = order_day(order.order_date).isoformat()
+        self.client.force_login(get_user_model().objects.create_user('manager', password='secret', is_staff=True))
+
+        response = self.client.get(reverse('orders_report', args=['daily-statuses', 'csv']), {'date_from': day})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[1:], [[day, 'Pending', '1', '10.00']])
+
+        response = self.client.get(reverse('orders_report', args=['daily-products', 'csv']), {'date_to': '2024-01-01'})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows, [['День', 'Товар ID', 'Товар', 'Заказов', 'Количество', 'Выручка']])
+
+
+class RebuildRollupsConcurrencyTest(TransactionTestCase):
+    def setUp(self):
+        clear_product_catalog()
+        self.addCleanup(clear_product_catalog)
+
+    def test_orders_change_between_the_rebuilt_days(self):
+        cement = Product.objects.create(name='Цемент', description='', price=Decimal('5.00'), stock=100)
+        orders = [place_order('Иван', 'ivan@example.com', [cement.id], ['1']) for _ in range(4)]
+        earlier = datetime(2024, 3, 1, 10, tzinfo=timezone.utc)
+        Order.objects.filter(id__in=[order.id for order in orders[:2]]).update(order_date=earlier)
+        blocked = []
+
+        def pay_last_order():
+            try:
+                order = Order.objects.get(id=orders[-1].id)
+                order.status = 'Paid'
+                order.save()
+            except OperationalError:
+                blocked.append(True)
+            finally:
+                connection.close()
+
+        def pay_between_ranges(processed, days_done, days_total):
+            if days_done == 1:
+                # the first day is committed and the last one not started: nothing holds the lock
+                writer = threading.Thread(target=pay_last_order)
+                writer.start()
+                writer.join()
+
+        self.assertEqual(rebuild_rollups(chunk_days=1, on_chunk=pay_between_ranges), 4)
+
+        self.assertEqual(blocked, [])
+        day = order_day(orders[-1].order_date)
+        self.assertEqual(
+            sorted(DailyStatusSales.objects.values_list('day', 'status', 'orders', 'revenue')),
+            [(date(2024, 3, 1), 'Pending', 2, Decimal('10.00')), (day, 'Paid', 1, Decimal('5.00')), (day, 'Pending', 1, Decimal('5.00'))],
+        )
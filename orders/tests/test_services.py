@@ -0,0 +1,159 @@
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.db import DatabaseError, OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+
+from orders.catalog import clear_product_catalog
+from orders.models import Order, OrderProduct, Product
+from orders.services import InsufficientStockError, place_order
+
+
+class CreateOrderViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = Product.objects.bulk_create(
+            [Product(name=f'Товар {index}', description='', price=Decimal('2.25'), stock=100) for index in range(100)]
+        )
+
+    def setUp(self):
+        clear_product_catalog()
+        self.addCleanup(clear_product_catalog)
+
+    def _post(self, product_ids, quantities):
+        return self.client.post(
+            '/orders/create/',
+            {
+                'customer_name': 'Иван',
+                'customer_email': 'ivan@example.com',
+                'product_ids': product_ids,
+                'quantities': quantities,
+            },
+        )
+
+    def test_creates_order_with_lines_and_total(self):
+        response = self._post([self.products[0].id, self.products[1].id], ['2', '4'])
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(id=response.json()['order_id'])
+        self.assertEqual(order.total_price, Decimal('13.50'))
+        self.assertEqual(
+            sorted(order.orderproduct_set.values_list('product_id', 'quantity')),
+            [(self.products[0].id, 2), (self.products[1].id, 4)],
+        )
+
+    def test_query_count_does_not_depend_on_line_count(self):
+        for size in (1, 10, 100):
+            products = self.products[:size]
+            # savepoint, stock reservation, prices, order insert, lines bulk insert,
+            # insert and update of both rollups, release
+            with self.subTest(size=size), self.assertNumQueries(10):
+                response = self._post([product.id for product in products], ['1'] * size)
+                self.assertEqual(response.status_code, 200)
+
+    def test_charges_current_price_even_when_catalog_is_stale(self):
+        product = self.products[0]
+        self.client.post('/orders/calculate/', {'product_ids': [product.id], 'quantities': ['1']})
+        # another process changing the price: no signal reaches this process's catalog
+        Product.objects.filter(id=product.id).update(price=Decimal('5.00'))
+        response = self._post([product.id], ['2'])
+        self.assertEqual(Order.objects.get(id=response.json()['order_id']).total_price, Decimal('10.00'))
+
+    def test_missing_products_do_not_create_an_order(self):
+        response = self._post([self.products[0].id, 999999], ['1', '1'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_product_ids'], [999999])
+        self.assertFalse(Order.objects.exists())
+
+    def test_failed_line_insert_rolls_back_the_order(self):
+        with mock.patch.object(OrderProduct.objects, 'bulk_create', side_effect=DatabaseError('boom')):
+            with self.assertRaises(DatabaseError):
+                place_order('Иван', 'ivan@example.com', [self.products[0].id], ['1'])
+        self.assertFalse(Order.objects.exists())
+
+    def test_reserves_stock_for_all_lines(self):
+        product = self.products[0]
+        response = self._post([product.id, product.id, self.products[1].id], ['30', '20', '5'])
+        self.assertEqual(response.status_code, 200)
+        product.refresh_from_db()
+        self.products[1].refresh_from_db()
+        self.assertEqual((product.stock, self.products[1].stock), (50, 95))
+
+    def test_repeated_products_are_merged_into_one_line(self):
+        product = self.products[0]
+        response = self._post([product.id, self.products[1].id, product.id], ['1', '2', '3'])
+        order = Order.objects.get(id=response.json()['order_id'])
+        self.assertEqual(
+            list(order.orderproduct_set.order_by('id').values_list('product_id', 'quantity')),
+            [(product.id, 4), (self.products[1].id, 2)],
+        )
+        self.assertEqual(order.total_price, Decimal('13.50'))
+
+    def test_rejects_cart_that_cannot_be_fully_reserved(self):
+        response = self._post([self.products[0].id, self.products[1].id], ['10', '101'])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['insufficient_product_ids'], [self.products[1].id])
+        self.assertEqual(
+            list(Product.objects.filter(id__in=[self.products[0].id, self.products[1].id]).values_list('stock', flat=True)),
+            [100, 100],
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_reserves_stock_for_large_carts(self):
+        products = Product.objects.bulk_create(
+            [Product(name=f'Товар {index}', description='', price=Decimal('1.00'), stock=1) for index in range(1000)]
+        )
+        order = place_order('Иван', 'ivan@example.com', [product.id for product in products], ['1'] * len(products))
+        self.assertEqual(order.orderproduct_set.count(), 1000)
+        self.assertFalse(Product.objects.filter(id__in=[product.id for product in products], stock__gt=0).exists())
+
+
+class ConcurrentStockReservationTest(TransactionTestCase):
+    INITIAL_STOCK = 25
+    QUANTITY = 2
+    WORKERS = 8
+    ORDERS_PER_WORKER = 5
+
+    def test_parallel_orders_never_oversell(self):
+        product = Product.objects.create(name='Кирпич', description='', price=Decimal('10'), stock=self.INITIAL_STOCK)
+        results = []
+        results_lock = threading.Lock()
+        start = threading.Barrier(self.WORKERS)
+
+        def worker():
+            start.wait()
+            try:
+                for _ in range(self.ORDERS_PER_WORKER):
+                    for _attempt in range(50):
+                        try:
+                            place_order('Покупатель', 'buyer@example.com', [product.id], [self.QUANTITY])
+                            outcome = 'created'
+                        except InsufficientStockError:
+                            outcome = 'rejected'
+                        except OperationalError:
+                            # SQLite reports lock contention instead of waiting; retry.
+                            time.sleep(0.001)
+                            continue
+                        break
+                    else:
+                        outcome = 'locked'
+                    with results_lock:
+                        results.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        created = results.count('created')
+        self.assertGreaterEqual(product.stock, 0)
+        self.assertEqual(product.stock, self.INITIAL_STOCK - created * self.QUANTITY)
+        self.assertEqual(Order.objects.count(), created)
+        self.assertEqual(OrderProduct.objects.count(), created)
+        self.assertLessEqual(created, self.INITIAL_STOCK // self.QUANTITY)
+        self.assertGreater(results.count('rejected'), 0)
@@ -4,4 +4,8 @@ from . import views
 urlpatterns = [
     path('calculate/', views.calculate_order),
     path('create/', views.create_order),
+    path('async/calculate/', views.acalculate_order),
+    path('async/create/', views.acreate_order),
+    path('import/', views.import_orders_view),
+    path('reports/<slug:report>.<slug:fmt>', views.export_report, name='orders_report'),
 ]
\ No newline at end of file
@@ -1,43 +1,220 @@
-from django.http import JsonResponse
-from .models import Product, Order, OrderProduct, Logistics
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.log import log_response
+from jobs.queue import enqueue
+from jobs.views import job_accepted_response
+from .delivery import CHEAPEST, PER_LINE
+from .idempotency import (
+    IDEMPOTENCY_HEADER,
+    IdempotencyKeyError,
+    IdempotencyKeyReusedError,
+    request_fingerprint,
+    run_once,
+)
+from .ingest import DEFAULT_CHUNK_SIZE, import_orders, iter_ndjson
+from .pricing import InvalidCartError, MissingProductsError, aprice_cart, price_cart
+from .reports import (
+    CSV_CONTENT_TYPE,
+    DEFAULT_XLSX_MAX_ROWS,
+    REPORTS,
+    REPORT_FORMATS,
+    XLSX_CONTENT_TYPE,
+    ReportError,
+    ReportFilters,
+    build_xlsx_file,
+    iter_csv,
+)
+from .services import InsufficientStockError, aplace_order, place_order
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+MAX_IMPORT_CHUNK_SIZE = 10000
+
+
+def _pricing_error_response(exc):
+    if isinstance(exc, MissingProductsError):
+        return JsonResponse({'error': str(exc), 'missing_product_ids': exc.product_ids}, status=400)
+    return JsonResponse({'error': str(exc)}, status=400)
+
+
+def _quote_response(quote):
+    order_products = [{'product': line.product.name, 'quantity': line.quantity} for line in quote.lines]
+    return JsonResponse(
+        {
+            'total_price': quote.total_price,
+            'delivery_cost': quote.delivery_cost,
+            'delivery_days': quote.delivery_days,
+            'items': order_products,
+        }
+    )
+
+
+def _delivery_options(data):
+    return data.get('delivery_strategy') or CHEAPEST, data.get('delivery_cost_mode') or PER_LINE
+
+
+def _order_form(request):
+    data = request.POST
+    return data['customer_name'], data['customer_email'], data.getlist('product_ids'), data.getlist('quantities')
+
+
+def _order_error_response(exc):
+    if isinstance(exc, (InvalidCartError, MissingProductsError)):
+        return _pricing_error_response(exc)
+    if isinstance(exc, InsufficientStockError):
+        return JsonResponse({'error': str(exc), 'insufficient_product_ids': exc.product_ids}, status=409)
+    if isinstance(exc, IdempotencyKeyReusedError):
+        return JsonResponse({'error': str(exc)}, status=422)
+    return JsonResponse({'error': str(exc)}, status=400)
+
+
+def _order_created_response(order_id, created):
+    response = JsonResponse({'message': 'Order created', 'order_id': order_id})
+    if not created:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+ORDER_ERRORS = (InvalidCartError, MissingProductsError, InsufficientStockError, IdempotencyKeyError)
+
 
 @csrf_exempt
 def calculate_order(request):
     if request.method == 'POST':
         data = request.POST
-        product_ids = data.getlist('product_ids')
-        quantities = data.getlist('quantities')
-        total_price = 0
-        order_products = []
+        try:
+            quote = price_cart(data.getlist('product_ids'), data.getlist('quantities'), *_delivery_options(data))
+        except (InvalidCartError, MissingProductsError) as exc:
+            return _pricing_error_response(exc)
+        return _quote_response(quote)
 
-        for pid, qty in zip(product_ids, quantities):
-            product = Product.objects.get(id=pid)
-            total_price += product.price * int(qty)
-            order_products.append({'product': product.name, 'quantity': qty})
+@csrf_exempt
+def create_order(request):
+    if request.method == 'POST':
+        customer_name, customer_email, product_ids, quantities = _order_form(request)
 
-        logistics = Logistics.objects.filter(product__in=product_ids)
-        delivery_cost = sum([l.delivery_cost for l in logistics])
-        total_price += delivery_cost
+        def create():
+            return place_order(customer_name, customer_email, product_ids, quantities)
+
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        try:
+            if idempotency_key is None:
+                order_id, created = create().id, True
+            else:
+                fingerprint = request_fingerprint(customer_name, customer_email, product_ids, quantities)
+                order_id, created = run_once(idempotency_key, fingerprint, create)
+        except ORDER_ERRORS as exc:
+            return _order_error_response(exc)
+        return _order_created_response(order_id, created)
+
+
+def _async_csrf_exempt_post(view):
+    """``csrf_exempt`` plus ``require_POST`` for a coroutine view.
+
+    Before Django 5.0 those decorators wrap the view in a plain function, and the
+    handler then receives an unawaited coroutine instead of a response.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            response = HttpResponseNotAllowed(['POST'])
+            log_response(
+                'Method Not Allowed (%s): %s', request.method, request.path, response=response, request=request
+            )
+            return response
+        return await view(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+@_async_csrf_exempt_post
+async def acalculate_order(request):
+    """``calculate_order`` for ASGI servers, querying through the async ORM."""
+    data = request.POST
+    try:
+        quote = await aprice_cart(data.getlist('product_ids'), data.getlist('quantities'), *_delivery_options(data))
+    except (InvalidCartError, MissingProductsError) as exc:
+        return _pricing_error_response(exc)
+    return _quote_response(quote)
+
+
+@_async_csrf_exempt_post
+async def acreate_order(request):
+    """``create_order`` for ASGI servers; the order transaction runs off the event loop."""
+    customer_name, customer_email, product_ids, quantities = _order_form(request)
+
+    def create():
+        return place_order(customer_name, customer_email, product_ids, quantities)
+
+    idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+    try:
+        if idempotency_key is None:
+            order_id, created = (await aplace_order(customer_name, customer_email, product_ids, quantities)).id, True
+        else:
+            fingerprint = request_fingerprint(customer_name, customer_email, product_ids, quantities)
+            order_id, created = await sync_to_async(run_once)(idempotency_key, fingerprint, create)
+    except ORDER_ERRORS as exc:
+        return _order_error_response(exc)
+    return _order_created_response(order_id, created)
 
-        return JsonResponse({'total_price': total_price, 'delivery_cost': delivery_cost, 'items': order_products})
 
 @csrf_exempt
-def create_order(request):
-    if request.method == 'POST':
-        data = request.POST
-        customer_name = data['customer_name']
-        customer_email = data['customer_email']
-        products = data.getlist('product_ids')
-        quantities = data.getlist('quantities')
-
-        order = Order.objects.create(customer_name=customer_name, customer_email=customer_email, total_price=0)
-        total_price = 0
-        for pid, qty in zip(products, quantities):
-            product = Product.objects.get(id=pid)
-            total_price += product.price * int(qty)
-            OrderProduct.objects.create(order=order, product=product, quantity=qty)
-
-        order.total_price = total_price
-        order.save()
-        return JsonResponse({'message': 'Order created', 'order_id': order.id})
\ No newline at end of file
+@require_POST
+@staff_member_required
+def import_orders_view(request):
+    try:
+        chunk_size = int(request.GET.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    except ValueError:
+        chunk_size = 0
+    if not 0 < chunk_size <= MAX_IMPORT_CHUNK_SIZE:
+        return JsonResponse({'error': f'chunk_size must be between 1 and {MAX_IMPORT_CHUNK_SIZE}'}, status=400)
+
+    if request.content_type in ('application/x-ndjson', 'application/jsonl'):
+        records = iter_ndjson(request)
+    else:
+        try:
+            records = json.load(request)
+        except (UnicodeDecodeError, ValueError):
+            return JsonResponse({'error': 'Request body must be a JSON array or NDJSON'}, status=400)
+        if not isinstance(records, list):
+            return JsonResponse({'error': 'Request body must be a JSON array of orders'}, status=400)
+
+    report = import_orders(records, chunk_size=chunk_size)
+    return JsonResponse(report.as_dict())
+
+
+@staff_member_required
+def export_report(request, report, fmt):
+    if report not in REPORTS or fmt not in REPORT_FORMATS:
+        raise Http404('Unknown report')
+    try:
+        filters = ReportFilters.from_query(request.GET)
+    except ReportError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    background = request.GET.get('background') == '1'
+    if fmt == 'xlsx' and not background:
+        # a workbook cannot be streamed, so a large one is built by a job instead
+        max_rows = getattr(settings, 'REPORT_XLSX_MAX_ROWS', DEFAULT_XLSX_MAX_ROWS)
+        background = REPORTS[report].count(filters) > max_rows
+    if background:
+        args = {key: request.GET[key] for key in ('date_from', 'date_to', 'status') if request.GET.get(key)}
+        return job_accepted_response(enqueue('orders.report', {'report': report, 'format': fmt, **args}))
+
+    filename = f'{report}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}'
+    if fmt == 'csv':
+        response = StreamingHttpResponse(iter_csv(REPORTS[report], filters), content_type=CSV_CONTENT_TYPE)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    return FileResponse(
+        build_xlsx_file(REPORTS[report], filters),
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX_CONTENT_TYPE,
+    )